@@ -3,8 +3,19 @@ Slack Scraper Library
 Modular components for scraping Slack and extracting talk information
 """
 
-from .scrape_workspaces import main as scrape_workspaces
-from .extract_slack import main as extract_slack
-from .add_to_calendar import main as add_to_calendar
+import importlib
+
+# Bump when a stage's output format or logic changes, so run_stages --use-cache
+# stops reusing outputs produced by older code
+PIPELINE_VERSION = '1'
 
 __all__ = ['scrape_workspaces', 'extract_slack', 'add_to_calendar']
+
+
+def __getattr__(name: str):
+    """Import each module's main on first access, so importing lib.stageN stays cheap"""
+    if name not in __all__:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    main = importlib.import_module(f'.{name}', __name__).main
+    globals()[name] = main  # Replaces the submodule binding left by the import
+    return main
@@ -4,9 +4,17 @@ Google Calendar Integration
 Adds talks from Gemini extraction to Google Calendar with deduplication
 """
 
+import asyncio
 import csv
+import threading
+from dataclasses import dataclass
 from datetime import datetime, timedelta
+from operator import itemgetter
 from pathlib import Path
+from zoneinfo import ZoneInfo
+import google_auth_httplib2
+import httplib2
+from google.auth.transport.requests import Request
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
 
@@ -19,142 +27,216 @@ SCOPES = ['https://www.googleapis.com/auth/calendar']
 # Calendar configuration
 CALENDAR_ID = 'primary'  # Service account's primary calendar
 TIMEZONE = 'America/New_York'
+TZ = ZoneInfo(TIMEZONE)
 SLACK_EMAIL = 'aggregated-talks-aaaarxlyhn2ukxh4dzcdaqrvsm@zhuanglabatprinceton.slack.com'
 
-
-def get_calendar_service():
-    """Create and return authenticated Google Calendar service"""
+# Calendar batch requests accept at most 50 calls each
+BATCH_SIZE = 50
+MAX_CONCURRENT_BATCHES = 4  # Max batch requests in flight at once
+
+# Talk record parsed once from a Gemini CSV row
+@dataclass(slots=True, frozen=True)
+class Talk:
+    first_name: str
+    last_name: str
+    month: int
+    day: int
+    hour: int
+    minute: int
+    location: str
+    description: str
+    category: str
+    workspace: str
+    channel: str
+
+# Gemini CSV columns read into a Talk, in Talk field order
+TALK_COLUMNS = [
+    'gemini_presenter_first_name', 'gemini_presenter_last_name',
+    'gemini_month', 'gemini_day', 'gemini_hour', 'gemini_minute',
+    'gemini_location', 'gemini_short_description', 'gemini_category',
+    'workspace', 'channel_name'
+]
+
+
+def get_credentials():
+    """Load service account credentials and fetch an access token up front"""
     credentials = service_account.Credentials.from_service_account_file(
         str(CREDENTIALS_FILE),
         scopes=SCOPES
     )
-    service = build('calendar', 'v3', credentials=credentials)
+    # Refresh once so concurrent workers share a valid token instead of racing to refresh
+    credentials.refresh(Request())
+    return credentials
+
+
+def get_calendar_service(credentials=None):
+    """Create and return authenticated Google Calendar service"""
+    if credentials is None:
+        credentials = get_credentials()
+    # Bundled discovery document, so no discovery fetch at startup
+    service = build('calendar', 'v3', credentials=credentials, cache_discovery=False, static_discovery=True)
     return service
 
 
-def check_duplicate_event(service, first_name, last_name, year, month, day):
+async def _execute_batch(semaphore, credentials, batch):
+    """Execute one batch request in a worker thread, bounded by semaphore"""
+    async with semaphore:
+        # httplib2 connections are not thread-safe, so each batch gets its own
+        http = google_auth_httplib2.AuthorizedHttp(credentials, http=httplib2.Http())
+        await asyncio.to_thread(batch.execute, http=http)
+
+
+async def execute_batches(credentials, batches):
+    """
+    Send batch requests concurrently.
+
+    Args:
+        credentials: Refreshed service account credentials
+        batches: List of BatchHttpRequest objects
+
+    Returns:
+        List aligned with batches; each item is None or the Exception raised
+    """
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_BATCHES)
+    tasks = [asyncio.create_task(_execute_batch(semaphore, credentials, batch)) for batch in batches]
+    return await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def fetch_existing_talk_keys(service, start_date, end_date):
     """
-    Check if an event already exists for this presenter on this date.
+    Fetch all events in a date range with a single (paginated) list query.
 
     Args:
         service: Google Calendar service instance
-        first_name: Presenter first name
-        last_name: Presenter last name
-        year: Event year
-        month: Event month (1-12)
-        day: Event day (1-31)
+        start_date: First day of the range (datetime at midnight)
+        end_date: Day after the last day of the range (datetime at midnight)
 
     Returns:
-        True if duplicate exists, False otherwise
+        Set of (event title, 'YYYY-MM-DD') tuples for existing events
     """
-    try:
-        # Create date range for the specific day
-        start_date = datetime(year, month, day, 0, 0, 0)
-        end_date = start_date + timedelta(days=1)
+    # Format for RFC3339 timestamp (offset follows DST)
+    time_min = start_date.replace(tzinfo=TZ).isoformat()
+    time_max = end_date.replace(tzinfo=TZ).isoformat()
 
-        # Format for RFC3339 timestamp
-        time_min = start_date.strftime('%Y-%m-%dT%H:%M:%S') + '-04:00'
-        time_max = end_date.strftime('%Y-%m-%dT%H:%M:%S') + '-04:00'
+    existing = set()
+    page_token = None
 
-        # Search for events on this day
+    while True:
         events_result = service.events().list(
             calendarId=CALENDAR_ID,
             timeMin=time_min,
             timeMax=time_max,
             singleEvents=True,
-            orderBy='startTime'
+            maxResults=2500,  # API maximum, so most ranges fit in one page
+            fields='nextPageToken,items(summary,start)',  # Only what deduplication needs
+            pageToken=page_token
         ).execute()
 
-        events = events_result.get('items', [])
+        for event in events_result.get('items', []):
+            start = event.get('start', {})
+            event_date = (start.get('dateTime') or start.get('date') or '')[:10]
+            existing.add((event.get('summary', ''), event_date))
 
-        # Check if any event has the same presenter name
-        search_title = f"{first_name} {last_name} Talk"
-        for event in events:
-            event_title = event.get('summary', '')
-            if event_title == search_title:
-                return True
+        page_token = events_result.get('nextPageToken')
+        if not page_token:
+            break
 
-        return False
+    return existing
 
-    except Exception as e:
-        print(f"  ⚠️  Error checking for duplicate: {e}")
-        return False
 
+def parse_talk(row, get_talk_fields):
+    """
+    Parse a Gemini CSV row into a Talk, converting numeric fields once.
+
+    Args:
+        row: List of values from csv.reader
+        get_talk_fields: itemgetter over the header positions of TALK_COLUMNS
 
-def create_calendar_event(service, talk_data):
+    Returns:
+        Talk record
+    """
+    (first_name, last_name, month, day, hour, minute,
+     location, description, category, workspace, channel) = get_talk_fields(row)
+    return Talk(
+        first_name, last_name, int(month), int(day), int(hour), int(minute),
+        location, description, category, workspace, channel
+    )
+
+
+def build_event_body(talk):
+    """
+    Build the Google Calendar event body for a talk.
+
+    Args:
+        talk: Talk record
+
+    Returns:
+        Event body dict for events().insert
+    """
+    # Use current year (2025)
+    year = 2025
+
+    # Create event title
+    title = f"{talk.first_name} {talk.last_name} Talk"
+
+    # Create event description with category
+    full_description = talk.description
+    if talk.category:
+        full_description += f"\n\nCategory: {talk.category}"
+
+    # Add original message context
+    if talk.workspace and talk.channel:
+        full_description += f"\n\nSource: {talk.workspace} - #{talk.channel}"
+
+    # Add Slack notification email to description
+    full_description += f"\n\nNotifications: {SLACK_EMAIL}"
+
+    # Create datetime objects for start and end (1 hour duration)
+    start_dt = datetime(year, talk.month, talk.day, talk.hour, talk.minute)
+    end_dt = start_dt + timedelta(hours=1)
+
+    # Format for Google Calendar API
+    # Note: Service accounts cannot add attendees without Domain-Wide Delegation
+    # So we include the Slack email in the description instead
+    event = {
+        'summary': title,
+        'location': talk.location,
+        'description': full_description,
+        'start': {
+            'dateTime': start_dt.isoformat(),
+            'timeZone': TIMEZONE,
+        },
+        'end': {
+            'dateTime': end_dt.isoformat(),
+            'timeZone': TIMEZONE,
+        },
+        'reminders': {
+            'useDefault': False,
+            'overrides': [
+                {'method': 'email', 'minutes': 1440},  # 1 day before
+                {'method': 'email', 'minutes': 30},    # 30 minutes before
+            ],
+        },
+    }
+
+    return event
+
+
+def create_calendar_event(service, talk):
     """
     Create a Google Calendar event for a talk.
 
     Args:
         service: Google Calendar service instance
-        talk_data: Dictionary with talk information
+        talk: Talk record
 
     Returns:
         Created event object or None if failed
     """
     try:
-        first_name = talk_data['gemini_presenter_first_name']
-        last_name = talk_data['gemini_presenter_last_name']
-        month = int(talk_data['gemini_month'])
-        day = int(talk_data['gemini_day'])
-        hour = int(talk_data['gemini_hour'])
-        minute = int(talk_data['gemini_minute'])
-        location = talk_data['gemini_location']
-        description = talk_data['gemini_short_description']
-        category = talk_data['gemini_category']
-
-        # Use current year (2025)
-        year = 2025
-
-        # Create event title
-        title = f"{first_name} {last_name} Talk"
-
-        # Create event description with category
-        full_description = description
-        if category:
-            full_description += f"\n\nCategory: {category}"
-
-        # Add original message context
-        workspace = talk_data.get('workspace', '')
-        channel = talk_data.get('channel_name', '')
-        if workspace and channel:
-            full_description += f"\n\nSource: {workspace} - #{channel}"
-
-        # Add Slack notification email to description
-        full_description += f"\n\nNotifications: {SLACK_EMAIL}"
-
-        # Create datetime objects for start and end (1 hour duration)
-        start_dt = datetime(year, month, day, hour, minute)
-        end_dt = start_dt + timedelta(hours=1)
-
-        # Format for Google Calendar API
-        # Note: Service accounts cannot add attendees without Domain-Wide Delegation
-        # So we include the Slack email in the description instead
-        event = {
-            'summary': title,
-            'location': location,
-            'description': full_description,
-            'start': {
-                'dateTime': start_dt.strftime('%Y-%m-%dT%H:%M:%S'),
-                'timeZone': TIMEZONE,
-            },
-            'end': {
-                'dateTime': end_dt.strftime('%Y-%m-%dT%H:%M:%S'),
-                'timeZone': TIMEZONE,
-            },
-            'reminders': {
-                'useDefault': False,
-                'overrides': [
-                    {'method': 'email', 'minutes': 1440},  # 1 day before
-                    {'method': 'email', 'minutes': 30},    # 30 minutes before
-                ],
-            },
-        }
-
-        # Create the event
         created_event = service.events().insert(
             calendarId=CALENDAR_ID,
-            body=event
+            body=build_event_body(talk)
         ).execute()
 
         return created_event
@@ -164,6 +246,14 @@ def create_calendar_event(service, talk_data):
         return None
 
 
+def print_summary(stats):
+    """Print counts of created, duplicate, and failed talks"""
+    print(f"\n📊 Summary:")
+    print(f"  ✅ New events created: {stats['created']}")
+    print(f"  ↻ Duplicates skipped: {stats['duplicates']}")
+    print(f"  ❌ Errors/incomplete: {stats['errors']}")
+
+
 def main(gemini_csv_path: str) -> int:
     """
     Add talks from Gemini CSV to Google Calendar with deduplication.
@@ -179,83 +269,134 @@ def main(gemini_csv_path: str) -> int:
 
     # Authenticate with Google Calendar
     try:
-        service = get_calendar_service()
+        credentials = get_credentials()
+        service = get_calendar_service(credentials)
         print(f"✓ Authenticated with Google Calendar")
     except Exception as e:
         print(f"❌ Failed to authenticate with Google Calendar: {e}")
         return 0
 
-    # Read Gemini CSV
-    with open(gemini_csv_path, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        rows = list(reader)
+    # Read Gemini CSV positionally; only talk rows are ever unpacked
+    with open(gemini_csv_path, 'r', newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        rows = [row for row in reader if row]  # csv.reader yields [] for blank lines, which DictReader skipped
 
     print(f"Found {len(rows)} message(s) in CSV")
 
-    # Filter for actual talks (case-insensitive)
-    talks = [row for row in rows if str(row.get('gemini_is_talk', '')).lower() == 'true']
-    print(f"Found {len(talks)} talk(s) to process")
-
-    if not talks:
+    if not rows:
         print("⚠️  No talks found - nothing to add to calendar")
         return 0
 
-    # Process each talk
-    new_events_count = 0
-    duplicate_count = 0
-    error_count = 0
+    is_talk_col = header.index('gemini_is_talk')
+    get_talk_fields = itemgetter(*[header.index(column) for column in TALK_COLUMNS])
+
+    # Filter for actual talks (case-insensitive) and parse them in a single pass
+    stats = {'created': 0, 'duplicates': 0, 'errors': 0}
+    valid_talks = []
+    talk_count = 0
+    year = 2025
+
+    for row in rows:
+        if row[is_talk_col].lower() != 'true':
+            continue
+
+        talk_count += 1
+        i = talk_count
 
-    for i, talk in enumerate(talks, 1):
         try:
-            # Validate required fields
-            first_name = talk['gemini_presenter_first_name']
-            last_name = talk['gemini_presenter_last_name']
-            month = int(talk['gemini_month'])
-            day = int(talk['gemini_day'])
-            hour = int(talk['gemini_hour'])
-            minute = int(talk['gemini_minute'])
+            talk = parse_talk(row, get_talk_fields)
 
             # Skip if missing critical info
-            if not first_name or not last_name:
+            if not talk.first_name or not talk.last_name:
                 print(f"  ⊘ Talk {i}: Skipping - missing presenter name")
-                error_count += 1
+                stats['errors'] += 1
                 continue
 
-            if month == 0 or day == 0:
-                print(f"  ⊘ Talk {i}: Skipping - missing date ({first_name} {last_name})")
-                error_count += 1
+            if talk.month == 0 or talk.day == 0:
+                print(f"  ⊘ Talk {i}: Skipping - missing date ({talk.first_name} {talk.last_name})")
+                stats['errors'] += 1
                 continue
 
-            # Check for duplicate
-            year = 2025
-            is_duplicate = check_duplicate_event(service, first_name, last_name, year, month, day)
+            valid_talks.append((i, talk, datetime(year, talk.month, talk.day)))
 
-            if is_duplicate:
-                print(f"  ↻ Talk {i}: Already exists - {first_name} {last_name} on {month}/{day}")
-                duplicate_count += 1
-                continue
+        except Exception as e:
+            print(f"  ❌ Talk {i}: Error processing - {e}")
+            stats['errors'] += 1
 
-            # Create event
-            print(f"  ➕ Talk {i}: Creating event - {first_name} {last_name} on {month}/{day} at {hour}:{minute:02d}")
-            event = create_calendar_event(service, talk)
+    print(f"Found {talk_count} talk(s) to process")
 
-            if event:
-                print(f"     ✓ Event created: {event.get('htmlLink', 'N/A')}")
-                new_events_count += 1
+    if not talk_count:
+        print("⚠️  No talks found - nothing to add to calendar")
+        return 0
+
+    if not valid_talks:
+        print_summary(stats)
+        return 0
+
+    # Fetch existing events for the whole date span in one query
+    try:
+        start_date = min(talk_date for _, _, talk_date in valid_talks)
+        end_date = max(talk_date for _, _, talk_date in valid_talks) + timedelta(days=1)
+        existing = fetch_existing_talk_keys(service, start_date, end_date)
+    except Exception as e:
+        print(f"  ⚠️  Error checking for duplicates: {e}")
+        existing = set()
+
+    stats_lock = threading.Lock()
+
+    def on_insert(request_id, response, exception):
+        # Callbacks fire from worker threads, one per in-flight batch
+        with stats_lock:
+            if exception is not None:
+                print(f"  ❌ Talk {request_id}: Error creating event - {exception}")
+                stats['errors'] += 1
             else:
-                error_count += 1
+                print(f"     ✓ Talk {request_id}: Event created: {response.get('htmlLink', 'N/A')}")
+                stats['created'] += 1
+
+    # Queue inserts for new talks into batches of BATCH_SIZE
+    batches = []
+    batch_sizes = []
+
+    for i, talk, talk_date in valid_talks:
+        try:
+            first_name, last_name = talk.first_name, talk.last_name
+            key = (f"{first_name} {last_name} Talk", f"{year}-{talk.month:02d}-{talk.day:02d}")
+
+            if key in existing:
+                print(f"  ↻ Talk {i}: Already exists - {first_name} {last_name} on {talk_date.month}/{talk_date.day}")
+                stats['duplicates'] += 1
+                continue
+
+            if not batches or batch_sizes[-1] == BATCH_SIZE:
+                batches.append(service.new_batch_http_request(callback=on_insert))
+                batch_sizes.append(0)
+
+            print(f"  ➕ Talk {i}: Creating event - {first_name} {last_name} on {talk_date.month}/{talk_date.day} at {talk.hour}:{talk.minute:02d}")
+            batches[-1].add(
+                service.events().insert(calendarId=CALENDAR_ID, body=build_event_body(talk)),
+                request_id=str(i)
+            )
+            # Same talk repeated later in the CSV is a duplicate of this one
+            existing.add(key)
+            batch_sizes[-1] += 1
 
         except Exception as e:
             print(f"  ❌ Talk {i}: Error processing - {e}")
-            error_count += 1
+            stats['errors'] += 1
 
-    # Summary
-    print(f"\n📊 Summary:")
-    print(f"  ✅ New events created: {new_events_count}")
-    print(f"  ↻ Duplicates skipped: {duplicate_count}")
-    print(f"  ❌ Errors/incomplete: {error_count}")
+    # Send all batches concurrently
+    if batches:
+        results = asyncio.run(execute_batches(credentials, batches))
+        for size, result in zip(batch_sizes, results):
+            if isinstance(result, Exception):
+                print(f"  ❌ Error sending batch: {result}")
+                stats['errors'] += size
+
+    print_summary(stats)
 
-    return new_events_count
+    return stats['created']
 
 
 if __name__ == "__main__":
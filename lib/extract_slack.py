@@ -7,11 +7,15 @@ Uses Gemini AI to extract talk/seminar information from Slack messages
 import os
 import csv
 import re
-import time
+import asyncio
+import hashlib
+import sqlite3
+import threading
 from pathlib import Path
+import httpx
 from dotenv import load_dotenv
 from google import genai
-from google.genai.types import GenerateContentConfig
+from google.genai.types import GenerateContentConfig, HttpOptions
 from pydantic import BaseModel
 
 # Load environment variables
@@ -22,12 +26,37 @@ MAX_RETRIES = 5
 INITIAL_RETRY_DELAY = 1  # seconds
 MAX_RETRY_DELAY = 32  # seconds
 
-# Initialize Gemini client
+# Concurrency configuration
+MAX_CONCURRENT_REQUESTS = 16  # Max in-flight Gemini requests
+MAX_CONNECTIONS = 32  # Pooled keep-alive connections to the Gemini API
+
+# Extraction cache: sha256(channel + message) -> MessageAnalysis JSON
+GEMINI_CACHE_FILE = Path(__file__).parent.parent / 'cache' / 'gemini_kv.sqlite'
+_cache_conn = None
+_cache_lock = threading.Lock()
+
+# URLs end at whitespace, quotes, or Slack's <url|label> delimiters
+URL_RE = re.compile(r'https?://[^\s<>"\'|]+')
+
+# CSV columns
+SLACK_FIELDS = [
+    'workspace', 'channel_name', 'channel_type', 'user_name', 'time',
+    'message', 'file_paths'
+]
+GEMINI_FIELDS = [
+    'gemini_is_talk', 'gemini_presenter_first_name', 'gemini_presenter_last_name',
+    'gemini_month', 'gemini_day', 'gemini_hour', 'gemini_minute', 'gemini_location',
+    'gemini_lunch_provided', 'gemini_short_description', 'gemini_category'
+]
+# Gemini column values for a message with no talks (same order as GEMINI_FIELDS)
+EMPTY_GEMINI_VALUES = [False, '', '', 0, 0, 0, 0, '', False, '', '']
+
+# Columns identifying a message when resuming an interrupted run
+RESUME_KEY_FIELDS = ['workspace', 'channel_name', 'time', 'message']
+
+# Gemini API key (the client is created per run, inside the event loop)
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if GEMINI_API_KEY:
-    genai_client = genai.Client(api_key=GEMINI_API_KEY)
-else:
-    genai_client = None
+if not GEMINI_API_KEY:
     print("⚠️  GEMINI_API_KEY not found - talk extraction will be skipped")
 
 
@@ -49,26 +78,209 @@ class MessageAnalysis(BaseModel):
     talks: list[TalkInfo]  # List of talks found in the message (can be empty)
 
 
+# Minimal schema for the cheap screening pass
+class TalkHeader(BaseModel):
+    is_talk: bool
+    presenter_first_name: str
+    presenter_last_name: str
+    month: int  # 1-12
+    day: int    # 1-31
+
+
+class MessageScreen(BaseModel):
+    talks: list[TalkHeader]
+
+
+# Models: a lite model screens every message, the full model only confirmed talks
+SCREEN_MODEL = "gemini-2.5-flash-lite"
+EXTRACT_MODEL = "gemini-2.5-flash"
+
+# Request configs are immutable, so build them once rather than per call
+SCREEN_CONFIG = GenerateContentConfig(
+    response_mime_type="application/json",
+    response_schema=MessageScreen,
+)
+GEMINI_CONFIG = GenerateContentConfig(
+    response_mime_type="application/json",
+    response_schema=MessageAnalysis,
+)
+
+# Substrings identifying rate limit/quota errors
+RATE_LIMIT_TOKENS = ('rate', 'quota', 'resource_exhausted')
+
+
 def extract_urls(text):
     """Extract all URLs from text"""
-    url_pattern = r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'
-    urls = re.findall(url_pattern, text)
-    return urls
+    return URL_RE.findall(text)
+
+
+def _get_cache_conn():
+    """Open the shared extraction cache connection on first use"""
+    global _cache_conn
+    if _cache_conn is None:
+        GEMINI_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        # Shared by all extraction tasks; access is serialized by _cache_lock
+        _cache_conn = sqlite3.connect(GEMINI_CACHE_FILE, check_same_thread=False)
+        _cache_conn.execute("PRAGMA journal_mode=WAL")
+        _cache_conn.execute(
+            "CREATE TABLE IF NOT EXISTS gemini_kv (hash BLOB PRIMARY KEY, json TEXT NOT NULL)"
+        )
+    return _cache_conn
+
+
+def _cache_key(message_text, channel_name, kind=''):
+    """Content hash identifying an extraction request ('' for full, 'screen' for screening)"""
+    prefix = f"{kind}\0" if kind else ''
+    return hashlib.sha256(f"{prefix}{channel_name}\0{message_text}".encode('utf-8')).digest()
+
+
+def get_cached_analysis(message_text, channel_name, model=None, kind=''):
+    """
+    Look up a previous Gemini result for this message.
 
+    Args:
+        message_text: Slack message text
+        channel_name: Channel the message was posted in
+        model: Pydantic model to parse the cached JSON into (default MessageAnalysis)
+        kind: Cache namespace ('' for full extractions, 'screen' for screening)
+
+    Returns:
+        Model instance, or None on cache miss
+    """
+    with _cache_lock:
+        row = _get_cache_conn().execute(
+            "SELECT json FROM gemini_kv WHERE hash = ?",
+            (_cache_key(message_text, channel_name, kind),)
+        ).fetchone()
+
+    if row is None:
+        return None
+    return (model or MessageAnalysis).model_validate_json(row[0])
+
+
+def store_cached_analysis(message_text, channel_name, result, kind=''):
+    """Save a Gemini result so identical messages skip the API on later runs"""
+    with _cache_lock:
+        conn = _get_cache_conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO gemini_kv (hash, json) VALUES (?, ?)",
+            (_cache_key(message_text, channel_name, kind), result.model_dump_json())
+        )
+        conn.commit()
 
-def extract_talk_info_with_gemini(message_text, channel_name):
+
+async def generate_with_retry(genai_client, model, prompt, config):
+    """
+    Call Gemini with retry logic and exponential backoff.
+
+    Returns:
+        Parsed structured response, or None if all attempts fail
+    """
+    retry_delay = INITIAL_RETRY_DELAY
+    last_error = None
+
+    for attempt in range(MAX_RETRIES):
+        try:
+            response = await genai_client.aio.models.generate_content(
+                model=model,
+                contents=prompt,
+                config=config
+            )
+
+            # Parse structured response
+            return response.parsed
+
+        except Exception as e:
+            last_error = e
+            error_str = str(e).lower()
+
+            # Check if it's a rate limit error or transient error
+            if any(token in error_str for token in RATE_LIMIT_TOKENS):
+                if attempt < MAX_RETRIES - 1:
+                    print(f"\n  ⚠️  Rate limit/quota error (attempt {attempt + 1}/{MAX_RETRIES}), retrying in {retry_delay}s...")
+                    await asyncio.sleep(retry_delay)
+                    retry_delay = min(retry_delay * 2, MAX_RETRY_DELAY)  # Exponential backoff
+                    continue
+                else:
+                    print(f"\n  ❌ Rate limit exceeded after {MAX_RETRIES} attempts")
+                    return None
+
+            # For other errors, retry with shorter delay
+            elif attempt < MAX_RETRIES - 1:
+                print(f"\n  ⚠️  Gemini error (attempt {attempt + 1}/{MAX_RETRIES}): {e}, retrying in {retry_delay}s...")
+                await asyncio.sleep(retry_delay)
+                retry_delay = min(retry_delay * 2, MAX_RETRY_DELAY)
+                continue
+            else:
+                print(f"\n  ❌ Gemini extraction failed after {MAX_RETRIES} attempts: {e}")
+                return None
+
+    print(f"\n  ❌ Gemini extraction failed after {MAX_RETRIES} attempts: {last_error}")
+    return None
+
+
+async def screen_message(message_text, channel_name, genai_client):
+    """
+    Cheap first pass: ask the lite model only whether the message announces a
+    talk with a named presenter.
+
+    Returns:
+        True if the full extraction should run (also when screening fails)
+    """
+    screen = get_cached_analysis(message_text, channel_name, model=MessageScreen, kind='screen')
+
+    if screen is None:
+        prompt = f"""
+You are screening Slack messages from the channel "#{channel_name}" for academic talks/seminars.
+
+Message text:
+{message_text}
+
+For EACH talk/seminar/colloquium mentioned, return is_talk, presenter_first_name, presenter_last_name,
+month (1-12, 0 if not found) and day (1-31, 0 if not found). Use empty strings for missing names.
+Return a JSON object with a "talks" array. If the message announces no talks, return an empty array.
+"""
+        screen = await generate_with_retry(genai_client, SCREEN_MODEL, prompt, SCREEN_CONFIG)
+        if screen is None:
+            return True
+        store_cached_analysis(message_text, channel_name, screen, kind='screen')
+
+    return any(
+        talk.is_talk and talk.presenter_first_name and talk.presenter_last_name
+        for talk in screen.talks
+    )
+
+
+async def extract_talk_info_with_gemini(message_text, channel_name, genai_client):
     """
     Use Gemini to extract talk information from message text.
     Gemini will fetch content from URLs automatically.
     A single message may contain multiple talks.
-    Implements retry logic with exponential backoff.
+    Messages are first screened with a lite model; only those announcing a
+    talk with a named presenter get the full extraction.
+    Successful extractions are cached by message content.
+
+    Args:
+        message_text: Slack message text
+        channel_name: Channel the message was posted in
+        genai_client: genai.Client shared by all extractions, or None
 
     Returns:
         MessageAnalysis object with list of talks, or None if extraction fails
     """
+    cached = get_cached_analysis(message_text, channel_name)
+    if cached is not None:
+        return cached
+
     if not genai_client:
         return None
 
+    # Skip the full extraction for messages the lite model finds no talks in
+    if not await screen_message(message_text, channel_name, genai_client):
+        message_analysis = MessageAnalysis(talks=[])
+        store_cached_analysis(message_text, channel_name, message_analysis)
+        return message_analysis
+
     # Extract URLs from message
     urls = extract_urls(message_text)
 
@@ -101,62 +313,108 @@ For EACH talk/seminar/colloquium mentioned in the message, extract the following
 Return a JSON object with a "talks" array containing all talk objects found. If no talks are found, return an empty array.
 """
 
-    # Retry with exponential backoff
-    retry_delay = INITIAL_RETRY_DELAY
-    last_error = None
+    message_analysis = await generate_with_retry(genai_client, EXTRACT_MODEL, prompt, GEMINI_CONFIG)
+    if message_analysis is not None:
+        store_cached_analysis(message_text, channel_name, message_analysis)
+    return message_analysis
 
-    for attempt in range(MAX_RETRIES):
+
+async def _extract_bounded(semaphore, genai_client, index, message_text, channel_name,
+                           on_result, progress, total):
+    """Run a single Gemini extraction, bounded by semaphore"""
+    async with semaphore:
         try:
-            # Call Gemini with URL fetching enabled
-            tools = [{"url_context": {}}]
+            result = await extract_talk_info_with_gemini(message_text, channel_name, genai_client)
+        except Exception as e:
+            result = e
 
-            response = genai_client.models.generate_content(
-                model="gemini-2.5-flash",
-                contents=prompt,
-                config=GenerateContentConfig(
-                    response_mime_type="application/json",
-                    response_schema=MessageAnalysis,
-                    #tools=tools,
-                )
+    on_result(index, result)
+
+    progress['done'] += 1
+    if progress['done'] % 10 == 0:
+        print(f"  Processed {progress['done']}/{total} messages...")
+
+
+async def extract_all_talks(messages, channel_names, on_result):
+    """
+    Extract talk information for all messages concurrently.
+
+    Args:
+        messages: List of message texts
+        channel_names: List of channel names aligned with messages
+        on_result: Called as on_result(index, result) as each extraction finishes;
+            result is a MessageAnalysis, None, or the Exception raised
+    """
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    progress = {'done': 0}
+
+    # One pooled HTTP client bound to this event loop, so connections (and TLS
+    # sessions) are reused across every request in the run
+    limits = httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS)
+    async with httpx.AsyncClient(limits=limits) as http_client:
+        genai_client = None
+        if GEMINI_API_KEY:
+            genai_client = genai.Client(
+                api_key=GEMINI_API_KEY,
+                http_options=HttpOptions(httpx_async_client=http_client)
             )
 
-            # Parse structured response
-            message_analysis: MessageAnalysis = response.parsed
-            return message_analysis
+        tasks = [
+            asyncio.create_task(
+                _extract_bounded(semaphore, genai_client, index, message_text, channel_name,
+                                 on_result, progress, len(messages))
+            )
+            for index, (message_text, channel_name) in enumerate(zip(messages, channel_names))
+        ]
+        await asyncio.gather(*tasks)
 
-        except Exception as e:
-            last_error = e
-            error_str = str(e).lower()
 
-            # Check if it's a rate limit error or transient error
-            if 'rate' in error_str or 'quota' in error_str or 'resource_exhausted' in error_str:
-                if attempt < MAX_RETRIES - 1:
-                    print(f"\n  ⚠️  Rate limit/quota error (attempt {attempt + 1}/{MAX_RETRIES}), retrying in {retry_delay}s...")
-                    time.sleep(retry_delay)
-                    retry_delay = min(retry_delay * 2, MAX_RETRY_DELAY)  # Exponential backoff
-                    continue
-                else:
-                    print(f"\n  ❌ Rate limit exceeded after {MAX_RETRIES} attempts")
-                    return None
+def build_output_rows(row, message_analysis):
+    """
+    Build output CSV rows for one input row.
 
-            # For other errors, retry with shorter delay
-            elif attempt < MAX_RETRIES - 1:
-                print(f"\n  ⚠️  Gemini error (attempt {attempt + 1}/{MAX_RETRIES}): {e}, retrying in {retry_delay}s...")
-                time.sleep(retry_delay)
-                retry_delay = min(retry_delay * 2, MAX_RETRY_DELAY)
-                continue
-            else:
-                print(f"\n  ❌ Gemini extraction failed after {MAX_RETRIES} attempts: {e}")
-                return None
+    Args:
+        row: Input CSV row as a list of values
+        message_analysis: MessageAnalysis for the row, or None
 
-    print(f"\n  ❌ Gemini extraction failed after {MAX_RETRIES} attempts: {last_error}")
-    return None
+    Returns:
+        List of output rows; one per talk found, or a single row with empty
+        Gemini fields if no talks were found
+    """
+    output_rows = []
+
+    # Process each talk found in the message
+    if message_analysis and message_analysis.talks:
+        # Multiple talks may exist in one message
+        for talk in message_analysis.talks:
+            # Same order as GEMINI_FIELDS
+            output_rows.append(row + [
+                True,
+                talk.presenter_first_name,
+                talk.presenter_last_name,
+                talk.month,
+                talk.day,
+                talk.hour,
+                talk.minute,
+                talk.location,
+                talk.lunch_provided,
+                talk.short_description,
+                talk.category
+            ])
+    else:
+        # No talks found - create one row with empty fields
+        output_rows.append(row + EMPTY_GEMINI_VALUES)
+
+    return output_rows
 
 
 def main(slack_path: str, overwrite: bool = False) -> str:
     """
     Extract talk information from Slack messages CSV using Gemini.
 
+    Rows are written to a .partial file as they complete, so an interrupted
+    run resumes from where it stopped instead of re-extracting every message.
+
     Args:
         slack_path: Path to the input CSV from scrape_workspaces
         overwrite: If True, overwrite existing output file
@@ -182,6 +440,7 @@ def main(slack_path: str, overwrite: bool = False) -> str:
     cache_dir = repo_root / 'cache'
     cache_dir.mkdir(parents=True, exist_ok=True)
     output_filename = cache_dir / f"gemini_from_{dt_start_str}_{dt_end_str}.csv"
+    partial_filename = output_filename.with_name(output_filename.name + '.partial')
 
     # Check if output exists
     if output_filename.exists() and not overwrite:
@@ -193,121 +452,93 @@ def main(slack_path: str, overwrite: bool = False) -> str:
     else:
         print(f"➜ Creating new cache: {output_filename}")
 
+    if overwrite and partial_filename.exists():
+        partial_filename.unlink()
+
     print(f"\n🤖 Gemini Talk Extractor")
     print(f"📄 Input file: {slack_path}")
     print(f"📄 Output file: {output_filename}")
     print(f"🤖 Processing messages with Gemini AI...")
 
-    # Read input CSV
-    with open(slack_path, 'r', encoding='utf-8') as infile:
-        reader = csv.DictReader(infile)
+    # Read input CSV positionally (one list per row rather than a dict per row)
+    with open(slack_path, 'r', newline='', encoding='utf-8') as infile:
+        reader = csv.reader(infile)
+        header = next(reader, SLACK_FIELDS)
         input_rows = list(reader)
 
     print(f"Found {len(input_rows)} messages to process")
 
-    # Process each row and add Gemini columns
-    # Note: One input row may generate multiple output rows if multiple talks found
-    output_rows = []
-    processed_count = 0
+    if not input_rows:
+        print("⚠️  No messages to process - creating empty output file")
 
-    for i, row in enumerate(input_rows, 1):
-        try:
-            message_text = row['message']
-            channel_name = row['channel_name']
-
-            # Extract talk information with Gemini
-            message_analysis = extract_talk_info_with_gemini(message_text, channel_name)
-
-            # Process each talk found in the message
-            if message_analysis and message_analysis.talks:
-                # Multiple talks may exist in one message
-                for talk in message_analysis.talks:
-                    gemini_data = {
-                        'gemini_is_talk': True,
-                        'gemini_presenter_first_name': talk.presenter_first_name,
-                        'gemini_presenter_last_name': talk.presenter_last_name,
-                        'gemini_month': talk.month,
-                        'gemini_day': talk.day,
-                        'gemini_hour': talk.hour,
-                        'gemini_minute': talk.minute,
-                        'gemini_location': talk.location,
-                        'gemini_lunch_provided': talk.lunch_provided,
-                        'gemini_short_description': talk.short_description,
-                        'gemini_category': talk.category
-                    }
-
-                    # Combine original row with Gemini data for this talk
-                    output_row = {**row, **gemini_data}
-                    output_rows.append(output_row)
+    # Only the message and channel columns are needed for extraction
+    message_col = header.index('message')
+    channel_col = header.index('channel_name')
+    key_cols = [header.index(name) for name in RESUME_KEY_FIELDS]
+    output_header = header + GEMINI_FIELDS
+
+    # Resume from a partial output left by an interrupted run
+    done_keys = set()
+    if partial_filename.exists():
+        with open(partial_filename, 'r', newline='', encoding='utf-8') as partial:
+            reader = csv.reader(partial)
+            if next(reader, None) == output_header:
+                done_keys = {tuple(row[c] for c in key_cols) for row in reader}
             else:
-                # No talks found - create one row with empty fields
-                gemini_data = {
-                    'gemini_is_talk': False,
-                    'gemini_presenter_first_name': '',
-                    'gemini_presenter_last_name': '',
-                    'gemini_month': 0,
-                    'gemini_day': 0,
-                    'gemini_hour': 0,
-                    'gemini_minute': 0,
-                    'gemini_location': '',
-                    'gemini_lunch_provided': False,
-                    'gemini_short_description': '',
-                    'gemini_category': ''
-                }
-                output_row = {**row, **gemini_data}
-                output_rows.append(output_row)
-
-            processed_count += 1
-            if processed_count % 10 == 0:
-                print(f"  Processed {processed_count}/{len(input_rows)} messages...")
+                print(f"⚠️  Ignoring partial output with a different header: {partial_filename}")
+                partial_filename.unlink()
 
-        except Exception as e:
-            print(f"\n  ⚠️  Error processing row {i}: {e}")
-            # Add row with empty Gemini fields
-            gemini_data = {
-                'gemini_is_talk': False,
-                'gemini_presenter_first_name': '',
-                'gemini_presenter_last_name': '',
-                'gemini_month': 0,
-                'gemini_day': 0,
-                'gemini_hour': 0,
-                'gemini_minute': 0,
-                'gemini_location': '',
-                'gemini_lunch_provided': False,
-                'gemini_short_description': '',
-                'gemini_category': ''
-            }
-            output_row = {**row, **gemini_data}
-            output_rows.append(output_row)
-
-    # Write output CSV
-    if output_rows:
-        with open(output_filename, 'w', newline='', encoding='utf-8') as outfile:
-            fieldnames = list(output_rows[0].keys())
-            writer = csv.DictWriter(outfile, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(output_rows)
+    pending_rows = [row for row in input_rows if tuple(row[c] for c in key_cols) not in done_keys]
+    if done_keys:
+        print(f"↻ Resuming: {len(input_rows) - len(pending_rows)} message(s) already extracted")
+
+    messages = [row[message_col] for row in pending_rows]
+    channel_names = [row[channel_col] for row in pending_rows]
+
+    stats = {'processed': 0, 'talks': 0}
+
+    with open(partial_filename, 'a', newline='', encoding='utf-8') as outfile:
+        writer = csv.writer(outfile)
+        if not done_keys:
+            writer.writerow(output_header)
+
+        # Results arrive out of order; buffer them so rows are written in input order
+        buffered = {}
+        next_index = 0
+
+        def on_result(index, message_analysis):
+            nonlocal next_index
+            buffered[index] = message_analysis
 
+            while next_index in buffered:
+                message_analysis = buffered.pop(next_index)
+                row = pending_rows[next_index]
+                next_index += 1
+
+                # Process each row and add Gemini columns
+                # Note: One input row may generate multiple output rows if multiple talks found
+                if isinstance(message_analysis, Exception):
+                    print(f"\n  ⚠️  Error processing row {next_index}: {message_analysis}")
+                    output_rows = build_output_rows(row, None)
+                else:
+                    output_rows = build_output_rows(row, message_analysis)
+                    stats['processed'] += 1
+                    if message_analysis:
+                        stats['talks'] += len(message_analysis.talks)
+
+                writer.writerows(output_rows)
+                outfile.flush()
+
+        # Run Gemini extractions concurrently, writing rows as they complete
+        asyncio.run(extract_all_talks(messages, channel_names, on_result))
+
+    partial_filename.replace(output_filename)
+
+    if input_rows:
         print(f"\n✅ Gemini extraction complete!")
-        print(f"Processed {processed_count} messages")
+        print(f"Processed {stats['processed']} messages")
         print(f"Output saved to: {output_filename}")
-
-        # Count talks found
-        talks_found = sum(1 for row in output_rows if row['gemini_is_talk'])
-        print(f"📊 Found {talks_found} talk(s) in the messages")
-    else:
-        # Create empty CSV with headers when no messages
-        print("⚠️  No messages to process - creating empty output file")
-        with open(output_filename, 'w', newline='', encoding='utf-8') as outfile:
-            fieldnames = [
-                'workspace', 'channel_name', 'channel_type', 'user_name', 'time',
-                'message', 'file_paths', 'gemini_is_talk', 'gemini_presenter_first_name',
-                'gemini_presenter_last_name', 'gemini_month', 'gemini_day', 'gemini_hour',
-                'gemini_minute', 'gemini_location', 'gemini_lunch_provided',
-                'gemini_short_description', 'gemini_category'
-            ]
-            writer = csv.DictWriter(outfile, fieldnames=fieldnames)
-            writer.writeheader()
+        print(f"📊 Found {stats['talks']} talk(s) in the messages")
 
     return str(output_filename)
 
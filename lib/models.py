@@ -3,13 +3,31 @@
 Pydantic models for Slack scraping and event extraction
 """
 
-import json
+import gzip
 from pathlib import Path
-from typing import Literal, Optional, TypeVar, Type
-from pydantic import BaseModel, Field
+from typing import BinaryIO, ClassVar, Iterable, Iterator, Literal, Optional, TypeVar, Type
+from pydantic import BaseModel, Field, TypeAdapter
+from pydantic_core import from_json
 
 T = TypeVar('T', bound=BaseModel)
 
+# gzip level for .jsonl.gz outputs: level 1 already shrinks the repetitive message
+# JSON several-fold while compressing far faster than the default of 9
+JSONL_GZIP_LEVEL = 1
+
+
+def is_jsonl(path: Path) -> bool:
+    """Whether path names a JSONL file, plain or gzip-compressed"""
+    return path.name.endswith(('.jsonl', '.jsonl.gz'))
+
+
+def open_jsonl(path: Path, mode: str) -> BinaryIO:
+    """Open a JSONL file in binary mode ('rb'/'wb'), through gzip when it ends in .gz"""
+    if path.suffix == '.gz':
+        # mtime=0 keeps identical content byte-identical, so run_stages checksums still match
+        return gzip.GzipFile(path, mode, compresslevel=JSONL_GZIP_LEVEL, mtime=0)
+    return open(path, mode, buffering=1 << 20)
+
 
 # ============================================================================
 # Stage 1: Slack Message Schema
@@ -27,25 +45,67 @@ class SlackMessage(BaseModel):
     file_paths: list[str] = Field(default_factory=list)
     permalink: list[str]  # List to support aggregated messages
     original_indices: list[int]  # Row indices from Stage 1 (for traceability)
+    ts_epoch: Optional[float] = None  # Slack ts as unix seconds, for numeric sorting/windowing
 
     @classmethod
     def from_json_file(cls, path: Path) -> list['SlackMessage']:
-        """Load list of SlackMessage from JSON file"""
-        with open(path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        return [cls(**item) for item in data]
+        """
+        Load list of SlackMessage from a JSON array or JSONL (.jsonl/.jsonl.gz) file.
+
+        Args:
+            path: JSON/JSONL file to load
+        """
+        path = Path(path)
+        if is_jsonl(path):
+            return list(cls.iter_json_file(path))
+
+        # Parsed and validated in one pydantic-core pass over the raw bytes (about
+        # twice as fast as model_construct on parsed dicts, so even our own files
+        # go through validation)
+        return SLACK_MESSAGE_LIST.validate_json(path.read_bytes())
+
+    @classmethod
+    def iter_json_file(cls, path: Path) -> Iterator['SlackMessage']:
+        """
+        Yield SlackMessage one at a time from a JSONL file (JSON arrays are loaded whole).
+
+        Args:
+            path: JSON/JSONL file to load
+        """
+        path = Path(path)
+        if not is_jsonl(path):
+            yield from cls.from_json_file(path)
+            return
+
+        # One message per line, parsed as it is read; each line is validated
+        # straight from bytes by the module-level adapter
+        with open_jsonl(path, 'rb') as f:
+            validate_json = SLACK_MESSAGE.validate_json
+            for line in f:
+                if line.strip():
+                    yield validate_json(line)
 
     @staticmethod
     def to_json_file(messages: list['SlackMessage'], path: Path):
-        """Save list of SlackMessage to JSON file"""
+        """Save list of SlackMessage to a JSON array, or JSONL if path ends in .jsonl (.jsonl.gz to compress)"""
         path.parent.mkdir(parents=True, exist_ok=True)
-        with open(path, 'w', encoding='utf-8') as f:
-            json.dump(
-                [msg.model_dump() for msg in messages],
-                f,
-                indent=2,
-                ensure_ascii=False
-            )
+        if is_jsonl(path):
+            with open_jsonl(path, 'wb') as f:
+                SlackMessage.write_json_lines(messages, f)
+            return
+        # Serialized in pydantic-core without an intermediate list of dicts
+        path.write_bytes(SLACK_MESSAGE_LIST.dump_json(messages, indent=2))
+
+    @staticmethod
+    def write_json_lines(messages: Iterable['SlackMessage'], f: BinaryIO):
+        """Append SlackMessage to an open binary JSONL file, one compact line each"""
+        # Streamed from a generator, never holding the whole document or any intermediate dicts
+        dump_json = SLACK_MESSAGE.dump_json
+        f.writelines(dump_json(msg) + b'\n' for msg in messages)
+
+
+SLACK_MESSAGE = TypeAdapter(SlackMessage)
+SLACK_MESSAGE_LIST = TypeAdapter(list[SlackMessage])
 
 
 # ============================================================================
@@ -54,6 +114,9 @@ class SlackMessage(BaseModel):
 
 class PhysicalTalkInfo(BaseModel):
     """Physical talk event"""
+    is_talk: ClassVar[bool] = True
+    is_physical: ClassVar[bool] = True
+
     first_name: str = Field(description="Lowercase first name")
     last_name: Optional[str] = Field(default=None, description="Lowercase last name")
     talk_date: str = Field(description="YYYY-MM-DDTHH:MM, use '_' for unknown parts")
@@ -65,6 +128,9 @@ class PhysicalTalkInfo(BaseModel):
 
 class VirtualTalkInfo(BaseModel):
     """Virtual talk event"""
+    is_talk: ClassVar[bool] = True
+    is_physical: ClassVar[bool] = False
+
     first_name: str = Field(description="Lowercase first name")
     last_name: Optional[str] = Field(default=None, description="Lowercase last name")
     talk_date: str = Field(description="YYYY-MM-DDTHH:MM, use '_' for unknown parts")
@@ -75,6 +141,9 @@ class VirtualTalkInfo(BaseModel):
 
 class PhysicalEventInfo(BaseModel):
     """Physical event (non-talk)"""
+    is_talk: ClassVar[bool] = False
+    is_physical: ClassVar[bool] = True
+
     simple_event_name: str = Field(description="Lowercase event name")
     event_date: str = Field(description="YYYY-MM-DDTHH:MM, use '_' for unknown parts")
     location: str = Field(description="Physical location")
@@ -89,6 +158,9 @@ class PhysicalEventInfo(BaseModel):
 
 class VirtualEventInfo(BaseModel):
     """Virtual event (non-talk)"""
+    is_talk: ClassVar[bool] = False
+    is_physical: ClassVar[bool] = False
+
     simple_event_name: str = Field(description="Lowercase event name")
     event_date: str = Field(description="YYYY-MM-DDTHH:MM, use '_' for unknown parts")
     virtual_link: str = Field(description="Link to the virtual event")
@@ -110,18 +182,30 @@ class MessageExtract(BaseModel):
     @classmethod
     def from_json_file(cls, path: Path) -> list['MessageExtract']:
         """Load list of MessageExtract from JSON file"""
-        with open(path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        return [cls(**item) for item in data]
+        # Parsed first: the event union validates faster from Python objects than from JSON
+        return MESSAGE_EXTRACT_LIST.validate_python(from_json(Path(path).read_bytes()))
 
     @staticmethod
     def to_json_file(extracts: list['MessageExtract'], path: Path):
         """Save list of MessageExtract to JSON file"""
         path.parent.mkdir(parents=True, exist_ok=True)
-        with open(path, 'w', encoding='utf-8') as f:
-            json.dump(
-                [extract.model_dump() for extract in extracts],
-                f,
-                indent=2,
-                ensure_ascii=False
-            )
+        # Serialized in pydantic-core without an intermediate list of dicts
+        path.write_bytes(MESSAGE_EXTRACT_LIST.dump_json(extracts, indent=2))
+
+
+class NumberedExtract(MessageExtract):
+    """MessageExtract tagged with the [MSG N] block of a batch request it answers"""
+    message_number: int = Field(description="N of the [MSG N] block these events were extracted from")
+
+
+class BatchExtract(BaseModel):
+    """Extraction results for several messages sent in one request"""
+    extracts: list[NumberedExtract] = Field(
+        description="One entry per input message, each tagged with its message number"
+    )
+
+
+# The smart-mode event union validates about 2x faster from parsed Python objects
+# than straight from JSON, so extracts are read with from_json + validate_python
+MESSAGE_EXTRACT = TypeAdapter(MessageExtract)
+MESSAGE_EXTRACT_LIST = TypeAdapter(list[MessageExtract])
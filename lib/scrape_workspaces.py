@@ -5,13 +5,24 @@ Fetches messages from Slack workspaces and saves to CSV cache
 """
 
 import os
+import re
 import csv
+import json
+import shutil
+import time
+import threading
 import requests
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime, timedelta
+from operator import itemgetter
 from pathlib import Path
 from dotenv import load_dotenv
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
+from slack_sdk.http_retry import ConnectionErrorRetryHandler, RateLimitErrorRetryHandler
 from .init_config import SLACK_CONFIG
 
 # Load environment variables from .env file
@@ -20,6 +31,105 @@ load_dotenv()
 # Cache for user names to reduce API calls
 USER_NAME_CACHE = {}
 
+# User names are persisted between runs (cache/user_names.json) and trusted for a week
+USER_NAME_CACHE_TTL = timedelta(days=7).total_seconds()
+USER_NAME_SAVED_AT = {}  # Cache key -> unix time the name was first saved
+
+# Max channels scraped concurrently per workspace
+MAX_CHANNEL_WORKERS = 3
+
+# Slack API pacing (per workspace) and retries on 429/connection errors
+SLACK_REQUESTS_PER_SECOND = 5
+SLACK_MAX_RETRIES = 3
+
+# Max thread-reply fetches in flight per channel
+MAX_REPLY_WORKERS = 3
+
+# Max concurrent file downloads per message
+MAX_DOWNLOAD_WORKERS = 3
+
+# File types worth downloading
+DOWNLOADABLE_FILE_TYPES = {'pdf', 'png', 'jpg', 'jpeg'}
+
+# Repository root, resolved once at import
+_REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Downloaded attachments live under cache/downloads/<workspace>/<channel>
+DOWNLOADS_DIR = _REPO_ROOT / 'cache' / 'downloads'
+CREATED_DOWNLOAD_DIRS = set()
+
+# Downloads up to this size with a known Content-Length are read straight into
+# one preallocated buffer; larger or unsized ones are streamed in 1 MiB blocks
+MAX_BUFFERED_DOWNLOAD = 64 << 20
+
+# Characters stripped from workspace/channel names before using them in paths
+UNSAFE_PATH_RE = re.compile(r'[^\w \-]')
+
+# Bounded caches keyed by Slack file ID: files_info results and local download paths,
+# so a file shared in several messages is looked up and downloaded only once
+FILE_CACHE_SIZE = 1024
+FILES_INFO_CACHE = OrderedDict()
+DOWNLOADED_FILES = OrderedDict()
+FILE_CACHE_LOCK = threading.Lock()
+
+# Messages already fetched this run, keyed by (channel_id, ts), so shared
+# messages resolve locally instead of with another conversations_history call
+MESSAGE_INDEX = {}
+
+# Shared HTTP session so file downloads reuse pooled keep-alive connections
+HTTP_SESSION = requests.Session()
+HTTP_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+))
+
+
+class RateLimiter:
+    """Thread-safe limiter spacing acquisitions evenly at `rate` per second"""
+
+    def __init__(self, rate):
+        self._interval = 1.0 / rate
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until the next request slot is available"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self._interval
+
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+class RateLimitedWebClient(WebClient):
+    """WebClient that paces every API call through a shared RateLimiter"""
+
+    def __init__(self, *args, rate_limiter, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.rate_limiter = rate_limiter
+        # Workspace part of USER_NAME_CACHE keys, sliced once per client
+        self.cache_prefix = self.token[:20]
+
+    def api_call(self, *args, **kwargs):
+        self.rate_limiter.acquire()
+        return super().api_call(*args, **kwargs)
+
+
+def create_slack_client(token):
+    """Create a paced Slack client that retries rate-limit and connection errors"""
+    return RateLimitedWebClient(
+        token=token,
+        rate_limiter=RateLimiter(SLACK_REQUESTS_PER_SECOND),
+        retry_handlers=[
+            RateLimitErrorRetryHandler(max_retry_count=SLACK_MAX_RETRIES),
+            ConnectionErrorRetryHandler(max_retry_count=SLACK_MAX_RETRIES),
+        ]
+    )
+
 
 def get_channels(client, include_external=True):
     """Fetch all accessible channels"""
@@ -57,10 +167,95 @@ def get_channel_type(channel):
         return 'public'
 
 
+def best_user_name(user, user_id):
+    """Pick the best display name from a Slack user object"""
+    return (user.get('profile', {}).get('display_name') or
+            user.get('profile', {}).get('real_name') or
+            user.get('real_name') or
+            user.get('name', user_id))
+
+
+def prewarm_user_cache(client):
+    """
+    Fill USER_NAME_CACHE for every workspace member with paginated users_list calls.
+
+    Turns one users_info request per user into one request per 200 users.
+
+    Returns:
+        Number of users cached
+    """
+    workspace_prefix = client.cache_prefix
+    cursor = None
+    count = 0
+
+    try:
+        while True:
+            response = client.users_list(limit=200, cursor=cursor)
+
+            for user in response.get('members', []):
+                user_id = user['id']
+                USER_NAME_CACHE[f"{workspace_prefix}_{user_id}"] = best_user_name(user, user_id)
+                count += 1
+
+            cursor = response.get('response_metadata', {}).get('next_cursor')
+            if not cursor:
+                break
+
+    except SlackApiError as e:
+        # get_user_name falls back to per-user lookups (and warns about scopes)
+        print(f"  ⚠️  Could not prefetch users: {e.response.get('error', str(e))}")
+
+    return count
+
+
+def load_user_name_cache(cache_file):
+    """
+    Restore user names saved by earlier runs, dropping entries older than the TTL.
+
+    Returns:
+        Number of names restored
+    """
+    if not cache_file.exists():
+        return 0
+
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Ignoring unreadable user name cache: {e}")
+        return 0
+
+    cutoff = time.time() - USER_NAME_CACHE_TTL
+    restored = 0
+    for cache_key, (name, saved_at) in saved.items():
+        if saved_at >= cutoff:
+            USER_NAME_CACHE.setdefault(cache_key, name)
+            USER_NAME_SAVED_AT[cache_key] = saved_at
+            restored += 1
+
+    return restored
+
+
+def save_user_name_cache(cache_file):
+    """Persist resolved user and bot names (not failed lookups or warning flags)"""
+    now = time.time()
+    saved = {
+        cache_key: [name, USER_NAME_SAVED_AT.get(cache_key, now)]
+        for cache_key, name in USER_NAME_CACHE.items()
+        if isinstance(name, str) and not cache_key.startswith('warned_')
+        and name != cache_key.rsplit('_', 1)[-1]
+    }
+
+    tmp_file = cache_file.with_suffix('.tmp')
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(saved, f)
+    os.replace(tmp_file, cache_file)
+
+
 def get_user_name(client, user_id):
     """Get user's display name from user ID with caching"""
     # Return cached name if available
-    cache_key = f"{client.token[:20]}_{user_id}"  # Include workspace in cache key
+    cache_key = f"{client.cache_prefix}_{user_id}"  # Include workspace in cache key
     if cache_key in USER_NAME_CACHE:
         return USER_NAME_CACHE[cache_key]
 
@@ -69,10 +264,7 @@ def get_user_name(client, user_id):
         user = result['user']
 
         # Try to get the best display name
-        name = (user.get('profile', {}).get('display_name') or
-                user.get('profile', {}).get('real_name') or
-                user.get('real_name') or
-                user.get('name', user_id))
+        name = best_user_name(user, user_id)
 
         # Cache the result
         USER_NAME_CACHE[cache_key] = name
@@ -82,7 +274,7 @@ def get_user_name(client, user_id):
         error_msg = e.response.get('error', str(e))
         if error_msg == 'missing_scope':
             # Only warn once per workspace
-            workspace_key = f"warned_{client.token[:20]}"
+            workspace_key = f"warned_{client.cache_prefix}"
             if workspace_key not in USER_NAME_CACHE:
                 print(f"\n  ⚠️  Missing 'users:read' scope - user names will show as IDs")
                 USER_NAME_CACHE[workspace_key] = True
@@ -92,6 +284,84 @@ def get_user_name(client, user_id):
         return user_id
 
 
+def cache_get(cache, key):
+    """Get a value from a bounded file cache, marking it recently used"""
+    with FILE_CACHE_LOCK:
+        if key not in cache:
+            return None
+        cache.move_to_end(key)
+        return cache[key]
+
+
+def cache_put(cache, key, value):
+    """Store a value in a bounded file cache, evicting the least recently used"""
+    with FILE_CACHE_LOCK:
+        cache[key] = value
+        cache.move_to_end(key)
+        if len(cache) > FILE_CACHE_SIZE:
+            cache.popitem(last=False)
+
+
+def resolve_author(client, message):
+    """
+    Resolve a message's author without calling users_info for bots.
+
+    Returns:
+        tuple: (author_id, author_name)
+    """
+    user_id = message.get('user')
+    if user_id:
+        return user_id, get_user_name(client, user_id)
+
+    bot_id = message.get('bot_id')
+    if not bot_id:
+        username = message.get('username', 'Unknown')
+        return username, username
+
+    cache_key = f"{client.cache_prefix}_{bot_id}"
+    if cache_key in USER_NAME_CACHE:
+        return bot_id, USER_NAME_CACHE[cache_key]
+
+    # Bot messages usually carry a display name already
+    name = message.get('username') or message.get('bot_profile', {}).get('name')
+    if not name:
+        try:
+            name = client.bots_info(bot=bot_id)['bot'].get('name') or bot_id
+        except SlackApiError:
+            name = bot_id
+
+    USER_NAME_CACHE[cache_key] = name
+    return bot_id, name
+
+
+def save_response_body(response, file_path):
+    """
+    Write a streamed HTTP response body to file_path.
+
+    Uncompressed bodies of known, moderate size are read with readinto into a
+    single preallocated buffer and written in one call; anything else is
+    copied from the raw stream in 1 MiB blocks.
+    """
+    raw = response.raw
+    content_length = response.headers.get('content-length')
+    encoded = response.headers.get('content-encoding', 'identity') != 'identity'
+
+    with open(file_path, 'wb', buffering=0) as f:
+        if content_length and content_length.isdigit() and not encoded and \
+                int(content_length) <= MAX_BUFFERED_DOWNLOAD:
+            view = memoryview(bytearray(int(content_length)))
+            filled = 0
+            while filled < len(view):
+                n = raw.readinto(view[filled:])
+                if not n:
+                    break
+                filled += n
+            f.write(view[:filled])
+        else:
+            raw.decode_content = True
+            shutil.copyfileobj(raw, f, length=1 << 20)
+
+
 def download_file(file_info, workspace_name, channel_name, client):
     """Download a file from Slack and save it locally using SDK (PDF/PNG/JPG only)"""
     try:
@@ -101,30 +371,41 @@ def download_file(file_info, workspace_name, channel_name, client):
         file_type = file_info.get('filetype', '').lower()
 
         # Only process PDF, PNG, JPG files
-        if file_type not in ['pdf', 'png', 'jpg', 'jpeg']:
+        if file_type not in DOWNLOADABLE_FILE_TYPES:
             return None
 
         if not file_id:
             print(f"\n  ⚠️  No file ID for {file_name}")
             return None
 
+        # Already downloaded (e.g. the same file shared in another message)
+        downloaded_path = cache_get(DOWNLOADED_FILES, file_id)
+        if downloaded_path:
+            return downloaded_path
+
+        # Name files by Slack's upload time so reruns map to the same path
+        uploaded = file_info.get('timestamp') or file_info.get('created')
+        uploaded_dt = datetime.fromtimestamp(int(uploaded)) if uploaded else datetime.now()
+        timestamp = uploaded_dt.strftime('%Y%m%d_%H%M%S')
+
         # Create directory structure in cache
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        safe_channel = "".join(c for c in channel_name if c.isalnum() or c in (' ', '-', '_')).strip()
-        safe_workspace = "".join(c for c in workspace_name if c.isalnum() or c in (' ', '-', '_')).strip()
+        safe_channel = UNSAFE_PATH_RE.sub('', channel_name).strip()
+        safe_workspace = UNSAFE_PATH_RE.sub('', workspace_name).strip()
 
-        # Get repo root
-        repo_root = Path(__file__).parent.parent
-        download_dir = repo_root / 'cache' / 'downloads' / safe_workspace / safe_channel
-        download_dir.mkdir(parents=True, exist_ok=True)
+        download_dir = DOWNLOADS_DIR / safe_workspace / safe_channel
+        if download_dir not in CREATED_DOWNLOAD_DIRS:
+            download_dir.mkdir(parents=True, exist_ok=True)
+            CREATED_DOWNLOAD_DIRS.add(download_dir)
 
         # Create unique filename
         file_path = download_dir / f"{timestamp}_{file_name}"
 
         # Get file info with download URL
         try:
-            file_response = client.files_info(file=file_id)
-            file_data = file_response['file']
+            file_data = cache_get(FILES_INFO_CACHE, file_id)
+            if file_data is None:
+                file_data = client.files_info(file=file_id)['file']
+                cache_put(FILES_INFO_CACHE, file_id, file_data)
 
             # Try different URL fields in order of preference
             file_url = (file_data.get('url_private_download') or
@@ -136,7 +417,7 @@ def download_file(file_info, workspace_name, channel_name, client):
 
             # Download using the client's token
             headers = {'Authorization': f'Bearer {client.token}'}
-            response = requests.get(file_url, headers=headers, stream=True, timeout=30)
+            response = HTTP_SESSION.get(file_url, headers=headers, stream=True, timeout=30)
             response.raise_for_status()
 
             # Check if we got HTML instead of the file
@@ -145,11 +426,7 @@ def download_file(file_info, workspace_name, channel_name, client):
                 print(f"\n  ⚠️  Received HTML for {file_name} - bot may need 'files:read' scope")
                 return None
 
-            # Save file
-            with open(file_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
+            save_response_body(response, file_path)
 
             # Verify file size
             actual_size = os.path.getsize(file_path)
@@ -158,6 +435,7 @@ def download_file(file_info, workspace_name, channel_name, client):
                 os.remove(file_path)
                 return None
 
+            cache_put(DOWNLOADED_FILES, file_id, str(file_path))
             return str(file_path)
 
         except SlackApiError as e:
@@ -173,6 +451,27 @@ def download_file(file_info, workspace_name, channel_name, client):
         return None
 
 
+def download_files(files, workspace_name, channel_name, client):
+    """
+    Download the PDF/PNG/JPG files of a message concurrently.
+
+    Returns:
+        List of (file_info, local_path_or_None) tuples in the original file order
+    """
+    eligible = [f for f in files if f.get('filetype', 'unknown').lower() in DOWNLOADABLE_FILE_TYPES]
+
+    if len(eligible) <= 1:
+        return [(f, download_file(f, workspace_name, channel_name, client)) for f in eligible]
+
+    with ThreadPoolExecutor(max_workers=MAX_DOWNLOAD_WORKERS) as executor:
+        local_paths = list(executor.map(
+            lambda f: download_file(f, workspace_name, channel_name, client),
+            eligible
+        ))
+
+    return list(zip(eligible, local_paths))
+
+
 def fetch_original_message(client, share_attachment):
     """Attempt to fetch the full original message from a share attachment"""
     try:
@@ -183,6 +482,11 @@ def fetch_original_message(client, share_attachment):
         if not channel_id or not message_ts:
             return None
 
+        # Already fetched while scraping its channel
+        cached = MESSAGE_INDEX.get((channel_id, message_ts))
+        if cached is not None:
+            return cached
+
         # Try to fetch the message
         response = client.conversations_history(
             channel=channel_id,
@@ -193,6 +497,7 @@ def fetch_original_message(client, share_attachment):
 
         messages = response.get('messages', [])
         if messages and messages[0].get('ts') == message_ts:
+            MESSAGE_INDEX[(channel_id, message_ts)] = messages[0]
             return messages[0]
 
         return None
@@ -202,7 +507,13 @@ def fetch_original_message(client, share_attachment):
 
 
 def get_messages_from_channel(client, channel_id, oldest_timestamp):
-    """Fetch messages from a specific channel since oldest_timestamp"""
+    """
+    Fetch messages from a specific channel since oldest_timestamp
+
+    Raises:
+        SlackApiError: On any error but not_in_channel, so a failed fetch is
+            never checkpointed as an empty channel
+    """
     try:
         messages = []
         cursor = None
@@ -226,20 +537,31 @@ def get_messages_from_channel(client, channel_id, oldest_timestamp):
         if e.response['error'] == 'not_in_channel':
             # Bot needs to be added to the channel
             return []
-        print(f"  ⚠️  Error fetching messages from channel {channel_id}: {e.response.get('error', str(e))}")
-        return []
+        raise
 
 
 def get_thread_replies(client, channel_id, thread_ts):
-    """Fetch replies to a thread"""
+    """Fetch all replies to a thread"""
     try:
-        response = client.conversations_replies(
-            channel=channel_id,
-            ts=thread_ts,
-            limit=100
-        )
-        # Exclude the parent message (first message)
-        return response['messages'][1:] if len(response['messages']) > 1 else []
+        replies = []
+        cursor = None
+
+        while True:
+            response = client.conversations_replies(
+                channel=channel_id,
+                ts=thread_ts,
+                cursor=cursor,
+                limit=200
+            )
+
+            # Exclude the parent message
+            replies.extend(m for m in response['messages'] if m.get('ts') != thread_ts)
+
+            cursor = response.get('response_metadata', {}).get('next_cursor')
+            if not cursor:
+                break
+
+        return replies
     except SlackApiError as e:
         print(f"  ⚠️  Error fetching thread replies: {e.response.get('error', str(e))}")
         return []
@@ -258,18 +580,11 @@ def format_message_text(message, client, workspace_name, channel_name):
     # Handle files - download them (PDF/PNG/JPG only)
     if 'files' in message:
         file_info_list = []
-        for file in message['files']:
+        for file, local_path in download_files(message['files'], workspace_name, channel_name, client):
             file_name = file.get('name', 'unnamed_file')
             file_type = file.get('filetype', 'unknown').lower()
             file_size = file.get('size', 0)
 
-            # Only process PDF, PNG, JPG files
-            if file_type not in ['pdf', 'png', 'jpg', 'jpeg']:
-                continue
-
-            # Download the file
-            local_path = download_file(file, workspace_name, channel_name, client)
-
             if local_path:
                 file_paths.append(local_path)
                 size_kb = file_size / 1024 if file_size else 0
@@ -290,8 +605,7 @@ def format_message_text(message, client, workspace_name, channel_name):
 
                 if original_message:
                     # Successfully fetched original - format it fully
-                    original_user_id = original_message.get('user', 'Unknown')
-                    original_user = get_user_name(client, original_user_id)
+                    _, original_user = resolve_author(client, original_message)
                     original_text = original_message.get('text', '')
                     original_channel = attachment.get('channel_name', 'unknown')
                     original_ts = datetime.fromtimestamp(float(attachment.get('ts', 0))).strftime('%Y-%m-%d %H:%M:%S')
@@ -300,15 +614,11 @@ def format_message_text(message, client, workspace_name, channel_name):
 
                     # If original message has files, download them too (PDF/PNG/JPG only)
                     if 'files' in original_message:
-                        for file in original_message['files']:
+                        downloads = download_files(original_message['files'], workspace_name, channel_name, client)
+                        for file, local_path in downloads:
                             file_name = file.get('name', 'unnamed_file')
                             file_type = file.get('filetype', 'unknown').lower()
 
-                            # Only process PDF, PNG, JPG files
-                            if file_type not in ['pdf', 'png', 'jpg', 'jpeg']:
-                                continue
-
-                            local_path = download_file(file, workspace_name, channel_name, client)
                             if local_path:
                                 file_paths.append(local_path)
                                 text += f" [Original message file: {file_name} ({file_type}) -> {local_path}]"
@@ -340,29 +650,46 @@ def aggregate_messages(messages_data):
     Aggregate consecutive messages from the same user within 1 minute.
 
     Args:
-        messages_data: List of dicts with keys: user_id, user_name, timestamp, text, file_paths
+        messages_data: List of dicts with keys: user_id, user_name, ts, timestamp, text, file_paths.
+            Sorted in place by timestamp.
 
     Returns:
-        List of aggregated message dicts
+        List of aggregated message dicts, with 'time_str' and 'file_paths_str'
+        already formatted for the CSV
     """
     if not messages_data:
         return []
 
-    # Sort by timestamp to ensure chronological order
-    sorted_messages = sorted(messages_data, key=lambda x: x['timestamp'])
+    def finish_group(group):
+        # Format CSV fields once per group, when the group is closed
+        return {
+            'user_name': group['user_name'],
+            'ts': group['ts'],
+            'timestamp': group['timestamp'],
+            'time_str': datetime.fromtimestamp(group['timestamp']).strftime('%Y-%m-%d %H:%M:%S'),
+            'text': '\n'.join(group['texts']),
+            'file_paths_str': '; '.join(group['file_paths'])
+        }
+
+    # Sort by timestamp to ensure chronological order (in place, no copy)
+    messages_data.sort(key=itemgetter('timestamp'))
+
+    # Each group takes ownership of its first message's file_paths list and extends
+    # it in place; callers must not reuse messages_data after aggregation
 
     aggregated = []
     current_group = None
 
-    for msg in sorted_messages:
+    for msg in messages_data:
         if current_group is None:
             # Start new group
             current_group = {
                 'user_id': msg['user_id'],
                 'user_name': msg['user_name'],
+                'ts': msg['ts'],
                 'timestamp': msg['timestamp'],
                 'texts': [msg['text']],
-                'file_paths': msg['file_paths'].copy()
+                'file_paths': msg['file_paths']
             }
         elif (current_group['user_id'] == msg['user_id'] and
               abs(msg['timestamp'] - current_group['timestamp']) <= 60):
@@ -371,33 +698,40 @@ def aggregate_messages(messages_data):
             current_group['file_paths'].extend(msg['file_paths'])
         else:
             # Different user or more than 1 minute apart - save current group and start new
-            aggregated.append({
-                'user_name': current_group['user_name'],
-                'timestamp': current_group['timestamp'],
-                'text': '\n'.join(current_group['texts']),
-                'file_paths': current_group['file_paths']
-            })
+            aggregated.append(finish_group(current_group))
 
             current_group = {
                 'user_id': msg['user_id'],
                 'user_name': msg['user_name'],
+                'ts': msg['ts'],
                 'timestamp': msg['timestamp'],
                 'texts': [msg['text']],
-                'file_paths': msg['file_paths'].copy()
+                'file_paths': msg['file_paths']
             }
 
     # Don't forget the last group
     if current_group:
-        aggregated.append({
-            'user_name': current_group['user_name'],
-            'timestamp': current_group['timestamp'],
-            'text': '\n'.join(current_group['texts']),
-            'file_paths': current_group['file_paths']
-        })
+        aggregated.append(finish_group(current_group))
 
     return aggregated
 
 
+def get_team_domain(client):
+    """Get the workspace's Slack subdomain, or None if team.info is not permitted"""
+    try:
+        return client.team_info()['team']['domain']
+    except (SlackApiError, KeyError) as e:
+        print(f"  ⚠️  Could not fetch team domain - falling back to permalink API: {e}")
+        return None
+
+
+def build_message_permalink(client, team_domain, channel_id, message_ts):
+    """Build a message permalink locally, using the API only when the domain is unknown"""
+    if team_domain:
+        return f"https://{team_domain}.slack.com/archives/{channel_id}/p{message_ts.replace('.', '')}"
+    return get_message_permalink(client, channel_id, message_ts)
+
+
 def get_message_permalink(client, channel_id, message_ts):
     """Get permalink for a Slack message using API"""
     try:
@@ -411,8 +745,145 @@ def get_message_permalink(client, channel_id, message_ts):
         return ""
 
 
-def scrape_workspace(workspace_config, csv_writer, start_timestamp):
-    """Scrape messages from a single workspace and write to CSV"""
+def scrape_channel(client, channel, workspace_name, start_timestamp, team_domain=None):
+    """
+    Scrape one channel and build its CSV rows.
+
+    Args:
+        client: Slack WebClient for the workspace
+        channel: Channel dict from conversations_list
+        workspace_name: Name of the workspace
+        start_timestamp: Unix timestamp for start of time range
+        team_domain: Workspace subdomain for building permalinks locally
+
+    Returns:
+        tuple: (list_of_csv_rows, number_of_messages_before_aggregation)
+    """
+    channel_id = channel['id']
+    channel_name = channel.get('name', channel_id)
+    channel_type = get_channel_type(channel)
+
+    # Fetch messages from the time range
+    messages = get_messages_from_channel(client, channel_id, start_timestamp)
+
+    if not messages:
+        return [], 0
+
+    for message in messages:
+        MESSAGE_INDEX[(channel_id, message['ts'])] = message
+
+    # Fetch all thread replies for the channel concurrently
+    thread_parents = [
+        message.get('thread_ts') or message.get('ts')
+        for message in messages
+        if message.get('reply_count', 0) > 0
+    ]
+    with ThreadPoolExecutor(max_workers=MAX_REPLY_WORKERS) as executor:
+        replies_by_ts = dict(zip(thread_parents, executor.map(
+            lambda thread_ts: get_thread_replies(client, channel_id, thread_ts),
+            thread_parents
+        )))
+
+    # Collect all messages first (including thread replies)
+    all_messages_data = []
+
+    for message in messages:
+        message_text, file_paths = format_message_text(message, client, workspace_name, channel_name)
+        user, user_name = resolve_author(client, message)
+        timestamp = float(message['ts'])
+
+        all_messages_data.append({
+            'user_id': user,
+            'user_name': user_name,
+            'ts': message['ts'],
+            'timestamp': timestamp,
+            'text': message_text,
+            'file_paths': file_paths
+        })
+
+        # Check for thread replies
+        if message.get('reply_count', 0) > 0:
+            replies = replies_by_ts[message.get('thread_ts') or message.get('ts')]
+
+            for reply in replies:
+                # Only include replies from the time range
+                if float(reply['ts']) >= start_timestamp:
+                    reply_text, reply_file_paths = format_message_text(reply, client, workspace_name, channel_name)
+                    reply_user, reply_user_name = resolve_author(client, reply)
+                    reply_timestamp = float(reply['ts'])
+
+                    all_messages_data.append({
+                        'user_id': reply_user,
+                        'user_name': reply_user_name,
+                        'ts': reply['ts'],
+                        'timestamp': reply_timestamp,
+                        'text': reply_text,
+                        'file_paths': reply_file_paths
+                    })
+
+    # Aggregate consecutive messages from same user within 1 minute
+    aggregated_messages = aggregate_messages(all_messages_data)
+
+    # Build CSV rows for the aggregated messages (fields are preformatted)
+    rows = []
+    add_row = rows.append
+    for msg in aggregated_messages:
+        add_row((
+            workspace_name,
+            channel_name,
+            channel_type,
+            msg['user_name'],
+            msg['time_str'],
+            msg['text'],
+            msg['file_paths_str'],
+            build_message_permalink(client, team_domain, channel_id, msg['ts'])
+        ))
+
+    return rows, len(all_messages_data)
+
+
+def scrape_channel_checkpointed(client, channel, workspace_name, start_timestamp, team_domain, checkpoint_dir):
+    """
+    Scrape a channel, or reuse its checkpoint from an interrupted run.
+
+    Finished channels are saved to checkpoint_dir/<channel_id>.csv so a rerun
+    skips them (including their file downloads). A failed fetch raises before
+    anything is saved, so the rerun tries that channel again.
+
+    Returns:
+        tuple: (list_of_csv_rows, number_of_messages_before_aggregation or None if resumed)
+    """
+    if checkpoint_dir is None:
+        return scrape_channel(client, channel, workspace_name, start_timestamp, team_domain)
+
+    checkpoint = checkpoint_dir / f"{channel['id']}.csv"
+    if checkpoint.exists():
+        with open(checkpoint, 'r', newline='', encoding='utf-8') as f:
+            return list(csv.reader(f)), None
+
+    rows, raw_count = scrape_channel(client, channel, workspace_name, start_timestamp, team_domain)
+
+    # Write then rename, so a crash never leaves a half-written checkpoint
+    tmp_checkpoint = checkpoint.with_suffix('.tmp')
+    with open(tmp_checkpoint, 'w', newline='', encoding='utf-8') as f:
+        csv.writer(f).writerows(rows)
+    os.replace(tmp_checkpoint, checkpoint)
+
+    return rows, raw_count
+
+
+def scrape_workspace(workspace_config, start_timestamp, checkpoint_root=None):
+    """
+    Scrape messages from a single workspace.
+
+    Args:
+        workspace_config: Workspace entry from SLACK_CONFIG
+        start_timestamp: Unix timestamp for start of time range
+        checkpoint_root: Directory for per-channel checkpoints, or None to disable
+
+    Returns:
+        List of CSV rows for the workspace's aggregated messages
+    """
     workspace_name = workspace_config['workspace_name']
     token_env_var = workspace_config['token_env_var']
 
@@ -420,109 +891,83 @@ def scrape_workspace(workspace_config, csv_writer, start_timestamp):
     token = os.getenv(token_env_var)
     if not token:
         print(f"  ❌ Token not found for {token_env_var}")
-        return 0
+        return []
 
     print(f"\n{'='*80}")
     print(f"WORKSPACE: {workspace_name}")
     print(f"{'='*80}")
 
-    # Create Slack client
-    client = WebClient(token=token)
+    # Create Slack client (shared by the channel workers, so pacing is per workspace)
+    client = create_slack_client(token)
+
+    # Resolve all user names up front instead of one users_info call per user,
+    # unless names for this workspace were restored from an earlier run
+    prefix = f"{client.cache_prefix}_"
+    if any(cache_key.startswith(prefix) for cache_key in USER_NAME_SAVED_AT):
+        print("Using saved user names")
+    else:
+        user_count = prewarm_user_cache(client)
+        if user_count:
+            print(f"Cached {user_count} user names")
 
     # Fetch all channels
     channels = get_channels(client, include_external=True)
 
     if not channels:
         print(f"  ⚠️  No accessible channels found")
-        return 0
+        return []
 
     print(f"Found {len(channels)} accessible channels")
 
-    total_messages = 0
+    # Permalinks are deterministic given the workspace domain, so one team.info
+    # call replaces a chat.getPermalink call per message
+    team_domain = get_team_domain(client)
 
-    for channel in channels:
-        channel_id = channel['id']
-        channel_name = channel.get('name', channel_id)
-        channel_type = get_channel_type(channel)
+    workspace_rows = []
+
+    checkpoint_dir = None
+    if checkpoint_root is not None:
+        checkpoint_dir = checkpoint_root / UNSAFE_PATH_RE.sub('', workspace_name).strip()
+        checkpoint_dir.mkdir(parents=True, exist_ok=True)
 
-        # Skip #aggregated-talks channel
-        if channel_name == 'aggregated-talks':
-            print(f"  ⊘ Skipping #{channel_name} (aggregated channel)")
+    # Skip #aggregated-talks channel
+    to_scrape = []
+    for channel in channels:
+        if channel.get('name') == 'aggregated-talks':
+            print(f"  ⊘ Skipping #{channel['name']} (aggregated channel)")
             continue
+        to_scrape.append(channel)
 
-        print(f"  📺 Scraping #{channel_name} ({channel_type})...", end='')
-
-        # Fetch messages from the time range
-        messages = get_messages_from_channel(client, channel_id, start_timestamp)
-
-        if messages:
-            # Collect all messages first (including thread replies)
-            all_messages_data = []
-
-            for message in messages:
-                message_text, file_paths = format_message_text(message, client, workspace_name, channel_name)
-                user = message.get('user', message.get('bot_id', 'Unknown'))
-                user_name = get_user_name(client, user) if user and user != 'Unknown' else user
-                timestamp = float(message['ts'])
-
-                all_messages_data.append({
-                    'user_id': user,
-                    'user_name': user_name,
-                    'timestamp': timestamp,
-                    'text': message_text,
-                    'file_paths': file_paths
-                })
-
-                # Check for thread replies
-                if message.get('reply_count', 0) > 0:
-                    thread_ts = message.get('thread_ts') or message.get('ts')
-                    replies = get_thread_replies(client, channel_id, thread_ts)
-
-                    for reply in replies:
-                        # Only include replies from the time range
-                        if float(reply['ts']) >= start_timestamp:
-                            reply_text, reply_file_paths = format_message_text(reply, client, workspace_name, channel_name)
-                            reply_user = reply.get('user', reply.get('bot_id', 'Unknown'))
-                            reply_user_name = get_user_name(client, reply_user) if reply_user and reply_user != 'Unknown' else reply_user
-                            reply_timestamp = float(reply['ts'])
-
-                            all_messages_data.append({
-                                'user_id': reply_user,
-                                'user_name': reply_user_name,
-                                'timestamp': reply_timestamp,
-                                'text': reply_text,
-                                'file_paths': reply_file_paths
-                            })
-
-            # Aggregate consecutive messages from same user within 1 minute
-            aggregated_messages = aggregate_messages(all_messages_data)
-
-            # Write aggregated messages to CSV
-            for msg in aggregated_messages:
-                time_str = datetime.fromtimestamp(msg['timestamp']).strftime('%Y-%m-%d %H:%M:%S')
-                file_paths_str = '; '.join(msg['file_paths']) if msg['file_paths'] else ''
-
-                # Get permalink for the message
-                permalink = get_message_permalink(client, channel_id, msg['timestamp'])
-
-                csv_writer.writerow([
-                    workspace_name,
-                    channel_name,
-                    channel_type,
-                    msg['user_name'],
-                    time_str,
-                    msg['text'],
-                    file_paths_str,
-                    permalink
-                ])
-
-            print(f" {len(aggregated_messages)} messages (aggregated from {len(all_messages_data)})")
-            total_messages += len(aggregated_messages)
-        else:
-            print(f" 0 messages")
+    # Scrape channels concurrently; rows are gathered here on the calling thread
+    with ThreadPoolExecutor(max_workers=MAX_CHANNEL_WORKERS) as executor:
+        futures = [
+            executor.submit(scrape_channel_checkpointed, client, channel, workspace_name,
+                            start_timestamp, team_domain, checkpoint_dir)
+            for channel in to_scrape
+        ]
+
+        # Collect in submission order so the CSV layout is deterministic
+        for channel, future in zip(to_scrape, futures):
+            channel_name = channel.get('name', channel['id'])
+            channel_type = get_channel_type(channel)
+
+            try:
+                rows, raw_count = future.result()
+            except Exception as e:
+                print(f"  ⚠️  Error scraping #{channel_name}: {e}")
+                continue
+
+            workspace_rows.extend(rows)
 
-    print(f"\n✅ Total messages from {workspace_name}: {total_messages}")
-    return total_messages
+            if raw_count is None:
+                print(f"  ↻ #{channel_name} ({channel_type}): {len(rows)} messages (resumed from checkpoint)")
+            elif raw_count:
+                print(f"  📺 #{channel_name} ({channel_type}): {len(rows)} messages (aggregated from {raw_count})")
+            else:
+                print(f"  📺 #{channel_name} ({channel_type}): 0 messages")
+
+    print(f"\n✅ Total messages from {workspace_name}: {len(workspace_rows)}")
+    return workspace_rows
 
 
 def main(start_timestamp: float, end_timestamp: float, overwrite_cache: bool = False) -> str:
@@ -537,9 +982,6 @@ def main(start_timestamp: float, end_timestamp: float, overwrite_cache: bool = F
     Returns:
         Path to the created/cached CSV file
     """
-    # Get repo root
-    repo_root = Path(__file__).parent.parent
-
     # Convert timestamps to datetime for formatting
     dt_start = datetime.fromtimestamp(start_timestamp)
     dt_end = datetime.fromtimestamp(end_timestamp)
@@ -549,7 +991,7 @@ def main(start_timestamp: float, end_timestamp: float, overwrite_cache: bool = F
     dt_end_str = dt_end.strftime('%Y%m%d_%H')
 
     # Create cache directory
-    cache_dir = repo_root / 'cache'
+    cache_dir = _REPO_ROOT / 'cache'
     cache_dir.mkdir(parents=True, exist_ok=True)
 
     # Create output filename
@@ -571,10 +1013,27 @@ def main(start_timestamp: float, end_timestamp: float, overwrite_cache: bool = F
     print(f"🔗 Shared messages will be fetched from original channels when possible")
     print(f"⊘ Skipping #aggregated-talks channel")
 
+    # Reuse user names resolved by recent runs
+    user_names_file = cache_dir / 'user_names.json'
+    restored = load_user_name_cache(user_names_file)
+    if restored:
+        print(f"✓ Loaded {restored} saved user names")
+
+    # Channels finished by an interrupted run are checkpointed here and reused
+    checkpoint_root = cache_dir / 'partial' / output_filename.stem
+    if overwrite_cache and checkpoint_root.exists():
+        shutil.rmtree(checkpoint_root)
+    elif checkpoint_root.exists():
+        print(f"↻ Resuming from checkpoints in {checkpoint_root}")
+
     grand_total = 0
 
-    # Open CSV file for writing
-    with open(output_filename, 'w', newline='', encoding='utf-8') as csvfile:
+    # Write to a temp file and rename at the end, so a crash never leaves a
+    # truncated CSV that later runs would treat as a valid cache
+    tmp_filename = output_filename.with_suffix('.csv.tmp')
+
+    # Open CSV file for writing (rows arrive in bulk per workspace, so use a large buffer)
+    with open(tmp_filename, 'w', newline='', encoding='utf-8', buffering=1 << 20) as csvfile:
         csv_writer = csv.writer(csvfile)
 
         # Write header
@@ -583,15 +1042,27 @@ def main(start_timestamp: float, end_timestamp: float, overwrite_cache: bool = F
             'original_slack_message_link'
         ])
 
-        # Process each workspace
-        for workspace_config in SLACK_CONFIG:
-            try:
-                count = scrape_workspace(workspace_config, csv_writer, start_timestamp)
-                grand_total += count
-            except Exception as e:
-                print(f"❌ Error processing {workspace_config['workspace_name']}: {e}")
-                import traceback
-                traceback.print_exc()
+        # Process workspaces concurrently; each has its own client, token and rate limit
+        with ThreadPoolExecutor(max_workers=max(len(SLACK_CONFIG), 1)) as executor:
+            futures = [
+                executor.submit(scrape_workspace, workspace_config, start_timestamp, checkpoint_root)
+                for workspace_config in SLACK_CONFIG
+            ]
+
+            # Write in config order so the CSV layout is deterministic
+            for workspace_config, future in zip(SLACK_CONFIG, futures):
+                try:
+                    rows = future.result()
+                    csv_writer.writerows(rows)
+                    grand_total += len(rows)
+                except Exception as e:
+                    print(f"❌ Error processing {workspace_config['workspace_name']}: {e}")
+                    import traceback
+                    traceback.print_exc()
+
+    os.replace(tmp_filename, output_filename)
+    save_user_name_cache(user_names_file)
+    shutil.rmtree(checkpoint_root, ignore_errors=True)
 
     print(f"\n{'='*80}")
     print(f"🎉 SCRAPING COMPLETE")
@@ -6,38 +6,330 @@ Scrapes public/external Slack channels and outputs standardized JSON
 
 import os
 import re
-import json
+import time
 import shutil
+import threading
 import tempfile
 import requests
+from requests.adapters import HTTPAdapter
 from pathlib import Path
 from datetime import datetime
 from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from pydantic_core import from_json, to_json
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
+from slack_sdk.http_retry import ConnectionErrorRetryHandler, RateLimitErrorRetryHandler
 
-from .models import SlackMessage
+from .models import SlackMessage, is_jsonl, open_jsonl
 from .init_config import SLACK_CONFIG
 
+# Concurrency limits (Slack calls are network-bound; the SDK retries 429s)
+MAX_WORKSPACE_WORKERS = 4   # Workspaces scraped at once (override with WORKSPACE_CONCURRENCY)
+MAX_CHANNEL_WORKERS = 8     # conversations_history calls in flight per workspace
+MAX_MESSAGE_WORKERS = 16    # Per-message permalink/user lookups in flight per workspace
+MAX_DOWNLOAD_WORKERS = 16   # File downloads in flight per workspace
+
+# Slack client retry policy and request timeout
+SLACK_RATE_LIMIT_RETRIES = 5   # Retries on 429s (the SDK waits out Retry-After)
+SLACK_CONNECTION_RETRIES = 3   # Retries on dropped/reset connections
+SLACK_TIMEOUT = 30             # Seconds per Slack API request
+
+# Slack rate-limit tiers (requests per minute, per workspace and method) and the
+# tier of each method Stage 1 calls; calls are paced to stay under them
+SLACK_TIER_RPM = {1: 1, 2: 20, 3: 50, 4: 100}
+SLACK_METHOD_TIERS = {
+    'conversations.list': 2,
+    'users.list': 2,
+    'conversations.history': 3,
+    'team.info': 3,
+    'users.info': 4,
+    'files.info': 4,
+    'chat.getPermalink': 4,  # "Special" tier, paced like Tier 4
+}
+SLACK_BURST_SECONDS = 10  # Bucket capacity, in seconds of quota, for short bursts
+
+# User names persisted between runs, per workspace, and trusted for a week
+USER_CACHE_FILE = Path(__file__).parent.parent / 'cache' / 'stage1_user_names.json'
+USER_CACHE_TTL = 7 * 24 * 3600  # Seconds
+
+# Per-channel time each workspace was last scraped up to; later runs start there
+# (minus a small overlap for late-indexed messages) instead of at the window start
+SYNC_STATE_FILE = Path(__file__).parent.parent / 'cache' / 'stage1_sync_state.json'
+SYNC_OVERLAP_SECONDS = 10 * 60
+
+# conversations.list: one listing per channel type, with the largest page Slack allows
+CHANNEL_LIST_TYPES = ('private_channel', 'public_channel')
+CHANNEL_LIST_PAGE_SIZE = 999
+
+# Channels never scraped, and file types worth downloading
+SKIPPED_CHANNELS = frozenset({'aggregated-talks'})
+DOWNLOADABLE_FILE_TYPES = frozenset({'pdf', 'png', 'jpg', 'jpeg'})
+
+# Shared HTTP session so file downloads reuse pooled keep-alive connections
+HTTP_SESSION = requests.Session()
+HTTP_SESSION.mount('https://', HTTPAdapter(pool_connections=32, pool_maxsize=64))
+
+# Striped locks serializing users_info lookups per user ID across worker threads
+USER_LOOKUP_LOCKS = tuple(threading.Lock() for _ in range(MAX_MESSAGE_WORKERS))
+
+# Patterns compiled once instead of per message
+MENTION_RE = re.compile(r'<@(U\w+)>')
+URL_RE = re.compile(r'https?://[^\s<>"\'\)]+')
+
+
+class TokenBucket:
+    """Thread-safe token bucket: acquire() blocks until a call fits the rate"""
+
+    def __init__(self, rate_per_sec: float, capacity: float):
+        self.rate = rate_per_sec
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until it has refilled if the bucket is empty"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Reserve the token now (possibly going negative) so waiters queue up fairly
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Empty the bucket so the next caller waits at least seconds (e.g. a 429's Retry-After)"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens = min(self.tokens, -seconds * self.rate)
+
+
+def slack_method_buckets() -> dict[str, TokenBucket]:
+    """One token bucket per method in SLACK_METHOD_TIERS, at its tier's rate"""
+    return {
+        method: TokenBucket(
+            SLACK_TIER_RPM[tier] / 60,
+            max(1, SLACK_TIER_RPM[tier] * SLACK_BURST_SECONDS / 60)
+        )
+        for method, tier in SLACK_METHOD_TIERS.items()
+    }
+
+
+class PacedRateLimitRetryHandler(RateLimitErrorRetryHandler):
+    """
+    RateLimitErrorRetryHandler that also pauses the method's token bucket for Retry-After
+
+    Without it only the thread that got the 429 waits, and every other worker on
+    that method keeps calling into the same limit and collects its own 429.
+    """
+
+    def __init__(self, buckets: dict[str, TokenBucket], max_retry_count: int = 1):
+        super().__init__(max_retry_count=max_retry_count)
+        self.buckets = buckets
+
+    def prepare_for_next_attempt(self, *, state, request, response=None, error=None):
+        # Request URLs end in the API method, e.g. https://slack.com/api/conversations.history
+        bucket = self.buckets.get(request.url.split('?', 1)[0].rsplit('/', 1)[-1])
+        if bucket is not None and response is not None:
+            retry_after = next(
+                (value for name, value in response.headers.items() if name.lower() == 'retry-after'), None
+            )
+            bucket.pause(int(retry_after[0]) if retry_after else 1)
+        super().prepare_for_next_attempt(state=state, request=request, response=response, error=error)
+
+
+def pace_slack_client(client: WebClient, buckets: Optional[dict[str, TokenBucket]] = None) -> WebClient:
+    """
+    Route every API call of client through per-method token buckets.
+
+    Each method in SLACK_METHOD_TIERS gets its own bucket at its tier's rate, so
+    concurrent workers pace themselves instead of tripping 429s; if one slips
+    through, a PacedRateLimitRetryHandler sharing the buckets holds every worker
+    on that method back for Retry-After.
+
+    Args:
+        client: Slack WebClient to pace
+        buckets: Buckets from slack_method_buckets, shared with the client's retry
+            handler (a fresh set when None)
+    """
+    if buckets is None:
+        buckets = slack_method_buckets()
+    api_call = client.api_call
+
+    # Every WebClient method funnels through api_call, so wrapping it covers them all
+    def paced_api_call(api_method, *args, **kwargs):
+        bucket = buckets.get(api_method)
+        if bucket is not None:
+            bucket.acquire()
+        return api_call(api_method, *args, **kwargs)
+
+    client.api_call = paced_api_call
+    return client
+
 
 def get_user_name(client: WebClient, user_id: str, user_cache: dict) -> str:
     """Get user's display name with caching"""
     if user_id in user_cache:
         return user_cache[user_id]
 
+    # Message worker threads share user_cache; the lock makes concurrent misses
+    # on one user wait for a single users_info call instead of each making one
+    with USER_LOOKUP_LOCKS[hash(user_id) % len(USER_LOOKUP_LOCKS)]:
+        if user_id in user_cache:
+            return user_cache[user_id]
+
+        try:
+            response = client.users_info(user=user_id)
+            user = response['user']
+            name = user.get('real_name') or user.get('name') or user_id
+            user_cache[user_id] = name
+            return name
+        except SlackApiError:
+            user_cache[user_id] = user_id
+            return user_id
+
+
+def prewarm_user_cache(client: WebClient, user_cache: dict) -> int:
+    """
+    Fill user_cache for every workspace member with paginated users_list calls
+
+    Turns one users_info request per user into one request per 1000 users.
+    Users missing from the list (deactivated, external) still fall back to
+    users_info in get_user_name.
+
+    Returns:
+        Number of users cached
+    """
+    cursor = None
+    count = 0
+
+    try:
+        while True:
+            response = client.users_list(limit=1000, cursor=cursor)
+
+            for user in response['members']:
+                user_id = user['id']
+                user_cache[user_id] = user.get('real_name') or user.get('name') or user_id
+                count += 1
+
+            cursor = response.get('response_metadata', {}).get('next_cursor')
+            if not cursor:
+                break
+    except (SlackApiError, KeyError, TypeError) as e:
+        # Missing users:read scope or unexpected response - keep per-user lookups
+        print(f"  Could not prefetch users: {e}")
+
+    return count
+
+
+def load_user_caches(path: Path) -> dict:
+    """
+    Load user names saved by earlier runs, dropping entries older than USER_CACHE_TTL
+
+    Returns:
+        Dict of workspace_name -> {user_id: [name, saved_at]}
+    """
+    if not path.exists():
+        return {}
+
     try:
-        response = client.users_info(user=user_id)
-        user = response['user']
-        name = user.get('real_name') or user.get('name') or user_id
-        user_cache[user_id] = name
-        return name
-    except SlackApiError:
-        user_cache[user_id] = user_id
-        return user_id
+        saved = from_json(path.read_bytes())
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable user cache {path}: {e}")
+        return {}
+
+    cutoff = time.time() - USER_CACHE_TTL
+    return {
+        workspace_name: {
+            user_id: entry for user_id, entry in users.items() if entry[1] >= cutoff
+        }
+        for workspace_name, users in saved.items()
+    }
+
+
+def save_user_caches(path: Path, saved: dict, user_caches: dict):
+    """
+    Merge this run's resolved names into the saved entries and write them atomically
+
+    Args:
+        path: JSON file to write
+        saved: Entries from load_user_caches (keeps their original saved_at)
+        user_caches: Dict of workspace_name -> {user_id: name} from this run
+    """
+    now = time.time()
+    for workspace_name, user_cache in user_caches.items():
+        entries = saved.setdefault(workspace_name, {})
+        for user_id, name in user_cache.items():
+            # Failed lookups cache the bare ID; leave those to be retried next run
+            if name != user_id and user_id not in entries:
+                entries[user_id] = [name, now]
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.tmp')
+    tmp_path.write_bytes(to_json(saved))
+    os.replace(tmp_path, path)
+
+
+def load_sync_state(path: Path) -> dict:
+    """
+    Load per-channel sync checkpoints saved by earlier runs
+
+    Returns:
+        Dict of workspace_name -> {channel_id: last synced unix timestamp}
+    """
+    if not path.exists():
+        return {}
+
+    try:
+        return from_json(path.read_bytes())
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable sync state {path}: {e}")
+        return {}
+
+
+def save_sync_state(path: Path, saved: dict, sync_states: dict):
+    """
+    Merge this run's checkpoints into the saved ones (keeping the later) and write atomically
+
+    Args:
+        path: JSON file to write
+        saved: Checkpoints from load_sync_state
+        sync_states: Dict of workspace_name -> {channel_id: timestamp} from this run
+    """
+    for workspace_name, sync_state in sync_states.items():
+        entries = saved.setdefault(workspace_name, {})
+        for channel_id, synced_to in sync_state.items():
+            entries[channel_id] = max(synced_to, entries.get(channel_id, synced_to))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.tmp')
+    tmp_path.write_bytes(to_json(saved))
+    os.replace(tmp_path, path)
+
+
+def replace_user_mentions(text: str, client, user_cache: dict) -> str:
+    """Replace Slack user mentions (<@U07LR0EMG2H>) with actual names"""
+    def replace_mention(match):
+        user_id = match.group(1)
+        # Cache hits (nearly all after prewarm) skip the get_user_name call
+        name = user_cache.get(user_id)
+        return name if name is not None else get_user_name(client, user_id, user_cache)
+
+    return MENTION_RE.sub(replace_mention, text)
 
 
 def extract_text_from_message(message: dict, client, user_cache: dict) -> str:
     """Extract text content from Slack message and replace user mentions with names"""
+    # Fast path: plain messages carry only 'text'
+    if not message.get('attachments') and not message.get('blocks'):
+        text = message.get('text', '').strip()
+        return replace_user_mentions(text, client, user_cache) if '<@' in text else text
+
     text_parts = []
 
     # Main message text
@@ -62,13 +354,8 @@ def extract_text_from_message(message: dict, client, user_cache: dict) -> str:
                             text_parts.append(item.get('text', ''))
 
     text = ' '.join(text_parts).strip()
-
-    # Replace Slack user mentions (<@U07LR0EMG2H>) with actual names
-    def replace_mention(match):
-        user_id = match.group(1)
-        return get_user_name(client, user_id, user_cache)
-
-    text = re.sub(r'<@(U\w+)>', replace_mention, text)
+    if '<@' in text:
+        text = replace_user_mentions(text, client, user_cache)
 
     return text
 
@@ -76,25 +363,29 @@ def extract_text_from_message(message: dict, client, user_cache: dict) -> str:
 def extract_urls_from_message(message: dict) -> list[str]:
     """Extract all URLs from Slack message"""
     urls = []
-    url_pattern = re.compile(r'https?://[^\s<>"\'\)]+')
+    url_findall = URL_RE.findall  # Bound once; called for every text field
+
+    def find_urls(text: str) -> list[str]:
+        """Run the URL regex only on text that can contain a URL"""
+        return url_findall(text) if '://' in text else []
 
     def clean_slack_url(url: str) -> str:
         """Remove Slack's pipe separator and text after it"""
-        return url.split('|')[0]
+        return url.partition('|')[0]
 
     # Extract from text
     if 'text' in message:
-        raw_urls = url_pattern.findall(message['text'])
+        raw_urls = find_urls(message['text'])
         urls.extend([clean_slack_url(url) for url in raw_urls])
 
     # Extract from attachments
     if 'attachments' in message:
         for att in message['attachments']:
             if 'text' in att:
-                raw_urls = url_pattern.findall(att['text'])
+                raw_urls = find_urls(att['text'])
                 urls.extend([clean_slack_url(url) for url in raw_urls])
             if 'fallback' in att:
-                raw_urls = url_pattern.findall(att['fallback'])
+                raw_urls = find_urls(att['fallback'])
                 urls.extend([clean_slack_url(url) for url in raw_urls])
             # Also check for direct URL fields
             if 'from_url' in att:
@@ -111,7 +402,7 @@ def extract_urls_from_message(message: dict) -> list[str]:
                         if item.get('type') == 'link' and item.get('url'):
                             urls.append(clean_slack_url(item['url']))
                         elif item.get('type') == 'text' and item.get('text'):
-                            raw_urls = url_pattern.findall(item['text'])
+                            raw_urls = find_urls(item['text'])
                             urls.extend([clean_slack_url(url) for url in raw_urls])
 
     return urls
@@ -139,7 +430,7 @@ def download_file_to_temp(
         file_id = file_info.get('id')
 
         # Only download PDF, PNG, JPG files
-        if file_type not in ['pdf', 'png', 'jpg', 'jpeg']:
+        if file_type not in DOWNLOADABLE_FILE_TYPES:
             return None
 
         if not file_id:
@@ -158,24 +449,26 @@ def download_file_to_temp(
 
         # Download file with authentication
         headers = {'Authorization': f'Bearer {client.token}'}
-        response = requests.get(file_url, headers=headers, stream=True, timeout=30)
-        response.raise_for_status()
-
-        # Check content type (avoid HTML error pages)
-        content_type = response.headers.get('content-type', '')
-        if 'text/html' in content_type.lower():
-            return None
-
-        # Create unique filename with timestamp
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
-        safe_filename = "".join(c for c in file_name if c.isalnum() or c in ('_', '-', '.'))
-        file_path = temp_dir / f"{timestamp}_{safe_filename}"
-
-        # Save file
-        with open(file_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
+        # Context manager returns the connection to the pool even on early return
+        with HTTP_SESSION.get(file_url, headers=headers, stream=True, timeout=30) as response:
+            response.raise_for_status()
+
+            # Check content type (avoid HTML error pages)
+            content_type = response.headers.get('content-type', '')
+            if 'text/html' in content_type.lower():
+                return None
+
+            # Create a unique file atomically; concurrent downloads of same-named
+            # files (or of one file shared twice) never write to the same path
+            safe_filename = "".join(c for c in file_name if c.isalnum() or c in ('_', '-', '.'))
+            fd, file_name_on_disk = tempfile.mkstemp(prefix=f"{file_id}_", suffix=f"_{safe_filename}", dir=temp_dir)
+            file_path = Path(file_name_on_disk)
+
+            # Save file
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=8192):
+                    if chunk:
+                        f.write(chunk)
 
         # Verify file was written
         if file_path.stat().st_size < 100:
@@ -189,20 +482,197 @@ def download_file_to_temp(
         return None
 
 
+def get_channels(client: WebClient) -> list[dict]:
+    """
+    Fetch all non-archived public/private channels (with pagination)
+
+    Each type is listed separately: Slack filters mixed-type listings expensively
+    and throttles them far sooner than single-type ones.
+    """
+    channels = {}
+
+    for channel_type in CHANNEL_LIST_TYPES:
+        cursor = None
+
+        while True:
+            response = client.conversations_list(
+                types=channel_type,
+                exclude_archived=True,
+                cursor=cursor,
+                limit=CHANNEL_LIST_PAGE_SIZE
+            )
+
+            # Keyed by ID so a channel seen on two pages (list changed mid-pagination) is kept once
+            for channel in response['channels']:
+                channels.setdefault(channel['id'], channel)
+
+            cursor = response.get('response_metadata', {}).get('next_cursor')
+            if not cursor:
+                break
+
+    return list(channels.values())
+
+
+def fetch_channel_messages(
+    client: WebClient,
+    channel: dict,
+    start_timestamp: float,
+    end_timestamp: float,
+    sync_state: Optional[dict] = None
+) -> list[dict]:
+    """
+    Fetch top-level messages in the time range for one channel
+
+    Args:
+        client: Slack WebClient
+        channel: Channel dict from conversations_list
+        start_timestamp: Unix timestamp for start of range
+        end_timestamp: Unix timestamp for end of range
+        sync_state: Optional channel_id -> last synced timestamp for this workspace;
+            the fetch starts at the checkpoint when it is later than start_timestamp,
+            and the checkpoint is advanced after a successful fetch
+
+    Returns:
+        List of raw Slack message dicts (threaded replies skipped)
+    """
+    oldest = start_timestamp
+    if sync_state is not None and channel['id'] in sync_state:
+        oldest = max(start_timestamp, sync_state[channel['id']] - SYNC_OVERLAP_SECONDS)
+        if oldest >= end_timestamp:
+            return []  # Whole range already scraped
+
+    messages = []
+    cursor = None
+
+    try:
+        # A single page silently truncates busy channels; follow the cursor to the end
+        while True:
+            history = client.conversations_history(
+                channel=channel['id'],
+                oldest=str(oldest),
+                latest=str(end_timestamp),
+                cursor=cursor,
+                limit=1000
+            )
+            messages.extend(history.get('messages', []))
+
+            cursor = history.get('response_metadata', {}).get('next_cursor')
+            if not cursor:
+                break
+    except SlackApiError as e:
+        # Skip silently if bot not in channel (like old code)
+        if e.response.get('error') != 'not_in_channel':
+            print(f"Error fetching messages from #{channel['name']}: {e}")
+        return []
+
+    if sync_state is not None:
+        # Nothing can exist past now, so a window ending in the future only syncs to now
+        synced_to = min(end_timestamp, time.time())
+        sync_state[channel['id']] = max(synced_to, sync_state.get(channel['id'], synced_to))
+
+    # Skip threaded replies (only count top-level messages)
+    return [
+        msg for msg in messages
+        if not (msg.get('thread_ts') and msg.get('ts') != msg.get('thread_ts'))
+    ]
+
+
+def get_team_domain(client: WebClient) -> Optional[str]:
+    """Get the workspace's Slack subdomain, or None if team.info is unavailable"""
+    try:
+        return client.team_info()['team']['domain']
+    except (SlackApiError, KeyError, TypeError) as e:
+        print(f"  Could not fetch team domain - using chat.getPermalink: {e}")
+        return None
+
+
+def build_slack_message(
+    client: WebClient,
+    msg: dict,
+    workspace_name: str,
+    channel: dict,
+    channel_type: str,
+    user_cache: dict,
+    team_domain: Optional[str] = None
+) -> Optional[SlackMessage]:
+    """
+    Resolve names and permalink for one raw message
+
+    Permalinks are built locally from team_domain when it is known
+    (https://<domain>.slack.com/archives/<channel>/p<ts without dot>);
+    otherwise chat.getPermalink is called.
+
+    Returns:
+        SlackMessage (file_paths and original_indices filled in by the caller),
+        or None if the message has no text
+    """
+    user_id = msg.get('user', 'unknown')
+    user_name = get_user_name(client, user_id, user_cache)
+
+    # Extract text (replaces user mentions with names)
+    textract = extract_text_from_message(msg, client, user_cache)
+
+    if not textract:
+        return None
+
+    # Convert timestamp to datetime
+    ts = float(msg['ts'])
+    dt = datetime.fromtimestamp(ts).strftime('%Y-%m-%dT%H:%M:%S')
+
+    # Get permalink (as list for aggregation support)
+    if team_domain:
+        permalink = [f"https://{team_domain}.slack.com/archives/{channel['id']}/p{msg['ts'].replace('.', '')}"]
+    else:
+        try:
+            permalink_response = client.chat_getPermalink(
+                channel=channel['id'],
+                message_ts=msg['ts']
+            )
+            permalink = [permalink_response['permalink']]
+        except SlackApiError:
+            permalink = []
+
+    # Extract URLs from message
+    urls = extract_urls_from_message(msg)
+
+    return SlackMessage(
+        workspace_name=workspace_name,
+        channel_name=channel['name'],
+        channel_type=channel_type,
+        sending_user_name=user_name,
+        datetime=dt,
+        textract=textract,
+        urls=urls,
+        file_paths=[],
+        permalink=permalink,
+        original_indices=[],
+        ts_epoch=ts
+    )
+
+
 def scrape_workspace(
     workspace_config: dict,
     start_timestamp: float,
     end_timestamp: float,
-    temp_dir: Path
+    temp_dir: Optional[Path] = None,
+    user_cache: Optional[dict] = None,
+    sync_state: Optional[dict] = None
 ) -> list[SlackMessage]:
     """
     Scrape a single workspace and return list of SlackMessage objects
 
+    Channel histories are fetched concurrently, then every message's
+    permalink/user calls and every file download run on shared thread
+    pools. Output order matches the sequential channel-by-channel order.
+
     Args:
         workspace_config: Workspace configuration from SLACK_CONFIG
         start_timestamp: Unix timestamp for start of range
         end_timestamp: Unix timestamp for end of range
-        temp_dir: Temporary directory for file downloads
+        temp_dir: Temporary directory for file downloads, or None to skip downloads
+        user_cache: user_id -> name dict to use and fill (e.g. restored from disk)
+        sync_state: channel_id -> last synced timestamp dict to use and advance
+            (see fetch_channel_messages), or None to always fetch the full range
 
     Returns:
         List of SlackMessage objects
@@ -213,141 +683,112 @@ def scrape_workspace(
     if not token:
         raise ValueError(f"Missing token for {workspace_name}: {workspace_config['token_env_var']}")
 
-    client = WebClient(token=token)
-    user_cache = {}
-    messages = []
-    message_index = 0  # Track message index for traceability
+    # The retry handlers honour Retry-After on 429s (pausing the method for every
+    # thread) and retry dropped connections
+    # One client per workspace, shared by every worker thread below, paced per method tier
+    buckets = slack_method_buckets()
+    client = pace_slack_client(WebClient(
+        token=token,
+        timeout=SLACK_TIMEOUT,
+        retry_handlers=[
+            PacedRateLimitRetryHandler(buckets, max_retry_count=SLACK_RATE_LIMIT_RETRIES),
+            ConnectionErrorRetryHandler(max_retry_count=SLACK_CONNECTION_RETRIES),
+        ]
+    ), buckets)
+    if user_cache is None:
+        user_cache = {}
+
+    # Resolve all member names up front instead of one users_info call per user,
+    # unless names were restored from an earlier run or the workspace opts out
+    # ('prewarm_users': False in SLACK_CONFIG, e.g. tokens without users:read)
+    if not user_cache and workspace_config.get('prewarm_users', True):
+        prewarm_user_cache(client, user_cache)
 
     try:
-        # Get list of channels (with pagination)
-        channels = []
-        cursor = None
-
-        while True:
-            response = client.conversations_list(
-                types='public_channel,private_channel',
-                exclude_archived=True,
-                cursor=cursor,
-                limit=200
-            )
-
-            channels.extend(response['channels'])
-
-            cursor = response.get('response_metadata', {}).get('next_cursor')
-            if not cursor:
-                break
-
-        for channel in channels:
-            channel_name = channel['name']
-            channel_id = channel['id']
-            is_external = channel.get('is_ext_shared', False)
-            is_private = channel.get('is_private', False)
-
-            # Skip aggregated-talks
-            if channel_name == 'aggregated-talks':
-                continue
-
-            # Determine channel type (RFC only allows 'external' or 'public')
-            if is_external:
-                channel_type = 'external'
-            else:
-                channel_type = 'public'
-
-            # Skip private channels that aren't external-shared
-            if is_private and not is_external:
-                continue
-
-            # Get messages in time range
-            try:
-                history = client.conversations_history(
-                    channel=channel_id,
-                    oldest=str(start_timestamp),
-                    latest=str(end_timestamp),
-                    limit=1000
-                )
-
-                for msg in history.get('messages', []):
-                    # Skip threaded replies (only count top-level messages)
-                    if msg.get('thread_ts') and msg.get('ts') != msg.get('thread_ts'):
-                        continue
-
-                    user_id = msg.get('user', 'unknown')
-                    user_name = get_user_name(client, user_id, user_cache)
-
-                    # Extract text (replaces user mentions with names)
-                    textract = extract_text_from_message(msg, client, user_cache)
-
-                    if not textract:
-                        continue
-
-                    # Convert timestamp to datetime
-                    ts = float(msg['ts'])
-                    dt = datetime.fromtimestamp(ts).strftime('%Y-%m-%dT%H:%M:%S')
-
-                    # Get permalink (as list for aggregation support)
-                    try:
-                        permalink_response = client.chat_getPermalink(
-                            channel=channel_id,
-                            message_ts=msg['ts']
-                        )
-                        permalink = [permalink_response['permalink']]
-                    except SlackApiError:
-                        permalink = []
-
-                    # Extract URLs from message
-                    urls = extract_urls_from_message(msg)
-
-                    # Download files (PDF/PNG/JPG only)
-                    file_paths = []
-                    if 'files' in msg:
-                        for file_info in msg['files']:
-                            local_path = download_file_to_temp(file_info, client, temp_dir)
-                            if local_path:
-                                file_paths.append(local_path)
-
-                    slack_msg = SlackMessage(
-                        workspace_name=workspace_name,
-                        channel_name=channel_name,
-                        channel_type=channel_type,
-                        sending_user_name=user_name,
-                        datetime=dt,
-                        textract=textract,
-                        urls=urls,
-                        file_paths=file_paths,
-                        permalink=permalink,
-                        original_indices=[message_index]
-                    )
-                    messages.append(slack_msg)
-                    message_index += 1
-
-            except SlackApiError as e:
-                # Skip silently if bot not in channel (like old code)
-                if e.response.get('error') == 'not_in_channel':
-                    continue
-                # Print other errors
-                print(f"Error fetching messages from #{channel_name}: {e}")
-                continue
-
+        channels = get_channels(client)
     except SlackApiError as e:
         raise RuntimeError(f"Failed to fetch channels for {workspace_name}: {e}")
 
+    # Permalinks are built from the workspace subdomain: taken from SLACK_CONFIG's
+    # 'domain' when set, otherwise one team.info call (either replaces a
+    # chat.getPermalink call per message)
+    configured_domain = workspace_config.get('domain', '')
+    if configured_domain.endswith('.slack.com'):
+        team_domain = configured_domain[:-len('.slack.com')]
+    else:
+        team_domain = get_team_domain(client)
+
+    # Keep public and external-shared channels, skipping aggregated-talks
+    channels = [
+        channel for channel in channels
+        if channel['name'] not in SKIPPED_CHANNELS
+        and (channel.get('is_ext_shared', False) or not channel.get('is_private', False))
+    ]
+
+    # Fetch all channel histories concurrently
+    with ThreadPoolExecutor(max_workers=MAX_CHANNEL_WORKERS) as executor:
+        histories = list(executor.map(
+            lambda channel: fetch_channel_messages(client, channel, start_timestamp, end_timestamp, sync_state),
+            channels
+        ))
+
+    # Resolve every message concurrently; map keeps channel/message order
+    jobs = [
+        (msg, channel, 'external' if channel.get('is_ext_shared', False) else 'public')
+        for channel, history in zip(channels, histories)
+        for msg in history
+    ]
+    with ThreadPoolExecutor(max_workers=MAX_MESSAGE_WORKERS) as executor:
+        built = list(executor.map(
+            lambda job: build_slack_message(client, job[0], workspace_name, job[1], job[2], user_cache, team_domain),
+            jobs
+        ))
+
+    # Download files (PDF/PNG/JPG only) for all kept messages on one bounded pool
+    downloads = [
+        (slack_msg, file_info)
+        for (msg, _, _), slack_msg in zip(jobs, built)
+        if slack_msg is not None
+        for file_info in msg.get('files', [])
+    ] if temp_dir is not None else []
+    with ThreadPoolExecutor(max_workers=MAX_DOWNLOAD_WORKERS) as executor:
+        local_paths = executor.map(
+            lambda download: download_file_to_temp(download[1], client, temp_dir),
+            downloads
+        )
+        for (slack_msg, _), local_path in zip(downloads, local_paths):
+            if local_path:
+                slack_msg.file_paths.append(local_path)
+
+    messages = [slack_msg for slack_msg in built if slack_msg is not None]
+
+    # Track message index for traceability
+    for message_index, slack_msg in enumerate(messages):
+        slack_msg.original_indices = [message_index]
+
     return messages
 
 
 def scrape_all_workspaces(
     start_dt: datetime,
     end_dt: datetime,
-    temp_dir: Path,
-    output_path: Optional[Path] = None
+    temp_dir: Optional[Path] = None,
+    output_path: Optional[Path] = None,
+    user_cache_path: Optional[Path] = None,
+    sync_state_path: Optional[Path] = None
 ) -> list[SlackMessage]:
     """
-    Scrape all configured workspaces and save to JSON
+    Scrape all configured workspaces concurrently and save to JSON
 
     Args:
         start_dt: Start datetime
         end_dt: End datetime
-        temp_dir: Temporary directory for file downloads
-        output_path: Optional path to save JSON output
+        temp_dir: Temporary directory for file downloads, or None to skip downloads
+        output_path: Optional path to save JSON output (.jsonl/.jsonl.gz is written incrementally)
+        user_cache_path: Optional JSON file persisting user names across runs
+        sync_state_path: Optional JSON file of per-channel sync checkpoints; channels
+            are only fetched from their checkpoint onwards, so the output holds only
+            messages not scraped by earlier runs (for back-to-back cron windows)
 
     Returns:
         List of all SlackMessage objects
@@ -357,45 +798,107 @@ def scrape_all_workspaces(
 
     all_messages = []
 
-    for workspace_config in SLACK_CONFIG:
-        workspace_name = workspace_config['workspace_name']
-        print(f"Scraping workspace: {workspace_name}")
+    # Restore user names from earlier runs so known users need no API calls
+    saved_users = load_user_caches(user_cache_path) if user_cache_path else {}
+    user_caches = {
+        workspace_config['workspace_name']: {
+            user_id: name
+            for user_id, (name, _) in saved_users.get(workspace_config['workspace_name'], {}).items()
+        }
+        for workspace_config in SLACK_CONFIG
+    }
+
+    # Restore per-channel checkpoints so already-scraped time is not fetched again
+    saved_sync = load_sync_state(sync_state_path) if sync_state_path else {}
+    sync_states = {
+        workspace_config['workspace_name']: (
+            dict(saved_sync.get(workspace_config['workspace_name'], {}))
+        ) if sync_state_path else None
+        for workspace_config in SLACK_CONFIG
+    }
+
+    completed = []  # Workspaces whose checkpoints may be saved
+
+    # JSONL output is written workspace by workspace as results arrive, instead of
+    # serializing everything at the end; it goes to a temp file renamed at the end, so
+    # an interrupted run never leaves a truncated output that --use-cache would reuse
+    output_stream = None
+    if output_path and is_jsonl(output_path):
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_output_path = output_path.with_suffix('.tmp' + output_path.suffix)  # Keeps .gz last for open_jsonl
+        output_stream = open_jsonl(tmp_output_path, 'wb')
 
-        try:
-            messages = scrape_workspace(workspace_config, start_timestamp, end_timestamp, temp_dir)
-            all_messages.extend(messages)
-            print(f"  Collected {len(messages)} messages")
-        except Exception as e:
-            print(f"  Error: {e}")
-            continue
-
-    # Save to JSON if path provided
+    # Names resolved so far are saved even if the run is interrupted or fails
+    try:
+        # Read at call time so a .env loaded after import still applies; lower it if 429s appear
+        max_workers = int(os.getenv('WORKSPACE_CONCURRENCY', MAX_WORKSPACE_WORKERS))
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(SLACK_CONFIG)))) as executor:
+            futures = []
+            for workspace_config in SLACK_CONFIG:
+                workspace_name = workspace_config['workspace_name']
+                print(f"Scraping workspace: {workspace_name}")
+                futures.append(executor.submit(
+                    scrape_workspace, workspace_config, start_timestamp, end_timestamp, temp_dir,
+                    user_caches[workspace_name], sync_states[workspace_name]
+                ))
+
+            # Collect in config order so output is deterministic
+            for workspace_config, future in zip(SLACK_CONFIG, futures):
+                workspace_name = workspace_config['workspace_name']
+                try:
+                    messages = future.result()
+                    if output_stream:
+                        SlackMessage.write_json_lines(messages, output_stream)
+                    all_messages.extend(messages)
+                    completed.append(workspace_name)
+                    print(f"  {workspace_name}: collected {len(messages)} messages")
+                except Exception as e:
+                    print(f"  {workspace_name}: error: {e}")
+                    continue
+    finally:
+        if output_stream:
+            output_stream.close()
+        if user_cache_path:
+            save_user_caches(user_cache_path, saved_users, user_caches)
+
+    # Save to JSON if path provided (JSONL was already streamed above)
     if output_path:
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(
-                [msg.model_dump() for msg in all_messages],
-                f,
-                indent=2,
-                ensure_ascii=False
-            )
+        if output_stream:
+            os.replace(tmp_output_path, output_path)
+        else:
+            SlackMessage.to_json_file(all_messages, output_path)
         print(f"\nSaved {len(all_messages)} messages to {output_path}")
 
+    # Advance checkpoints only once the messages behind them are saved, and only
+    # for workspaces that finished, so a failed run never skips unscraped messages
+    if sync_state_path:
+        save_sync_state(sync_state_path, saved_sync, {name: sync_states[name] for name in completed})
+
     return all_messages
 
 
-def main(start_dt: datetime, end_dt: datetime, temp_dir: Path, output_path: Path) -> Path:
+def main(
+    start_dt: datetime,
+    end_dt: datetime,
+    temp_dir: Optional[Path],
+    output_path: Path,
+    incremental: bool = False
+) -> list[SlackMessage]:
     """
     Main entry point for Stage 1
 
     Args:
         start_dt: Start datetime
         end_dt: End datetime
-        temp_dir: Temporary directory for file downloads
+        temp_dir: Temporary directory for file downloads, or None to skip downloads
         output_path: Path to save JSON output
+        incremental: Resume each channel from its sync checkpoint, fetching only messages
+            newer than the previous incremental run (cron mode); otherwise the whole
+            range is scraped and checkpoints are left untouched
 
     Returns:
-        Path to saved JSON file
+        List of scraped SlackMessage objects (also saved to output_path), so
+        Stage 2 can aggregate them without re-reading the file
     """
     print("="*80)
     print("STAGE 1: Slack Message Scraping")
@@ -405,7 +908,10 @@ def main(start_dt: datetime, end_dt: datetime, temp_dir: Path, output_path: Path
     print(f"Output: {output_path}")
     print("="*80)
 
-    messages = scrape_all_workspaces(start_dt, end_dt, temp_dir, output_path)
+    messages = scrape_all_workspaces(
+        start_dt, end_dt, temp_dir, output_path, USER_CACHE_FILE,
+        SYNC_STATE_FILE if incremental else None
+    )
 
     print(f"\n✅ Stage 1 complete: {len(messages)} messages scraped")
-    return output_path
+    return messages
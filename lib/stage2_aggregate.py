@@ -6,106 +6,107 @@ Aggregates messages from same user in same channel within 30-minute window
 
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Iterable, Optional
 from collections import defaultdict
+from operator import itemgetter
 
 from .models import SlackMessage
 
 
 def parse_datetime(dt_str: str) -> datetime:
     """Parse datetime string to datetime object"""
-    return datetime.strptime(dt_str, '%Y-%m-%dT%H:%M:%S')
+    # fromisoformat is implemented in C and accepts our '%Y-%m-%dT%H:%M:%S' format
+    return datetime.fromisoformat(dt_str)
 
 
-def aggregate_messages(messages: list[SlackMessage]) -> list[SlackMessage]:
+def message_epoch(msg: SlackMessage) -> float:
+    """Unix timestamp of a message, parsing datetime only for files without ts_epoch"""
+    if msg.ts_epoch is not None:
+        return msg.ts_epoch
+    return parse_datetime(msg.datetime).timestamp()
+
+
+def aggregate_messages(messages: Iterable[SlackMessage]) -> list[SlackMessage]:
     """
     Aggregate messages from same user in same channel within 30 minutes
 
     Args:
-        messages: List of SlackMessage objects
+        messages: SlackMessage objects, as a list or streamed (consumed once)
 
     Returns:
         List of aggregated SlackMessage objects
     """
-    if not messages:
-        return []
+    # Sort all messages once by numeric timestamp (Stage 1 output is mostly
+    # chronological per channel, so this is close to a linear merge)
+    by_epoch = itemgetter(0)
+    timed = sorted(((message_epoch(msg), msg) for msg in messages), key=by_epoch)
 
-    # Group messages by workspace, channel, and user
+    # Bucket by workspace, channel, and user; each bucket fills in time order
     groups = defaultdict(list)
-    for msg in messages:
-        key = (msg.workspace_name, msg.channel_name, msg.sending_user_name)
-        groups[key].append(msg)
+    for epoch, msg in timed:
+        groups[(msg.workspace_name, msg.channel_name, msg.sending_user_name)].append((epoch, msg))
 
-    # Sort each group by datetime
-    for key in groups:
-        groups[key].sort(key=lambda m: parse_datetime(m.datetime))
+    window = timedelta(minutes=30).total_seconds()
 
-    # Aggregate within each group
+    # Split each group into runs: messages within 30 minutes of the run's first message
     aggregated = []
+    join_textracts = ' [ADDITIONAL MESSAGE] '.join
 
     for (workspace, channel, user), group_messages in groups.items():
-        i = 0
-        while i < len(group_messages):
-            # Start a new aggregation group
-            current = group_messages[i]
-            current_dt = parse_datetime(current.datetime)
-
-            # Collect all messages within 30 minutes
-            textract_parts = [current.textract]
-            urls = current.urls.copy()
-            permalinks = current.permalink.copy()
-            file_paths = current.file_paths.copy()
-            original_indices = current.original_indices.copy()
-            latest_datetime = current.datetime
-
-            j = i + 1
-            while j < len(group_messages):
-                next_msg = group_messages[j]
-                next_dt = parse_datetime(next_msg.datetime)
-
-                # Check if within 30 minutes of the first message in group
-                if (next_dt - current_dt) <= timedelta(minutes=30):
-                    textract_parts.append(next_msg.textract)
-                    urls.extend(next_msg.urls)
-                    permalinks.extend(next_msg.permalink)
-                    file_paths.extend(next_msg.file_paths)
-                    original_indices.extend(next_msg.original_indices)
-                    latest_datetime = next_msg.datetime  # Use latest datetime
-                    j += 1
-                else:
-                    break
-
-            # Create aggregated message
+        runs = []
+        latest_epochs = []
+        run_start = None
+        for epoch, msg in group_messages:
+            if run_start is not None and (epoch - run_start) <= window:
+                runs[-1].append(msg)
+                latest_epochs[-1] = epoch
+            else:
+                run_start = epoch
+                runs.append([msg])
+                latest_epochs.append(epoch)
+
+        for run, latest_epoch in zip(runs, latest_epochs):
+            first, latest = run[0], run[-1]
+
+            # Deduplicate URLs in one pass, preserving first-seen order
+            seen_urls = set()
+            urls = []
+            for msg in run:
+                for url in msg.urls:
+                    if url not in seen_urls:
+                        seen_urls.add(url)
+                        urls.append(url)
+
+            # Validated construction runs in pydantic-core and beats model_construct
             aggregated_msg = SlackMessage(
                 workspace_name=workspace,
                 channel_name=channel,
-                channel_type=current.channel_type,
+                channel_type=first.channel_type,
                 sending_user_name=user,
-                datetime=latest_datetime,
-                textract=' [ADDITIONAL MESSAGE] '.join(textract_parts),
-                urls=list(dict.fromkeys(urls)),  # Deduplicate while preserving order
-                file_paths=file_paths,
-                permalink=permalinks,
-                original_indices=original_indices
+                datetime=latest.datetime,  # Use latest datetime
+                textract=join_textracts([msg.textract for msg in run]),
+                urls=urls,
+                file_paths=[path for msg in run for path in msg.file_paths],
+                permalink=[link for msg in run for link in msg.permalink],
+                original_indices=[index for msg in run for index in msg.original_indices],
+                ts_epoch=latest_epoch
             )
-            aggregated.append(aggregated_msg)
-
-            # Move to next non-aggregated message
-            i = j
+            aggregated.append((latest_epoch, aggregated_msg))
 
-    # Sort final result by datetime
-    aggregated.sort(key=lambda m: parse_datetime(m.datetime))
+    # Sort final result by timestamp, then drop the sort keys
+    aggregated.sort(key=by_epoch)
 
-    return aggregated
+    return [aggregated_msg for _, aggregated_msg in aggregated]
 
 
-def main(input_path: Path, output_path: Path) -> Path:
+def main(input_path: Path, output_path: Path, messages: Optional[list[SlackMessage]] = None) -> Path:
     """
     Main entry point for Stage 2
 
     Args:
         input_path: Path to Stage 1 JSON output
         output_path: Path to save Stage 2 JSON output
+        messages: Stage 1 messages already in memory; skips loading input_path
 
     Returns:
         Path to saved JSON file
@@ -117,17 +118,22 @@ def main(input_path: Path, output_path: Path) -> Path:
     print(f"Output: {output_path}")
     print("="*80)
 
-    # Load Stage 1 messages
-    messages = SlackMessage.from_json_file(input_path)
-    print(f"Loaded {len(messages)} messages")
+    # Stream Stage 1 messages straight into aggregation, one line parsed at a time,
+    # unless Stage 1 just handed them over
+    if messages is None:
+        print(f"Streaming messages from {input_path}")
+        aggregated = aggregate_messages(SlackMessage.iter_json_file(input_path))
+    else:
+        print(f"Using {len(messages)} messages from Stage 1")
+        aggregated = aggregate_messages(messages)
 
-    # Aggregate messages
-    aggregated = aggregate_messages(messages)
-    print(f"Aggregated into {len(aggregated)} message groups")
+    # Each Stage 1 message carries exactly one original index
+    message_count = sum(len(msg.original_indices) for msg in aggregated)
+    print(f"Aggregated {message_count} messages into {len(aggregated)} message groups")
 
     # Save to JSON
     SlackMessage.to_json_file(aggregated, output_path)
     print(f"Saved to {output_path}")
 
-    print(f"\n✅ Stage 2 complete: {len(messages)} → {len(aggregated)} messages")
+    print(f"\n✅ Stage 2 complete: {message_count} → {len(aggregated)} messages")
     return output_path
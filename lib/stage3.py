@@ -5,34 +5,116 @@ Extracts talk/event information from Slack messages using Gemini AI with paralle
 """
 
 import os
+import re
 import time
+import hashlib
+import importlib.util
+import sqlite3
+from collections import defaultdict
+from datetime import datetime
+from functools import lru_cache
+import asyncio
+import httpx
 from pathlib import Path
-from typing import Optional
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import BinaryIO, Callable, Optional
+from pydantic import BaseModel
+from pydantic_core import from_json, to_json
+from tenacity import (
+    AsyncRetrying,
+    RetryCallState,
+    RetryError,
+    Retrying,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_random,
+    wait_random_exponential,
+)
 from google import genai
-from google.genai.types import GenerateContentConfig
+from google.genai import errors
+from google.genai.types import GenerateContentConfig, CreateCachedContentConfig, HttpOptions
 
 from .models import (
     SlackMessage,
     MessageExtract,
+    BatchExtract,
+    MESSAGE_EXTRACT,
     PhysicalTalkInfo,
     VirtualTalkInfo,
     PhysicalEventInfo,
     VirtualEventInfo
 )
 
+# English names indexed by weekday() / month - 1 (avoids locale-dependent strftime)
+DAY_NAMES = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+MONTH_NAMES = (
+    'January', 'February', 'March', 'April', 'May', 'June',
+    'July', 'August', 'September', 'October', 'November', 'December'
+)
+
+# Gemini model used for extraction
+GEMINI_MODEL = "gemini-2.0-flash-exp"
+
+# Lifetime of the explicit context cache for the static prompt prefix (seconds)
+PROMPT_CACHE_TTL = 3600
+
+# Gemini responses cached by SHA-256 of the model, schema and full prompt (and of
+# the instructions and message text alone, for cross-posts), reused across reruns
+RESPONSE_CACHE_FILE = Path(__file__).parent.parent / 'cache' / 'stage3_responses.sqlite'
+
+# Slack formatting ignored when matching repeated announcements: emoji codes and
+# bold/italic/strike/code markers (words, digits, times and dates are kept exactly).
+# Emoji codes must not touch a digit, so times like 10:30-11:30: are left alone, and
+# '_' only counts as italics at a word edge, so room_101 stays distinct from room 101
+SLACK_MARKUP_RE = re.compile(r'(?<![\d:]):[a-z_+\-][a-z0-9_+\-]*:(?!\d)|[*~`]|(?<!\w)_|_(?!\w)')
+
 # Retry configuration
 MAX_RETRIES = 5
 INITIAL_RETRY_DELAY = 1
 MAX_RETRY_DELAY = 32
 
+# Random delay in [0, min(INITIAL_RETRY_DELAY * 2^n, MAX_RETRY_DELAY)] so concurrent 429s decorrelate
+JITTERED_BACKOFF = wait_random_exponential(multiplier=INITIAL_RETRY_DELAY, max=MAX_RETRY_DELAY)
+# Added to a server Retry-After, so workers given the same deadline do not all retry at once
+RETRY_AFTER_JITTER = wait_random(0, INITIAL_RETRY_DELAY)
+
+# 4xx codes that can succeed on retry (request timeout, rate limit); other 4xx fail fast
+RETRYABLE_CLIENT_CODES = frozenset({408, 429})
+
+# Gemini quota requests are paced under (override with GEMINI_RPM / GEMINI_TPM to
+# match the project's tier), and how many seconds of quota may be spent in a burst
+GEMINI_RPM = 1000
+GEMINI_TPM = 4_000_000
+GEMINI_BURST_SECONDS = 10
+
+# Rough characters per token, for estimating a request's share of GEMINI_TPM
+CHARS_PER_TOKEN = 4
+
+# Messages sent together in one Gemini request (shares the prompt preamble)
+BATCH_SIZE = 8
+# Estimated message-text tokens per batch request; long messages fill a batch before
+# BATCH_SIZE so one slow, output-heavy request doesn't hold up the run
+MAX_BATCH_TOKENS = 12_000
+
+# Print progress once per this many completed messages
+PROGRESS_INTERVAL = 25
+
+# Pooled keep-alive connections shared by all concurrent async requests
+MAX_CONNECTIONS = 32
+# With h2 installed (httpx[http2]), concurrent requests multiplex over a few connections
+# instead of each opening its own TLS connection
+HTTP2_AVAILABLE = importlib.util.find_spec('h2') is not None
+
 
 def get_gemini_client() -> Optional[genai.Client]:
-    """Initialize Gemini client"""
+    """Initialize Gemini client (its async httpx pool is reused across requests)"""
     api_key = os.getenv("GEMINI_API_KEY")
     if not api_key:
         raise ValueError("GEMINI_API_KEY not found in environment")
-    return genai.Client(api_key=api_key)
+    limits = httpx.Limits(max_connections=MAX_CONNECTIONS, max_keepalive_connections=MAX_CONNECTIONS)
+    return genai.Client(
+        api_key=api_key,
+        http_options=HttpOptions(async_client_args={'limits': limits, 'http2': HTTP2_AVAILABLE})
+    )
 
 
 def format_datetime_readable(iso_datetime: str) -> str:
@@ -44,43 +126,31 @@ def format_datetime_readable(iso_datetime: str) -> str:
     Returns:
         Human-readable format like "Thursday, October 23, 2025 at 4:00 PM"
     """
-    from datetime import datetime
-
-    try:
-        dt = datetime.fromisoformat(iso_datetime)
-        day_of_week = dt.strftime('%A')
-        month = dt.strftime('%B')
-        day = dt.day
-        year = dt.year
-        time_12hr = dt.strftime('%I:%M %p').lstrip('0')  # Remove leading zero from hour
+    # The output has minute precision, so messages posted in the same minute share a cache entry
+    readable = format_minute_readable(iso_datetime[:16])
+    return iso_datetime if readable is None else readable  # Return original if parsing fails
 
-        return f"{day_of_week}, {month} {day}, {year} at {time_12hr}"
-    except:
-        return iso_datetime  # Return original if parsing fails
 
+@lru_cache(maxsize=4096)
+def format_minute_readable(iso_minute: str) -> Optional[str]:
+    """Format a YYYY-MM-DDTHH:MM prefix for format_datetime_readable, or None if invalid"""
+    try:
+        # fromisoformat is C-implemented and beats slicing + int() by hand for this fixed format
+        dt = datetime.fromisoformat(iso_minute)
+    except (TypeError, ValueError):
+        return None
+    day_of_week = DAY_NAMES[dt.weekday()]
+    month = MONTH_NAMES[dt.month - 1]
+    hour_12 = dt.hour % 12 or 12
+    meridiem = 'AM' if dt.hour < 12 else 'PM'
 
-def build_extraction_prompt(message: SlackMessage) -> str:
-    """
-    Build Gemini prompt for event extraction
+    return f"{day_of_week}, {month} {dt.day}, {dt.year} at {hour_12}:{dt.minute:02d} {meridiem}"
 
-    Args:
-        message: SlackMessage to extract events from
 
-    Returns:
-        Formatted prompt string
-    """
-    readable_datetime = format_datetime_readable(message.datetime)
-    prompt = f"""
+# Static instructions shared by every request; sent once via an explicit context cache
+STATIC_PROMPT_PREFIX = """
 You are analyzing a Slack message to extract information about academic talks and events.
-
-MESSAGE CONTEXT:
-- Channel: #{message.channel_name}
-- Workspace: {message.workspace_name}
-- Sent by: {message.sending_user_name}
-- Sent at: {message.datetime} ({readable_datetime})
-
-MESSAGE TEXT:
-{message.textract}
+The message and its context are given at the end, under MESSAGE CONTEXT and MESSAGE TEXT.
 
 TASK:
 Extract ALL talks and events mentioned in this message. For each, determine if it is:
@@ -94,7 +164,7 @@ IMPORTANT GUIDELINES:
 1. **Names**: Extract first and last names in lowercase. If last name is not mentioned, set to null.
 
 2. **Dates**: Format as YYYY-MM-DDTHH:MM. Use '_' for unknown parts.
-   - ALWAYS use the message sent date ({readable_datetime}) to resolve relative dates
+   - ALWAYS use the message sent date ("Sent at" under MESSAGE CONTEXT) to resolve relative dates
    - Example: If message says "tomorrow at 3pm" and sent on Thursday, Oct 23, output: "2025-10-24T15:00"
    - Example: If message says "this Friday at 1pm" and sent on Thursday, Oct 23, output: "2025-10-24T13:00"
    - Example: If message says "next Monday" and sent on Thursday, Oct 23, output: "2025-10-27T__:__"
@@ -165,7 +235,259 @@ Output: [
 
 Return a JSON object with an "events" array containing all extracted events. If no events found, return empty array.
 """
-    return prompt
+
+
+# Per-message part of the prompt, filled with format_map
+PROMPT_SUFFIX_TMPL = """
+MESSAGE CONTEXT:
+- Channel: #{channel}
+- Workspace: {workspace}
+- Sent by: {user}
+- Sent at: {iso_dt} ({readable_dt})
+
+MESSAGE TEXT:
+{textract}
+"""
+
+# Full prompt template (braces in the static prefix escaped so only the suffix fields are filled)
+PROMPT_TMPL = STATIC_PROMPT_PREFIX.replace('{', '{{').replace('}', '}}') + PROMPT_SUFFIX_TMPL
+
+# Model, response schema and instructions behind every response; part of every
+# response cache key so changing any of them invalidates the stored extractions
+PROMPT_PREFIX_DIGEST = hashlib.sha256(
+    f"{GEMINI_MODEL}\n".encode() + to_json(MessageExtract.model_json_schema()) + f"\n{STATIC_PROMPT_PREFIX}".encode()
+).hexdigest()
+
+# Hash state after the static start of every response cache key; copied per message so
+# only the dynamic suffix is formatted and hashed
+RESPONSE_KEY_PREFIX_HASH = hashlib.sha256(f"{PROMPT_PREFIX_DIGEST}\n{STATIC_PROMPT_PREFIX}".encode())
+
+
+def prompt_fields(message: SlackMessage) -> dict:
+    """Placeholder values for PROMPT_SUFFIX_TMPL / PROMPT_TMPL"""
+    return {
+        "channel": message.channel_name,
+        "workspace": message.workspace_name,
+        "user": message.sending_user_name,
+        "iso_dt": message.datetime,
+        "readable_dt": format_datetime_readable(message.datetime),
+        "textract": message.textract,
+    }
+
+
+def build_dynamic_suffix(message: SlackMessage) -> str:
+    """
+    Build the per-message part of the prompt (context and text)
+
+    Args:
+        message: SlackMessage to extract events from
+
+    Returns:
+        Prompt suffix following STATIC_PROMPT_PREFIX
+    """
+    return PROMPT_SUFFIX_TMPL.format_map(prompt_fields(message))
+
+
+def build_extraction_prompt(message: SlackMessage) -> str:
+    """
+    Build the full Gemini prompt for event extraction (used when no context cache is available)
+
+    Args:
+        message: SlackMessage to extract events from
+
+    Returns:
+        Formatted prompt string
+    """
+    return PROMPT_TMPL.format_map(prompt_fields(message))
+
+
+# Header for several messages sent in one request; the numbered message blocks follow it
+BATCH_HEADER_TMPL = """
+This request contains {count} separate Slack messages, marked [MSG 1] to [MSG {count}].
+Apply the task to each message independently, using that message's own context and sent date.
+Return a JSON object with an "extracts" array holding exactly {count} entries, one per message;
+each entry has "message_number" (the N of its [MSG N] block) and an "events" array (empty if
+that message has no events).
+"""
+
+
+def build_batch_suffix(messages: list[SlackMessage]) -> str:
+    """
+    Build the dynamic part of a prompt covering several messages
+
+    Args:
+        messages: SlackMessages to extract events from
+
+    Returns:
+        Prompt suffix following STATIC_PROMPT_PREFIX
+    """
+    blocks = [BATCH_HEADER_TMPL.format(count=len(messages))]
+    for number, message in enumerate(messages, 1):
+        blocks.append(f"\n[MSG {number}]")
+        blocks.append(build_dynamic_suffix(message))
+    return "".join(blocks)
+
+
+def estimate_tokens(text: str) -> float:
+    """Approximate Gemini token count of text (CHARS_PER_TOKEN characters per token)"""
+    return len(text) / CHARS_PER_TOKEN
+
+
+def pack_batches(indices: list[int], messages: list[SlackMessage]) -> list[list[int]]:
+    """
+    Group messages of similar length into batch requests
+
+    Args:
+        indices: Indices into messages to batch
+        messages: All SlackMessages of the run
+
+    Returns:
+        Batches of indices (each sorted), holding at most BATCH_SIZE messages and,
+        unless a single message exceeds it, at most MAX_BATCH_TOKENS estimated tokens
+    """
+    batches = []
+    batch, batch_tokens = [], 0.0
+    # Sorted by length so one long message doesn't dominate a batch of short ones
+    for i in sorted(indices, key=lambda i: len(messages[i].textract)):
+        tokens = estimate_tokens(messages[i].textract)
+        if batch and (len(batch) == BATCH_SIZE or batch_tokens + tokens > MAX_BATCH_TOKENS):
+            batches.append(sorted(batch))
+            batch, batch_tokens = [], 0.0
+        batch.append(i)
+        batch_tokens += tokens
+    if batch:
+        batches.append(sorted(batch))
+    return batches
+
+
+class AsyncTokenBucket:
+    """asyncio token bucket: acquire(amount) waits until amount fits the per-minute budget"""
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60
+        self.capacity = max(1, per_minute * GEMINI_BURST_SECONDS / 60)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self, amount: float = 1):
+        """Take amount tokens, sleeping until they have refilled if the bucket runs short"""
+        # No await before the reservation, so tasks on one event loop need no lock
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        # Reserve now (possibly going negative) so waiting tasks queue up fairly
+        self.tokens -= amount
+        if self.tokens < 0:
+            await asyncio.sleep(-self.tokens / self.rate)
+
+
+class GeminiRateLimiter:
+    """Shared request and token budgets paced before every Gemini request of a run"""
+
+    def __init__(self, rpm: float = GEMINI_RPM, tpm: float = GEMINI_TPM):
+        self.requests = AsyncTokenBucket(rpm)
+        self.tokens = AsyncTokenBucket(tpm)
+
+    @classmethod
+    def from_env(cls) -> 'GeminiRateLimiter':
+        """Limiter with GEMINI_RPM / GEMINI_TPM from the environment (read at call time, after .env loads)"""
+        return cls(float(os.getenv('GEMINI_RPM', GEMINI_RPM)), float(os.getenv('GEMINI_TPM', GEMINI_TPM)))
+
+    async def wait(self, contents: str):
+        """Wait until one request of contents' estimated token count fits both budgets"""
+        await self.requests.acquire()
+        await self.tokens.acquire(estimate_tokens(contents))
+
+
+class PromptCache:
+    """Explicit Gemini context cache holding STATIC_PROMPT_PREFIX, shared by all async requests"""
+
+    def __init__(self, client: genai.Client):
+        self.client = client
+        self.name = None
+        self.enabled = True
+        self._lock = asyncio.Lock()
+
+    async def refresh(self, stale_name: Optional[str] = None) -> Optional[str]:
+        """
+        Create the cache, or recreate it after stale_name stopped working (e.g. TTL expiry).
+
+        Args:
+            stale_name: Cache name that failed; skipped if another task already replaced it
+
+        Returns:
+            Current cache name, or None if caching is unavailable
+        """
+        async with self._lock:
+            if not self.enabled or self.name != stale_name:
+                return self.name
+            try:
+                cache = await self.client.aio.caches.create(
+                    model=GEMINI_MODEL,
+                    config=CreateCachedContentConfig(
+                        contents=[STATIC_PROMPT_PREFIX],
+                        ttl=f"{PROMPT_CACHE_TTL}s"
+                    )
+                )
+                self.name = cache.name
+            except Exception as e:
+                # Model or prompt size not eligible for caching: send the full prompt instead
+                print(f"  Warning: Prompt caching unavailable, sending full prompts: {e}")
+                self.name = None
+                self.enabled = False
+            if stale_name:
+                # Usually already gone; otherwise it would bill storage until its TTL
+                await self._delete(stale_name)
+            return self.name
+
+    async def _delete(self, name: str):
+        """Delete a cache by name, ignoring errors (e.g. it already expired)"""
+        try:
+            await self.client.aio.caches.delete(name=name)
+        except Exception:
+            pass
+
+    async def delete(self):
+        """Delete the cache so it stops accruing storage before its TTL"""
+        if not self.name:
+            return
+        await self._delete(self.name)
+        self.name = None
+
+
+def _is_filled_str(value: Optional[str]) -> bool:
+    """Non-empty string that is not just a '_'/'-' placeholder (ignoring date separators)"""
+    return bool(value and value.strip() and value.replace('T', '').replace(':', '').strip('_-'))
+
+
+def _make_density_fn(event_cls: type[BaseModel]) -> Callable[[BaseModel], float]:
+    """
+    Build a density function for one event class from its static field list.
+
+    Args:
+        event_cls: One of the four event info models
+
+    Returns:
+        Function returning filled_fields / total_fields for an instance
+    """
+    # Bool fields count whenever set; string fields must hold real content
+    other_fields = tuple(name for name, field in event_cls.model_fields.items() if field.annotation is bool)
+    str_fields = tuple(name for name in event_cls.model_fields if name not in other_fields)
+    total_fields = len(str_fields) + len(other_fields)
+
+    def density(event_info: BaseModel) -> float:
+        filled_fields = sum(_is_filled_str(getattr(event_info, name)) for name in str_fields)
+        filled_fields += sum(getattr(event_info, name) is not None for name in other_fields)
+        return filled_fields / total_fields
+
+    return density
+
+
+# Per-class density functions, built once from each model's field list
+DENSITY_FN = {
+    event_cls: _make_density_fn(event_cls)
+    for event_cls in (PhysicalTalkInfo, VirtualTalkInfo, PhysicalEventInfo, VirtualEventInfo)
+}
 
 
 def calculate_extract_density(extract: MessageExtract) -> float:
@@ -182,193 +504,609 @@ def calculate_extract_density(extract: MessageExtract) -> float:
     if not extract or not extract.events:
         return 0.0
 
-    total_density = 0.0
+    # Return total density (sum of all event densities)
+    # This naturally favors extracts with more events
+    return sum(DENSITY_FN[type(event_info)](event_info) for event_info in extract.events)
 
-    for event_info in extract.events:
-        # event_info is directly the PhysicalTalkInfo/VirtualTalkInfo/etc. object
-        event_dict = event_info.model_dump()
 
-        # Count non-null, non-empty fields
-        filled_fields = 0
-        total_fields = 0
+def parse_response(response, schema: type[BaseModel] = MessageExtract) -> Optional[BaseModel]:
+    """
+    Read the structured result from a single-candidate Gemini response.
 
-        for key, value in event_dict.items():
-            total_fields += 1
+    Args:
+        response: GenerateContentResponse requested with the JSON schema of schema
+        schema: Model to validate the result into (MessageExtract or BatchExtract)
 
-            # Check if field is meaningfully filled
-            if value is not None:
-                if isinstance(value, str):
-                    # Non-empty string that's not all underscores
-                    if value.strip() and not all(c in '_-' for c in value.replace('T', '').replace(':', '')):
-                        filled_fields += 1
-                elif isinstance(value, bool):
-                    # Booleans always count
-                    filled_fields += 1
-                else:
-                    # Other non-null values
-                    filled_fields += 1
+    Returns:
+        Parsed model instance, or None if the output did not match the schema
+    """
+    parsed = response.parsed
+    # With a precomputed JSON schema the SDK hands back the decoded JSON; validating that
+    # dict is faster for the event union than re-reading response.text with model_validate_json
+    if isinstance(parsed, dict):
+        try:
+            parsed = schema.model_validate(parsed)
+        except ValueError:
+            parsed = None
+    if not isinstance(parsed, schema):
+        print(f"  Warning: Response did not match the {schema.__name__} schema")
+        return None
+    return parsed
 
-        # Density for this event = filled_fields / total_fields
-        event_density = filled_fields / total_fields if total_fields > 0 else 0
-        total_density += event_density
 
-    # Return total density (sum of all event densities)
-    # This naturally favors extracts with more events
-    return total_density
+def normalize_textract(textract: str) -> str:
+    """
+    Message text with case, whitespace and Slack formatting folded away
+
+    Reposts of an announcement that differ only in emoji, *bold* markers or line
+    breaks normalize to the same string; any change to words, digits, times or dates
+    still yields a different one, so a match never carries over the wrong date.
+    """
+    return ' '.join(SLACK_MARKUP_RE.sub(' ', textract.lower()).split())
+
+
+def textract_key(message: SlackMessage) -> str:
+    """Digest of the normalized message text and sent date, shared by cross-posted duplicates"""
+    return hashlib.blake2b(
+        f"{message.datetime[:10]}\n{normalize_textract(message.textract)}".encode(), digest_size=16
+    ).hexdigest()
+
+
+def response_cache_key(message: SlackMessage) -> str:
+    """SHA-256 of the model and full prompt, so any prompt change misses the cache"""
+    # Same digest as hashing build_extraction_prompt(message), which is STATIC_PROMPT_PREFIX + suffix
+    key_hash = RESPONSE_KEY_PREFIX_HASH.copy()
+    key_hash.update(build_dynamic_suffix(message).encode())
+    return key_hash.hexdigest()
+
+
+def content_cache_key(message: SlackMessage) -> str:
+    """
+    SHA-256 of the instructions, sent date and normalized text, ignoring channel/workspace/sender.
+
+    Second cache tier: a message cross-posted in another channel, re-scraped with
+    different metadata, or reposted with different formatting (see normalize_textract)
+    reuses the stored extraction even though its prompt differs.
+    """
+    return hashlib.sha256(
+        f"{PROMPT_PREFIX_DIGEST}\n{message.datetime[:10]}\n{normalize_textract(message.textract)}".encode()
+    ).hexdigest()
+
+
+def open_response_cache(path: Path) -> sqlite3.Connection:
+    """Open (creating if needed) the SQLite response cache"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, isolation_level=None)  # Autocommit: each stored response survives a crash
+    conn.execute("PRAGMA journal_mode=WAL")  # Appends instead of rewriting pages per commit
+    conn.execute("CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, extract BLOB NOT NULL)")
+    return conn
+
+
+def load_cached_extract(conn: sqlite3.Connection, key: str) -> Optional[MessageExtract]:
+    """Return the cached MessageExtract for key, or None on a miss or unreadable entry"""
+    row = conn.execute("SELECT extract FROM responses WHERE key = ?", (key,)).fetchone()
+    if row is None:
+        return None
+    try:
+        # Parsed first: the event union validates faster from Python objects than from JSON
+        return MESSAGE_EXTRACT.validate_python(from_json(row[0]))
+    except ValueError:
+        return None
+
+
+def find_cached_extract(
+    conn: sqlite3.Connection,
+    message: SlackMessage,
+    key: Optional[str] = None
+) -> Optional[MessageExtract]:
+    """Look message up by prompt key (key, if already computed), then by content key"""
+    cached = load_cached_extract(conn, key or response_cache_key(message))
+    if cached is None:
+        cached = load_cached_extract(conn, content_cache_key(message))
+    return cached
+
+
+def store_cached_extract(conn: sqlite3.Connection, message: SlackMessage, extract: MessageExtract):
+    """Save a successful extraction under the message's prompt and content keys"""
+    data = MESSAGE_EXTRACT.dump_json(extract)
+    conn.executemany(
+        "INSERT OR REPLACE INTO responses (key, extract) VALUES (?, ?)",
+        [(response_cache_key(message), data), (content_cache_key(message), data)]
+    )
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """Seconds from the Retry-After header of a failed API response, if the server sent one"""
+    if isinstance(error, PromptCacheError):
+        error = error.__cause__  # The API error behind the cache retry
+    headers = getattr(getattr(error, 'response', None), 'headers', None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+def wait_for_retry(retry_state: RetryCallState) -> float:
+    """Honor Retry-After (plus up to a second of jitter) when present, otherwise jittered exponential backoff"""
+    delay = retry_after_seconds(retry_state.outcome.exception())
+    if delay is not None:
+        return delay + RETRY_AFTER_JITTER(retry_state)
+    return JITTERED_BACKOFF(retry_state)
+
+
+class PromptCacheError(Exception):
+    """A request on top of the context cache failed; retried once the cache is recreated"""
+
+
+def is_prompt_cache_error(error: BaseException) -> bool:
+    """Whether a request failed because its context cache no longer exists (expired or deleted)"""
+    if not isinstance(error, errors.ClientError):
+        return False
+    # Expired caches come back as NOT_FOUND, or as 403 "CachedContent not found (or permission denied)"
+    return error.code == 404 or (error.code == 403 and 'cachedcontent' in str(error.message).lower())
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Retry errors except client errors (4xx other than timeouts and rate limits) and Ctrl-C"""
+    if not isinstance(error, Exception):
+        return False  # KeyboardInterrupt / SystemExit propagate immediately
+    if isinstance(error, errors.ClientError):
+        return error.code in RETRYABLE_CLIENT_CODES
+    return True
+
+
+# Retry policy shared by the sync and async extraction paths
+RETRY_POLICY = dict(
+    stop=stop_after_attempt(MAX_RETRIES),
+    wait=wait_for_retry,
+    retry=retry_if_exception(is_retryable),
+)
+
+
+class PartialResult(BaseModel):
+    """One completed extraction in the partial results log"""
+    key: str
+    extract: MessageExtract
+
+
+def load_partial_results(path: Path) -> dict[str, MessageExtract]:
+    """
+    Read the partial results log left by an interrupted run.
+
+    Args:
+        path: Partial .jsonl file
+
+    Returns:
+        Dict of prompt key to MessageExtract (empty if missing; a torn last line is skipped)
+    """
+    if not path.exists():
+        return {}
+    results = {}
+    with open(path, 'rb') as f:
+        for line in f:
+            try:
+                result = PartialResult.model_validate(from_json(line))
+            except ValueError:
+                continue
+            results[result.key] = result.extract
+    return results
+
+
+def open_partial_log(path: Path, resume: bool) -> BinaryIO:
+    """
+    Open the partial results log for writing, or for appending when resuming.
+
+    A resumed log is first cut back to its last complete line, so the first new
+    record is not glued onto a line torn by the crash.
+    """
+    if not resume:
+        return open(path, 'wb')
+    f = open(path, 'r+b')
+    end = f.read().rfind(b"\n") + 1
+    f.seek(end)
+    f.truncate()
+    return f
+
+
+# JSON schemas generated once; passing the model class makes google-genai rerun
+# model_json_schema() on every request
+RESPONSE_SCHEMAS = {
+    MessageExtract: MessageExtract.model_json_schema(),
+    BatchExtract: BatchExtract.model_json_schema(),
+}
+
+
+@lru_cache(maxsize=16)
+def build_generation_config(
+    cached_content: Optional[str] = None,
+    response_schema: type[BaseModel] = MessageExtract
+) -> GenerateContentConfig:
+    """
+    Structured-output config for a single candidate, optionally on top of a context cache.
+
+    Built once per (cache, schema) pair and shared by every request, so callers
+    must not mutate it (google-genai copies the config before use).
+    """
+    return GenerateContentConfig(
+        cached_content=cached_content,
+        response_mime_type="application/json",
+        response_schema=RESPONSE_SCHEMAS[response_schema],
+        candidate_count=1,
+    )
 
 
 def extract_events_with_retry(
     client: genai.Client,
-    message: SlackMessage
+    message: SlackMessage,
+    cached_content: Optional[str] = None,
+    response_cache: Optional[sqlite3.Connection] = None
 ) -> MessageExtract:
     """
-    Extract events from message with retry logic and parallel sampling.
-    Uses candidate_count=3 to generate multiple candidates and picks the one
-    with highest information density.
+    Extract events from message with retry logic.
 
     Args:
         client: Gemini client
         message: SlackMessage to extract from
+        cached_content: Name of a live context cache holding STATIC_PROMPT_PREFIX
+            (see PromptCache); only the per-message suffix is sent when given
+        response_cache: Optional SQLite response cache (see open_response_cache)
+            answered from before calling Gemini, and filled on success
 
     Returns:
-        MessageExtract with list of events (highest density candidate)
+        MessageExtract with list of events (empty if retries are exhausted)
+
+    Raises:
+        errors.ClientError: On a request error that retrying cannot fix
     """
-    prompt = build_extraction_prompt(message)
-    retry_delay = INITIAL_RETRY_DELAY
-    last_error = None
+    if response_cache is not None:
+        cached = find_cached_extract(response_cache, message)
+        if cached is not None:
+            return cached
 
-    for attempt in range(MAX_RETRIES):
-        try:
-            response = client.models.generate_content(
-                model="gemini-2.0-flash-exp",
-                contents=prompt,
-                config=GenerateContentConfig(
-                    response_mime_type="application/json",
-                    response_schema=MessageExtract,
-                    candidate_count=3,  # Generate 3 candidates
+    if cached_content:
+        prompt = build_dynamic_suffix(message)
+    else:
+        prompt = build_extraction_prompt(message)
+
+    try:
+        for attempt in Retrying(**RETRY_POLICY):
+            with attempt:
+                response = client.models.generate_content(
+                    model=GEMINI_MODEL,
+                    contents=prompt,
+                    config=build_generation_config(cached_content)
                 )
-            )
+    except RetryError:
+        # Return empty extract if all retries exhausted
+        return MessageExtract(events=[])
 
-            # Collect all candidates and their densities
-            candidates = []
+    extract = parse_response(response)
+    if extract is None:
+        return MessageExtract(events=[])
+    if response_cache is not None:
+        store_cached_extract(response_cache, message, extract)
+    return extract
 
-            # Access candidates directly (response.parsed only gives first one)
-            for candidate in response.candidates:
-                try:
-                    # Get the JSON text from the candidate
-                    if hasattr(candidate, 'content') and hasattr(candidate.content, 'parts'):
-                        json_text = candidate.content.parts[0].text
-
-                        # Parse JSON to MessageExtract
-                        import json
-                        extract_dict = json.loads(json_text)
-                        message_extract = MessageExtract(**extract_dict)
-
-                        # Calculate density
-                        density = calculate_extract_density(message_extract)
-                        candidates.append((message_extract, density))
-                except Exception as e:
-                    # Skip malformed candidates
-                    print(f"  Warning: Skipping malformed candidate: {e}")
-                    continue
-
-            # Pick candidate with highest density
-            if candidates:
-                best_extract, best_density = max(candidates, key=lambda x: x[1])
-                print(f"  → Selected best candidate with density {best_density:.2f} (from {len(candidates)} candidates)")
-                return best_extract
-            else:
-                # No valid candidates, return empty
-                print("  Warning: No valid candidates found")
-                return MessageExtract(events=[])
-
-        except Exception as e:
-            last_error = e
-            error_str = str(e).lower()
-
-            # Check for rate limit errors
-            if 'rate' in error_str or 'quota' in error_str or 'resource_exhausted' in error_str:
-                if attempt < MAX_RETRIES - 1:
-                    time.sleep(retry_delay)
-                    retry_delay = min(retry_delay * 2, MAX_RETRY_DELAY)
-                    continue
-                else:
-                    # Return empty extract on final failure
-                    return MessageExtract(events=[])
-
-            # For other errors, retry with shorter delay
-            elif attempt < MAX_RETRIES - 1:
-                time.sleep(retry_delay)
-                retry_delay = min(retry_delay * 2, MAX_RETRY_DELAY)
-                continue
-            else:
-                # Return empty extract on final failure
-                return MessageExtract(events=[])
 
-    # Return empty extract if all retries exhausted
-    return MessageExtract(events=[])
+async def generate_async(
+    client: genai.Client,
+    suffix: str,
+    response_schema: type[BaseModel],
+    prompt_cache: Optional[PromptCache] = None,
+    rate_limiter: Optional[GeminiRateLimiter] = None
+):
+    """
+    Send STATIC_PROMPT_PREFIX + suffix with RETRY_POLICY (only suffix when the context cache is live).
+
+    Args:
+        client: Gemini client
+        suffix: Dynamic part of the prompt
+        response_schema: Structured-output schema for the response
+        prompt_cache: Optional context cache for STATIC_PROMPT_PREFIX
+        rate_limiter: Optional shared limiter every attempt waits on, so 429s
+            are avoided up front rather than backed off from
+
+    Returns:
+        GenerateContentResponse
 
+    Raises:
+        RetryError: If every retryable attempt failed
+        errors.ClientError: On a request error that retrying cannot fix
+    """
+    async for attempt in AsyncRetrying(**RETRY_POLICY):
+        with attempt:
+            cache_name = prompt_cache.name if prompt_cache else None
+            contents = suffix if cache_name else STATIC_PROMPT_PREFIX + suffix
+            if rate_limiter is not None:
+                await rate_limiter.wait(contents)
+            try:
+                response = await client.aio.models.generate_content(
+                    model=GEMINI_MODEL,
+                    contents=contents,
+                    config=build_generation_config(cache_name, response_schema)
+                )
+            except Exception as error:
+                if cache_name and is_prompt_cache_error(error):
+                    # Cache expired; recreate it and retry even though the error was a 4xx
+                    await prompt_cache.refresh(cache_name)
+                    raise PromptCacheError(str(error)) from error
+                raise
+    return response
 
-def extract_all_events(
+
+async def extract_events_async(
+    client: genai.Client,
+    message: SlackMessage,
+    prompt_cache: Optional[PromptCache] = None,
+    response_cache: Optional[sqlite3.Connection] = None,
+    rate_limiter: Optional[GeminiRateLimiter] = None
+) -> Optional[MessageExtract]:
+    """
+    Async version of extract_events_with_retry using client.aio.
+
+    Backoff uses asyncio.sleep, so one message waiting on a rate limit does
+    not hold up the others. When prompt_cache holds a live cache, only the
+    per-message suffix is sent.
+
+    Args:
+        client: Gemini client
+        message: SlackMessage to extract from
+        prompt_cache: Optional context cache for STATIC_PROMPT_PREFIX
+        response_cache: Optional SQLite cache that successful extractions are stored in
+        rate_limiter: Optional shared Gemini rate limiter
+
+    Returns:
+        MessageExtract with list of events, or None if retries are exhausted or
+        the response cannot be parsed
+    """
+    try:
+        response = await generate_async(
+            client, build_dynamic_suffix(message), MessageExtract, prompt_cache, rate_limiter
+        )
+    except RetryError:
+        return None
+
+    extract = parse_response(response)
+    if extract is None:
+        return None
+    if response_cache is not None:
+        store_cached_extract(response_cache, message, extract)
+    return extract
+
+
+async def extract_batch_async(
+    client: genai.Client,
     messages: list[SlackMessage],
-    output_path: Optional[Path] = None,
-    max_workers: int = 5
+    prompt_cache: Optional[PromptCache] = None,
+    response_cache: Optional[sqlite3.Connection] = None,
+    rate_limiter: Optional[GeminiRateLimiter] = None
+) -> Optional[list[Optional[MessageExtract]]]:
+    """
+    Extract events from several messages in one request, sharing the prompt preamble.
+
+    Results are matched to messages by their message_number, so a response that
+    skips or reorders entries still yields every message it did answer.
+
+    Args:
+        client: Gemini client
+        messages: SlackMessages to extract from
+        prompt_cache: Optional context cache for STATIC_PROMPT_PREFIX
+        response_cache: Optional SQLite cache that successful extractions are stored in
+        rate_limiter: Optional shared Gemini rate limiter
+
+    Returns:
+        One MessageExtract per message (None for messages the response left out),
+        or None if the whole batch failed; missing messages should be sent one at a time
+    """
+    try:
+        response = await generate_async(
+            client, build_batch_suffix(messages), BatchExtract, prompt_cache, rate_limiter
+        )
+    except RetryError:
+        return None
+
+    batch = parse_response(response, BatchExtract)
+    if batch is None:
+        return None
+
+    results = [None] * len(messages)
+    for item in batch.extracts:
+        # First answer per number wins; numbers outside the batch are ignored
+        if 1 <= item.message_number <= len(messages) and results[item.message_number - 1] is None:
+            results[item.message_number - 1] = MessageExtract(events=item.events)
+
+    missing = results.count(None)
+    if missing:
+        print(f"  Warning: Batch response missed {missing} of {len(messages)} messages, retrying those individually")
+
+    if response_cache is not None:
+        for message, extract in zip(messages, results):
+            if extract is not None:
+                store_cached_extract(response_cache, message, extract)
+    return results
+
+
+async def _extract_all_async(
+    client: genai.Client,
+    messages: list[SlackMessage],
+    max_workers: int,
+    response_cache: Optional[sqlite3.Connection] = None,
+    refresh: bool = False,
+    resumed: Optional[dict[str, MessageExtract]] = None,
+    partial_file: Optional[BinaryIO] = None
 ) -> list[MessageExtract]:
     """
-    Extract events from all messages using Gemini with parallel processing
+    Extract every uncached message in batches from pack_batches, at most max_workers requests at a time.
 
     Args:
+        client: Gemini client
         messages: List of SlackMessage objects
-        output_path: Optional path to save JSON output
-        max_workers: Number of parallel workers (default: 5)
+        max_workers: Maximum concurrent requests
+        response_cache: Optional SQLite response cache
+        refresh: Ignore cached responses
+        resumed: Extracts by prompt key recovered from an interrupted run
+        partial_file: Optional binary file each successful fresh result is appended to as it completes
 
     Returns:
         List of MessageExtract objects (one per input message)
     """
-    client = get_gemini_client()
-
-    # Process messages in parallel using ThreadPoolExecutor
-    extracts = [None] * len(messages)  # Preserve order
+    extracts = [None] * len(messages)
+    keys = [response_cache_key(msg) for msg in messages]
+    pending = []
+
+    # Serve reruns from the interrupted run and the response cache before touching the API
+    for i, key in enumerate(keys):
+        cached = resumed.get(key) if resumed else None
+        if cached is None and response_cache is not None and not refresh:
+            cached = find_cached_extract(response_cache, messages[i], key)
+        if cached is not None:
+            extracts[i] = cached
+        else:
+            pending.append(i)
+
+    if len(pending) < len(messages):
+        print(f"Reusing {len(messages) - len(pending)} cached response(s)")
+    if not pending:
+        return extracts
+
+    # Cross-posted messages share one request: the same text sent on the same day yields the same events
+    duplicates = defaultdict(list)
+    for i in pending:
+        duplicates[textract_key(messages[i])].append(i)
+    members_of = {members[0]: members for members in duplicates.values()}
+    if len(members_of) < len(pending):
+        print(f"Coalesced {len(pending) - len(members_of)} duplicate message(s)")
+
+    semaphore = asyncio.Semaphore(max_workers)
     completed_count = 0
 
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Submit all tasks
-        future_to_index = {
-            executor.submit(extract_events_with_retry, client, msg): i
-            for i, msg in enumerate(messages)
-        }
-
-        # Process completed futures
-        for future in as_completed(future_to_index):
-            index = future_to_index[future]
+    prompt_cache = PromptCache(client)
+    await prompt_cache.refresh()
+    rate_limiter = GeminiRateLimiter.from_env()
+
+    def record(i: int, extract: MessageExtract, succeeded: bool = True):
+        nonlocal completed_count
+        # Fan the representative's result out to every duplicate of it
+        for j in members_of[i]:
+            extracts[j] = extract
+            # Failures stay out of the log, so a resumed run sends them again
+            if partial_file is not None and succeeded:
+                # A PartialResult line, serialized by pydantic-core without building the model
+                partial_file.write(to_json({'key': keys[j], 'extract': extract}) + b"\n")
             completed_count += 1
-            print(f"Processing message {completed_count}/{len(messages)}...")
+            if completed_count % PROGRESS_INTERVAL == 0 or completed_count == len(pending):
+                print(f"Processed {completed_count}/{len(pending)} messages...")
+        if partial_file is not None and succeeded:
+            partial_file.flush()
 
+    async def extract_single(i: int):
+        async with semaphore:
             try:
-                extract = future.result()
-                extracts[index] = extract
-
-                if extract.events:
-                    print(f"  Found {len(extract.events)} event(s)")
+                extract = await extract_events_async(client, messages[i], prompt_cache, response_cache, rate_limiter)
             except Exception as e:
                 print(f"  Error: {e}")
-                extracts[index] = MessageExtract(events=[])
+                extract = None
+        if extract is None:
+            record(i, MessageExtract(events=[]), succeeded=False)
+        else:
+            record(i, extract)
+
+    async def extract_batch(indices: list[int]):
+        results = None
+        if len(indices) > 1:
+            async with semaphore:
+                try:
+                    results = await extract_batch_async(
+                        client, [messages[i] for i in indices], prompt_cache, response_cache, rate_limiter
+                    )
+                except Exception as e:
+                    print(f"  Error: {e}")
+        if results is None:
+            # Single message or failed batch: one request per message (semaphore released above)
+            results = [None] * len(indices)
+        for i, extract in zip(indices, results):
+            if extract is not None:
+                record(i, extract)
+        # Messages the batch did not answer go out one at a time
+        await asyncio.gather(*(extract_single(i) for i, extract in zip(indices, results) if extract is None))
+
+    batches = pack_batches(list(members_of), messages)
+
+    try:
+        await asyncio.gather(*(extract_batch(indices) for indices in batches))
+    finally:
+        await prompt_cache.delete()
 
-    # Save to JSON if path provided
+    # Density is logged once as a quality metric for offline analysis
+    densities = [calculate_extract_density(extracts[i]) for i in pending if extracts[i].events]
+    if densities:
+        print(f"  {len(densities)} message(s) with events, mean density {sum(densities) / len(densities):.2f}")
+
+    return extracts
+
+
+def extract_all_events(
+    messages: list[SlackMessage],
+    output_path: Optional[Path] = None,
+    max_workers: int = 5,
+    response_cache_path: Optional[Path] = None,
+    refresh_cache: bool = False
+) -> list[MessageExtract]:
+    """
+    Extract events from all messages using the async Gemini client
+
+    Args:
+        messages: List of SlackMessage objects
+        output_path: Optional path to save JSON output (results stream to a
+            .partial.jsonl beside it until the run finishes)
+        max_workers: Maximum concurrent requests (default: 5)
+        response_cache_path: Optional SQLite file caching responses by prompt hash
+        refresh_cache: Ignore cached responses (fresh ones are still stored)
+
+    Returns:
+        List of MessageExtract objects (one per input message)
+    """
+    client = get_gemini_client()
+
+    # Results stream to a partial log while running, so an interrupted run resumes from it
+    partial_path = output_path.with_suffix('.partial.jsonl') if output_path else None
+    resumed = load_partial_results(partial_path) if partial_path and not refresh_cache else {}
+    if resumed:
+        print(f"Resuming with {len(resumed)} result(s) from {partial_path}")
+
+    response_cache = open_response_cache(response_cache_path) if response_cache_path else None
+    partial_file = open_partial_log(partial_path, bool(resumed)) if partial_path else None
+    try:
+        extracts = asyncio.run(
+            _extract_all_async(
+                client, messages, max_workers, response_cache, refresh_cache, resumed, partial_file
+            )
+        )
+    finally:
+        if response_cache is not None:
+            response_cache.close()
+        if partial_file is not None:
+            partial_file.close()
+
+    # Consolidate into the index-aligned JSON output in one pass
     if output_path:
         MessageExtract.to_json_file(extracts, output_path)
+        partial_path.unlink(missing_ok=True)
         print(f"\nSaved {len(extracts)} extractions to {output_path}")
 
     return extracts
 
 
-def main(input_path: Path, output_path: Path) -> Path:
+def main(input_path: Path, output_path: Path, refresh_cache: bool = False) -> Path:
     """
     Main entry point for Stage 3
 
     Args:
         input_path: Path to Stage 2 JSON output (aggregated messages)
         output_path: Path to save Stage 3 JSON output
+        refresh_cache: Re-query Gemini even for messages with cached responses
 
     Returns:
         Path to saved JSON file
@@ -385,7 +1123,10 @@ def main(input_path: Path, output_path: Path) -> Path:
     print(f"Loaded {len(messages)} aggregated messages")
 
     # Extract events with parallel processing
-    extracts = extract_all_events(messages, output_path, max_workers=5)
+    extracts = extract_all_events(
+        messages, output_path, max_workers=5,
+        response_cache_path=RESPONSE_CACHE_FILE, refresh_cache=refresh_cache
+    )
 
     # Summary
     total_events = sum(len(extract.events) for extract in extracts)
@@ -4,11 +4,26 @@ Stage 4: Google Calendar Integration
 Adds events from Stage 3 Gemini extraction to Google Calendar with deduplication
 """
 
+import asyncio
+import hashlib
+import io
+import re
+import sqlite3
+import sys
+import time
+from contextlib import redirect_stdout
 from datetime import datetime, timedelta
+from functools import lru_cache
+from itertools import chain, repeat
 from pathlib import Path
 from typing import Optional, Union
+from zoneinfo import ZoneInfo
+import google_auth_httplib2
+import httplib2
+from google.auth.transport.requests import Request
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 
 from .init_config import CALENDAR_ID
 from .models import (
@@ -27,61 +42,153 @@ SCOPES = ['https://www.googleapis.com/auth/calendar']
 
 # Calendar configuration
 TIMEZONE = 'America/New_York'
-
-
-def get_calendar_service():
-    """Create and return authenticated Google Calendar service"""
-    credentials = service_account.Credentials.from_service_account_file(
+TZ = ZoneInfo(TIMEZONE)
+
+# Calendar batch requests accept at most 50 calls each
+BATCH_SIZE = 50
+
+# Individual calls in flight at once (user quota is 500 requests / 100 seconds)
+MAX_CONCURRENT_REQUESTS = 10
+# Retries per call on 429/5xx (the client library backs off exponentially)
+MAX_REQUEST_RETRIES = 5
+HTTP_TIMEOUT = 30  # Seconds per Calendar API request
+# Batched calls that fail with 429/5xx are resent in a later batch, backing off from this delay
+BATCH_RETRY_DELAY = 1.0
+# 403 reasons Calendar uses for quota errors (retryable, unlike permission errors)
+RATE_LIMIT_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded'}
+
+# Reminders for every event; shared by all bodies and never mutated
+REMINDERS = {
+    'useDefault': False,
+    'overrides': [
+        {'method': 'email', 'minutes': 1440},  # 1 day before
+        {'method': 'email', 'minutes': 60},    # 1 hour before
+    ],
+}
+
+# RRULEs per is_recurring value; shared lists, only ever serialized into request bodies
+RECURRENCE_RULES = {
+    'weekly': ['RRULE:FREQ=WEEKLY'],
+    'biweekly': ['RRULE:FREQ=WEEKLY;INTERVAL=2'],
+    'monthly': ['RRULE:FREQ=MONTHLY'],
+}
+
+# Extracted dates after unknown '_' digits become '0': YYYY-MM-DDTHH:MM
+DATE_RE = re.compile(r'(\d+)-(\d+)-(\d+)T(\d+):(\d+)')
+
+# Event fields deduplication and overwrites read from the bulk prefetch
+# Event dates further apart than this are prefetched as separate windows, so one
+# outlier date doesn't pull in months of calendar between it and the rest
+PREFETCH_MAX_GAP = timedelta(days=31)
+PREFETCH_FIELDS = 'nextPageToken,items(id,summary,start,recurringEventId,recurrence)'
+
+# Events known to be on the calendar from earlier runs, so re-runs skip the Calendar lookup
+# (one ledger file per calendar, see ledger_path)
+LEDGER_DIR = Path(__file__).parent.parent / 'cache'
+
+
+@lru_cache(maxsize=1)
+def load_credentials():
+    """Read the service account key once per process"""
+    return service_account.Credentials.from_service_account_file(
         str(CREDENTIALS_FILE),
         scopes=SCOPES
     )
-    service = build('calendar', 'v3', credentials=credentials)
+
+
+def get_credentials():
+    """Return the process-wide service account credentials with a valid access token"""
+    credentials = load_credentials()
+    # Refresh up front (and again once expired) so concurrent workers share a valid
+    # token instead of racing to refresh
+    if not credentials.valid:
+        credentials.refresh(Request())
+    return credentials
+
+
+def new_authorized_http(credentials):
+    """Create a keep-alive HTTP connection that attaches the credentials' token"""
+    return google_auth_httplib2.AuthorizedHttp(credentials, http=httplib2.Http(timeout=HTTP_TIMEOUT))
+
+
+@lru_cache(maxsize=1)
+def get_calendar_service(credentials=None):
+    """Create and return authenticated Google Calendar service (built once per credentials)"""
+    if credentials is None:
+        credentials = get_credentials()
+    # One reused connection for every sequential call; bundled discovery doc, so no fetch at startup
+    service = build(
+        'calendar', 'v3',
+        http=new_authorized_http(credentials),
+        cache_discovery=False,
+        static_discovery=True
+    )
     return service
 
 
+@lru_cache(maxsize=1024)
 def parse_event_datetime(date_str: str) -> Optional[dict]:
     """
     Parse event datetime string and return dict with date/time info.
 
+    Results are memoized (the same date strings recur across messages), so
+    the returned dict is shared between callers and must not be modified.
+
     Args:
         date_str: DateTime in format YYYY-MM-DDTHH:MM (underscores for unknown)
 
     Returns:
         Dict with {year, month, day, hour, minute, has_time, all_day} or None if invalid
     """
-    # Replace underscores with None values
-    parts = date_str.replace('_', '0')
+    # A fully unknown year, month or day can never be scheduled; reject it before any parsing
+    if date_str[4:5] == '-' and date_str[7:8] == '-' and date_str[10:11] == 'T' and (
+        date_str[:4] == '____' or date_str[5:7] == '__' or date_str[8:10] == '__'
+    ):
+        return None
 
-    try:
-        # Split date and time
-        date_part, time_part = parts.split('T')
-        year, month, day = map(int, date_part.split('-'))
-        hour, minute = map(int, time_part.split(':'))
+    # Fully known YYYY-MM-DDTHH:MM (the common case) goes through the C ISO parser
+    if (len(date_str) == 16 and date_str[10] == 'T' and date_str[13] == ':'
+            and '_' not in date_str):
+        try:
+            parsed = datetime.fromisoformat(date_str)
+        except ValueError:
+            parsed = None  # Out-of-range fields; let the general path decide
+        if parsed is not None:
+            return build_datetime_info(parsed.year, parsed.month, parsed.day, parsed.hour, parsed.minute)
 
-        # Check if year/month/day are valid
-        if year == 0 or month == 0 or day == 0:
-            return None
+    # Replace underscores with None values
+    match = DATE_RE.fullmatch(date_str.replace('_', '0'))
+    if not match:
+        return None
+    year, month, day, hour, minute = map(int, match.groups())
 
-        # Check if time was specified (not all underscores)
-        has_time = (hour != 0 or minute != 0) and '____-__-__T__:__' not in date_str
-        all_day = not has_time
-
-        return {
-            'year': year,
-            'month': month,
-            'day': day,
-            'hour': hour if has_time else 8,  # Default 8 AM for all-day
-            'minute': minute if has_time else 0,
-            'has_time': has_time,
-            'all_day': all_day
-        }
-    except:
+    # Check if year/month/day are valid
+    if year == 0 or month == 0 or day == 0:
         return None
 
+    return build_datetime_info(year, month, day, hour, minute)
+
+
+def build_datetime_info(year: int, month: int, day: int, hour: int, minute: int) -> dict:
+    """Build the parse_event_datetime result for a known date (00:00 means no time)"""
+    # Time counts as specified when either parsed field is nonzero ('__:__' and 00:00 are all-day)
+    has_time = (hour | minute) != 0
+    all_day = not has_time
+
+    return {
+        'year': year,
+        'month': month,
+        'day': day,
+        'hour': hour if has_time else 8,  # Default 8 AM for all-day
+        'minute': minute if has_time else 0,
+        'has_time': has_time,
+        'all_day': all_day
+    }
+
 
 def generate_event_title(event: Union[PhysicalTalkInfo, VirtualTalkInfo, PhysicalEventInfo, VirtualEventInfo]) -> str:
     """Generate calendar event title based on event type"""
-    if isinstance(event, (PhysicalTalkInfo, VirtualTalkInfo)):
+    if event.is_talk:
         # Talks: "[first_name]'s Talk"
         return f"{event.first_name}'s Talk"
     else:
@@ -94,10 +201,10 @@ def generate_event_description(event: Union[PhysicalTalkInfo, VirtualTalkInfo, P
     desc_parts = [event.short_description]
 
     # Add type-specific information
-    if isinstance(event, (PhysicalTalkInfo, VirtualTalkInfo)):
+    if event.is_talk:
         # Talk-specific info
         desc_parts.append(f"\nCategory: {event.category}")
-        if isinstance(event, PhysicalTalkInfo) and event.lunch_provided:
+        if event.is_physical and event.lunch_provided:
             desc_parts.append("Lunch provided: Yes")
     else:
         # Event-specific info
@@ -106,93 +213,233 @@ def generate_event_description(event: Union[PhysicalTalkInfo, VirtualTalkInfo, P
             desc_parts.append(f"Recurring: {event.is_recurring}")
 
     # Add location or virtual link
-    if isinstance(event, PhysicalTalkInfo):
-        desc_parts.append(f"\nLocation: {event.location}")
-    elif isinstance(event, PhysicalEventInfo):
+    if event.is_physical:
         desc_parts.append(f"\nLocation: {event.location}")
-    elif isinstance(event, VirtualTalkInfo):
-        desc_parts.append(f"\nZoom Link: {event.virtual_link}")
-    elif isinstance(event, VirtualEventInfo):
+    else:
         desc_parts.append(f"\nZoom Link: {event.virtual_link}")
 
     # Add Slack message permalinks
     if permalinks:
-        desc_parts.append(f"\n\nSource Slack messages:")
-        for link in permalinks[:3]:  # Limit to first 3
-            desc_parts.append(f"  {link}")
+        desc_parts.append("\n\nSource Slack messages:")
+        desc_parts.extend(f"  {link}" for link in permalinks[:3])  # Limit to first 3
 
     return '\n'.join(desc_parts)
 
 
 def get_recurrence_rule(is_recurring: str) -> Optional[list[str]]:
-    """Generate RRULE for recurring events"""
-    if is_recurring == 'weekly':
-        return ['RRULE:FREQ=WEEKLY']
-    elif is_recurring == 'biweekly':
-        return ['RRULE:FREQ=WEEKLY;INTERVAL=2']
-    elif is_recurring == 'monthly':
-        return ['RRULE:FREQ=MONTHLY']
-    elif is_recurring == 'unknown' or is_recurring == 'none':
-        return None
-    return None
+    """Generate RRULE for recurring events ('unknown', 'none' and anything else get None)"""
+    return RECURRENCE_RULES.get(is_recurring)
 
 
-def check_duplicate_event(service, title: str, year: int, month: int, day: int) -> Optional[dict]:
+def ledger_path(calendar_id: str) -> Path:
+    """Ledger file for one calendar, so switching CALENDAR_ID never skips events the new calendar lacks"""
+    calendar_digest = hashlib.sha256(calendar_id.encode()).hexdigest()[:12]
+    return LEDGER_DIR / f'stage4_event_ledger_{calendar_digest}.sqlite'
+
+
+def open_event_ledger(path: Path) -> sqlite3.Connection:
+    """Open (creating if needed) the SQLite ledger of events already on the calendar"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, isolation_level=None)  # Autocommit: each recorded event survives a crash
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS ledger ("
+        "title TEXT, year INTEGER, month INTEGER, day INTEGER, event_id TEXT NOT NULL, "
+        "PRIMARY KEY (title, year, month, day))"
+    )
+    return conn
+
+
+def ledger_lookup(conn: sqlite3.Connection, title: str, year: int, month: int, day: int) -> Optional[str]:
+    """Return the recorded event ID for this title on this date, or None"""
+    row = conn.execute(
+        "SELECT event_id FROM ledger WHERE title = ? AND year = ? AND month = ? AND day = ?",
+        (title, year, month, day)
+    ).fetchone()
+    return row[0] if row else None
+
+
+def ledger_record(conn: sqlite3.Connection, title: str, year: int, month: int, day: int, event_id: str):
+    """Record that an event with this title exists on this date"""
+    conn.execute(
+        "INSERT OR REPLACE INTO ledger (title, year, month, day, event_id) VALUES (?, ?, ?, ?, ?)",
+        (title, year, month, day, event_id)
+    )
+
+
+def ledger_record_body(conn: sqlite3.Connection, body: dict, event_id: str):
+    """Record a created event from its build_event_body body"""
+    start = body['start']['dateTime']
+    ledger_record(conn, body['summary'], int(start[0:4]), int(start[5:7]), int(start[8:10]), event_id)
+
+
+def fetch_existing_events(service, start_date: datetime, end_date: datetime) -> dict:
+    """
+    Fetch all events in a date range with a single (paginated) list query.
+
+    Args:
+        service: Google Calendar service
+        start_date: First day of the range (datetime at midnight)
+        end_date: Day after the last day of the range (datetime at midnight)
+
+    Returns:
+        Dict of (year, month, day, title) to the earliest event with that title on that day
+    """
+    # Format for RFC3339 timestamp (offset follows DST)
+    time_min = start_date.replace(tzinfo=TZ).isoformat()
+    time_max = end_date.replace(tzinfo=TZ).isoformat()
+
+    dup_index = {}
+    page_token = None
+
+    while True:
+        events_result = service.events().list(
+            calendarId=CALENDAR_ID,
+            timeMin=time_min,
+            timeMax=time_max,
+            singleEvents=True,
+            orderBy='startTime',
+            maxResults=2500,  # API maximum, so most ranges fit in one page
+            fields=PREFETCH_FIELDS,  # Expanded instances without descriptions, reminders, etc.
+            pageToken=page_token
+        ).execute()
+
+        for event in events_result.get('items', []):
+            start = event.get('start', {})
+            event_date = (start.get('dateTime') or start.get('date') or '')[:10]
+            try:
+                year, month, day = map(int, event_date.split('-'))
+            except ValueError:
+                continue
+            dup_index.setdefault((year, month, day, event.get('summary', '')), event)
+
+        page_token = events_result.get('nextPageToken')
+        if not page_token:
+            break
+
+    return dup_index
+
+
+def prefetch_existing_events(service, event_dates: list[datetime]) -> dict:
+    """
+    Build the duplicate index for a run's event dates with one fetch per cluster of nearby dates.
+
+    Args:
+        service: Google Calendar service
+        event_dates: Dates (datetimes at midnight) of the events to be added
+
+    Returns:
+        Dict of (year, month, day, title) to event, as from fetch_existing_events
+    """
+    dup_index = {}
+    dates = sorted(set(event_dates))
+    window_start = dates[0]
+    for prev, date in zip(dates, dates[1:] + [None]):
+        if date is None or date - prev > PREFETCH_MAX_GAP:
+            dup_index.update(fetch_existing_events(service, window_start, prev + timedelta(days=1)))
+            window_start = date
+    return dup_index
+
+
+def resolve_recurring_master(service, event: dict, master_cache: Optional[dict] = None) -> dict:
+    """
+    Return the master event for a recurring event instance, or the event itself.
+
+    The instance is returned flagged '_instance_only' if the master cannot be fetched.
+    When master_cache is given, each series' master is fetched at most once per run.
+    """
+    if 'recurringEventId' not in event:
+        # Single event, return as-is
+        return event
+
+    try:
+        master_id = event['recurringEventId']
+        if master_cache is not None and master_id in master_cache:
+            master_event = master_cache[master_id]
+        else:
+            print(f"     → Found recurring event instance, fetching master event...")
+            master_event = service.events().get(
+                calendarId=CALENDAR_ID,
+                eventId=master_id
+            ).execute()
+            print(f"     → Master event fetched: {master_event.get('id')}")
+            if master_cache is not None:
+                master_cache[master_id] = master_event
+        # Verify it has recurrence rules
+        if 'recurrence' in master_event:
+            print(f"     → Confirmed master has recurrence rules: {master_event['recurrence']}")
+            return master_event
+        else:
+            print(f"  ⚠️  Master event missing recurrence rules, treating as single event")
+            return event
+    except Exception as e:
+        print(f"  ⚠️  Could not fetch master recurring event: {e}")
+        print(f"  ⚠️  WARNING: Will only delete this occurrence, not entire series!")
+        # Return the instance with a flag
+        event['_instance_only'] = True
+        return event
+
+
+def check_duplicate_event(
+    service,
+    title: str,
+    year: int,
+    month: int,
+    day: int,
+    dup_index: Optional[dict] = None,
+    master_cache: Optional[dict] = None,
+    index_complete: bool = True
+) -> Optional[dict]:
     """
     Check if an event already exists with this title on this date.
 
+    Args:
+        service: Google Calendar service
+        title: Event title
+        year, month, day: Event date
+        dup_index: Optional index from fetch_existing_events; when given, the
+            lookup is a dict hit instead of a per-day events.list call
+        master_cache: Optional dict of recurringEventId to master event, shared
+            across calls so each series' master is fetched once
+        index_complete: False if dup_index holds only this run's queued events (the
+            prefetch failed), so titles missing from it are looked up on the calendar
+
     Returns:
         Event dict if duplicate found, None otherwise
         For recurring events, returns the master event (with recurrence rules)
     """
     try:
+        if dup_index is not None:
+            event = dup_index.get((year, month, day, title))
+            if event is not None and not event.get('_queued'):
+                return resolve_recurring_master(service, event, master_cache)
+            if event is not None or index_complete:
+                return event
+
         # Create date range for the specific day
         start_date = datetime(year, month, day, 0, 0, 0)
         end_date = start_date + timedelta(days=1)
 
-        # Format for RFC3339 timestamp
-        time_min = start_date.strftime('%Y-%m-%dT%H:%M:%S-04:00')
-        time_max = end_date.strftime('%Y-%m-%dT%H:%M:%S-04:00')
+        # Format for RFC3339 timestamp (offset follows DST)
+        time_min = start_date.replace(tzinfo=TZ).isoformat()
+        time_max = end_date.replace(tzinfo=TZ).isoformat()
 
-        # Search for events on this day (expands recurring events into instances)
+        # Search for events on this day (expands recurring events into instances);
+        # q= filters server-side by text, so only near-matches of the title come back
         events_result = service.events().list(
             calendarId=CALENDAR_ID,
             timeMin=time_min,
             timeMax=time_max,
             singleEvents=True,
-            orderBy='startTime'
+            q=title,
+            maxResults=10
         ).execute()
 
         events = events_result.get('items', [])
 
-        # Check if any event has the same title
+        # Check if any event has the same title (q= is full-text, so re-check exactly)
         for event in events:
             if event.get('summary', '') == title:
-                # If this is an instance of a recurring event, get the master event
-                if 'recurringEventId' in event:
-                    try:
-                        print(f"     → Found recurring event instance, fetching master event...")
-                        master_event = service.events().get(
-                            calendarId=CALENDAR_ID,
-                            eventId=event['recurringEventId']
-                        ).execute()
-                        print(f"     → Master event fetched: {master_event.get('id')}")
-                        # Verify it has recurrence rules
-                        if 'recurrence' in master_event:
-                            print(f"     → Confirmed master has recurrence rules: {master_event['recurrence']}")
-                            return master_event
-                        else:
-                            print(f"  ⚠️  Master event missing recurrence rules, treating as single event")
-                            return event
-                    except Exception as e:
-                        print(f"  ⚠️  Could not fetch master recurring event: {e}")
-                        print(f"  ⚠️  WARNING: Will only delete this occurrence, not entire series!")
-                        # Return the instance with a flag
-                        event['_instance_only'] = True
-                        return event
-                else:
-                    # Single event, return as-is
-                    return event
+                return resolve_recurring_master(service, event, master_cache)
 
         return None
     except Exception as e:
@@ -200,7 +447,7 @@ def check_duplicate_event(service, title: str, year: int, month: int, day: int)
         return None
 
 
-def delete_event(service, event_id: str, is_recurring: bool = False) -> bool:
+def delete_event(service, event_id: str, is_recurring: bool = False, http=None) -> bool:
     """
     Delete a calendar event by ID
 
@@ -208,6 +455,7 @@ def delete_event(service, event_id: str, is_recurring: bool = False) -> bool:
         service: Google Calendar service
         event_id: Event ID to delete
         is_recurring: If True, indicates this is a recurring event (all occurrences will be deleted)
+        http: Optional HTTP object to send the request on instead of the service's own
 
     Returns:
         True if deleted successfully, False otherwise
@@ -216,7 +464,7 @@ def delete_event(service, event_id: str, is_recurring: bool = False) -> bool:
         service.events().delete(
             calendarId=CALENDAR_ID,
             eventId=event_id
-        ).execute()
+        ).execute(http=http, num_retries=MAX_REQUEST_RETRIES)
 
         if is_recurring:
             print(f"     ✓ Deleted recurring event series (all future occurrences)")
@@ -227,66 +475,134 @@ def delete_event(service, event_id: str, is_recurring: bool = False) -> bool:
         return False
 
 
-def create_calendar_event(
-    service,
+async def _delete_in_thread(http_pool: asyncio.Queue, service, existing_event: dict) -> bool:
+    """Delete one event in a worker thread on a connection borrowed from http_pool"""
+    # httplib2 connections are not thread-safe, so each in-flight call holds one exclusively
+    http = await http_pool.get()
+    try:
+        return await asyncio.to_thread(
+            delete_event, service, existing_event['id'], 'recurrence' in existing_event, http
+        )
+    finally:
+        http_pool.put_nowait(http)
+
+
+async def delete_events_concurrently(service, credentials, existing_events: list[dict]) -> list[bool]:
+    """
+    Delete events concurrently, at most MAX_CONCURRENT_REQUESTS at a time.
+
+    Args:
+        service: Google Calendar service
+        credentials: Refreshed service account credentials
+        existing_events: Events (from check_duplicate_event) to delete
+
+    Returns:
+        List aligned with existing_events; True where the delete succeeded
+    """
+    # Pool size bounds concurrency; connections stay open and are reused across deletes
+    http_pool = asyncio.Queue()
+    for _ in range(min(MAX_CONCURRENT_REQUESTS, len(existing_events))):
+        http_pool.put_nowait(new_authorized_http(credentials))
+
+    return await asyncio.gather(*(
+        _delete_in_thread(http_pool, service, existing_event)
+        for existing_event in existing_events
+    ))
+
+
+def build_event_body(
     event: Union[PhysicalTalkInfo, VirtualTalkInfo, PhysicalEventInfo, VirtualEventInfo],
-    permalinks: list[str] = None
+    permalinks: list[str] = None,
+    dt_info: Optional[dict] = None
 ) -> Optional[dict]:
-    """Create a Google Calendar event"""
-    try:
-        # Parse date/time
-        date_field = event.talk_date if isinstance(event, (PhysicalTalkInfo, VirtualTalkInfo)) else event.event_date
+    """
+    Build the Google Calendar event body for an event (no API calls).
+
+    Args:
+        event: Extracted talk or event
+        permalinks: Slack permalinks to list in the description
+        dt_info: Already-parsed date from parse_event_datetime, if the caller has it
+
+    Returns:
+        Event body dict for events().insert, or None if the date is invalid
+    """
+    # Parse date/time
+    date_field = event.talk_date if event.is_talk else event.event_date
+    if dt_info is None:
         dt_info = parse_event_datetime(date_field)
 
-        if not dt_info:
-            print(f"  ⊘ Skipping - invalid date: {date_field}")
-            return None
+    if not dt_info:
+        print(f"  ⊘ Skipping - invalid date: {date_field}")
+        return None
 
-        # Generate title and description
-        title = generate_event_title(event)
-        description = generate_event_description(event, permalinks)
+    # Generate title and description
+    title = generate_event_title(event)
+    description = generate_event_description(event, permalinks)
 
-        # Create start/end datetimes
-        start_dt = datetime(dt_info['year'], dt_info['month'], dt_info['day'], dt_info['hour'], dt_info['minute'])
+    # Create start/end datetimes
+    start_dt = datetime(dt_info['year'], dt_info['month'], dt_info['day'], dt_info['hour'], dt_info['minute'])
 
-        # Determine end time
-        if dt_info['all_day']:
-            # All-day event: 8 AM - 5 PM
-            end_dt = datetime(dt_info['year'], dt_info['month'], dt_info['day'], 17, 0)
-        else:
-            # 1 hour duration
-            end_dt = start_dt + timedelta(hours=1)
-
-        # Create event body
-        calendar_event = {
-            'summary': title,
-            'description': description,
-            'start': {
-                'dateTime': start_dt.strftime('%Y-%m-%dT%H:%M:%S'),
-                'timeZone': TIMEZONE,
-            },
-            'end': {
-                'dateTime': end_dt.strftime('%Y-%m-%dT%H:%M:%S'),
-                'timeZone': TIMEZONE,
-            },
-            'reminders': {
-                'useDefault': False,
-                'overrides': [
-                    {'method': 'email', 'minutes': 1440},  # 1 day before
-                    {'method': 'email', 'minutes': 60},    # 1 hour before
-                ],
-            },
-        }
-
-        # Add location for physical events
-        if isinstance(event, (PhysicalTalkInfo, PhysicalEventInfo)):
-            calendar_event['location'] = event.location
-
-        # Add recurrence rule for recurring events
-        if isinstance(event, (PhysicalEventInfo, VirtualEventInfo)):
-            recurrence = get_recurrence_rule(event.is_recurring)
-            if recurrence:
-                calendar_event['recurrence'] = recurrence
+    # Determine end time
+    if dt_info['all_day']:
+        # All-day event: 8 AM - 5 PM
+        end_dt = datetime(dt_info['year'], dt_info['month'], dt_info['day'], 17, 0)
+    else:
+        # 1 hour duration
+        end_dt = start_dt + timedelta(hours=1)
+
+    # Create event body
+    calendar_event = {
+        'summary': title,
+        'description': description,
+        'start': {
+            'dateTime': start_dt.isoformat(),
+            'timeZone': TIMEZONE,
+        },
+        'end': {
+            'dateTime': end_dt.isoformat(),
+            'timeZone': TIMEZONE,
+        },
+        'reminders': REMINDERS,
+    }
+
+    # Add location for physical events
+    if event.is_physical:
+        calendar_event['location'] = event.location
+
+    # Add recurrence rule for recurring events
+    if not event.is_talk:
+        recurrence = get_recurrence_rule(event.is_recurring)
+        if recurrence:
+            calendar_event['recurrence'] = recurrence
+
+    return calendar_event
+
+
+def create_calendar_event(
+    service,
+    event: Union[PhysicalTalkInfo, VirtualTalkInfo, PhysicalEventInfo, VirtualEventInfo],
+    permalinks: list[str] = None,
+    dt_info: Optional[dict] = None,
+    dup_index: Optional[dict] = None
+) -> Optional[dict]:
+    """
+    Create a Google Calendar event.
+
+    Args:
+        service: Google Calendar service
+        event: Event to create
+        permalinks: Slack permalinks for the description
+        dt_info: Already-parsed date, if the caller has it
+        dup_index: Optional index from fetch_existing_events; the created event
+            is recorded in it so later duplicates need no Calendar lookup
+
+    Returns:
+        Created event dict, or None on error
+    """
+    try:
+        calendar_event = build_event_body(event, permalinks, dt_info)
+        if calendar_event is None:
+            return None
 
         # Create the event
         created_event = service.events().insert(
@@ -294,21 +610,147 @@ def create_calendar_event(
             body=calendar_event
         ).execute()
 
+        mark_added(dup_index, calendar_event)
         return created_event
     except Exception as e:
         print(f"  ❌ Error creating event: {e}")
         return None
 
 
+def insert_events_batched(service, inserts: list[dict], ledger: Optional[sqlite3.Connection] = None) -> dict:
+    """
+    Insert queued events with Calendar batch requests of up to BATCH_SIZE calls.
+
+    Calls rejected for rate limits or server errors are resent together in
+    later batches with exponential backoff, up to MAX_REQUEST_RETRIES times.
+
+    Args:
+        service: Google Calendar service
+        inserts: Event bodies built by build_event_body
+        ledger: Optional event ledger; created events are recorded in it
+
+    Returns:
+        Dict with {created: int, errors: int}
+    """
+    stats = {'created': 0, 'errors': 0}
+    lines = []  # Callback output, written once per batch
+    pending = list(range(len(inserts)))
+    retry = []  # Calls to resend after this pass (rate limited or server error)
+    can_retry = True
+
+    def on_insert(request_id, response, exception):
+        title = inserts[int(request_id)]['summary']
+        if exception is not None:
+            if can_retry and is_retryable_error(exception):
+                retry.append(int(request_id))
+                return
+            lines.append(f"  ❌ Error creating event {title}: {exception}\n")
+            stats['errors'] += 1
+        else:
+            lines.append(f"     ✓ Event created: {title} {response.get('htmlLink', 'N/A')}\n")
+            stats['created'] += 1
+            if ledger is not None and response.get('id'):
+                ledger_record_body(ledger, inserts[int(request_id)], response['id'])
+
+    for attempt in range(MAX_REQUEST_RETRIES + 1):
+        can_retry = attempt < MAX_REQUEST_RETRIES
+        for start in range(0, len(pending), BATCH_SIZE):
+            chunk = pending[start:start + BATCH_SIZE]
+            batch = service.new_batch_http_request(callback=on_insert)
+            for idx in chunk:
+                batch.add(
+                    service.events().insert(calendarId=CALENDAR_ID, body=inserts[idx]),
+                    request_id=str(idx)
+                )
+            try:
+                batch.execute()
+            except Exception as e:
+                lines.append(f"  ❌ Error sending batch: {e}\n")
+                stats['errors'] += len(chunk)
+            sys.stdout.write(''.join(lines))
+            lines.clear()
+
+        if not retry:
+            break
+        delay = BATCH_RETRY_DELAY * 2 ** attempt
+        print(f"  ⏳ Retrying {len(retry)} rate-limited insert(s) in {delay:.0f}s...")
+        time.sleep(delay)
+        pending, retry = retry, []
+
+    return stats
+
+
+def is_retryable_error(exception: Exception) -> bool:
+    """Whether a Calendar call failed from rate limiting or a server error"""
+    if not isinstance(exception, HttpError):
+        return False
+    status = exception.resp.status
+    if status == 429 or status >= 500:
+        return True
+    details = exception.error_details if isinstance(exception.error_details, list) else []
+    return status == 403 and any(
+        isinstance(detail, dict) and detail.get('reason') in RATE_LIMIT_REASONS
+        for detail in details
+    )
+
+
+def queue_insert(
+    inserts: list[dict],
+    event,
+    permalinks: list[str],
+    stats: dict,
+    dup_index: Optional[dict] = None,
+    dt_info: Optional[dict] = None
+):
+    """Append the event body to inserts, counting an error if it cannot be built"""
+    body = build_event_body(event, permalinks, dt_info)
+    if body is None:
+        stats['errors'] += 1
+        return
+    inserts.append(body)
+    mark_added(dup_index, body)
+
+
+def mark_added(dup_index: Optional[dict], body: dict):
+    """Record an event added this run so the same event in a later message is a duplicate"""
+    if dup_index is not None:
+        start = body['start']['dateTime']
+        year, month, day = int(start[0:4]), int(start[5:7]), int(start[8:10])
+        dup_index[(year, month, day, body['summary'])] = {'summary': body['summary'], '_queued': True}
+
+
 def process_message_extract(
     service,
     extract: MessageExtract,
     message_permalinks: list[str],
-    overwrite: bool = False
+    overwrite: bool = False,
+    inserts: Optional[list[dict]] = None,
+    dup_index: Optional[dict] = None,
+    deletes: Optional[list[tuple]] = None,
+    master_cache: Optional[dict] = None,
+    ledger: Optional[sqlite3.Connection] = None,
+    index_complete: bool = True
 ) -> dict:
     """
     Process a single MessageExtract and add events to calendar
 
+    Args:
+        service: Google Calendar service
+        extract: Events extracted from one message
+        message_permalinks: Slack permalinks of the message
+        overwrite: If True, delete and recreate existing events
+        inserts: If given, new event bodies are appended here for insert_events_batched
+            instead of being created one request at a time (not counted in 'created')
+        dup_index: Optional index from fetch_existing_events; queued events are
+            added to it so later messages see them as duplicates
+        deletes: If given, overwrites are appended here as (existing_event, event,
+            permalinks) for delete_events_concurrently instead of being deleted inline
+        master_cache: Optional recurring master memo passed to check_duplicate_event
+        ledger: Optional event ledger; events recorded there are skipped without a
+            Calendar lookup unless overwriting, and events found or created are recorded
+        index_complete: Passed to check_duplicate_event; False if dup_index only
+            tracks events queued this run
+
     Returns:
         Dict with {created: int, duplicates: int, errors: int}
     """
@@ -317,7 +759,7 @@ def process_message_extract(
     for event in extract.events:
         try:
             # Parse date to check for duplicates
-            date_field = event.talk_date if isinstance(event, (PhysicalTalkInfo, VirtualTalkInfo)) else event.event_date
+            date_field = event.talk_date if event.is_talk else event.event_date
             dt_info = parse_event_datetime(date_field)
 
             if not dt_info:
@@ -326,28 +768,53 @@ def process_message_extract(
 
             title = generate_event_title(event)
 
+            # Known from an earlier run; only overwrites need the live event
+            if ledger is not None and not overwrite and ledger_lookup(
+                ledger, title, dt_info['year'], dt_info['month'], dt_info['day']
+            ):
+                print(f"  ↻ Event already added in an earlier run: {title} on {dt_info['month']}/{dt_info['day']}/{dt_info['year']}")
+                stats['duplicates'] += 1
+                continue
+
             # Check for duplicate
             existing_event = check_duplicate_event(
                 service,
                 title,
                 dt_info['year'],
                 dt_info['month'],
-                dt_info['day']
+                dt_info['day'],
+                dup_index,
+                master_cache,
+                index_complete
             )
 
-            if existing_event:
+            if existing_event and existing_event.get('_queued'):
+                print(f"  ↻ Event already queued in this run: {title} on {dt_info['month']}/{dt_info['day']}/{dt_info['year']}")
+                stats['duplicates'] += 1
+            elif existing_event:
                 if overwrite:
                     # Check if it's a recurring event
                     is_recurring = 'recurrence' in existing_event
                     event_type = "recurring event series" if is_recurring else "event"
 
                     print(f"  🔄 Overwriting {event_type}: {title} on {dt_info['month']}/{dt_info['day']}/{dt_info['year']}")
+                    if deletes is not None:
+                        deletes.append((existing_event, event, message_permalinks))
+                        # Same event in a later message is a duplicate of this pending one
+                        if dup_index is not None:
+                            dup_index[(dt_info['year'], dt_info['month'], dt_info['day'], title)] = {'summary': title, '_queued': True}
+                        continue
                     if delete_event(service, existing_event['id'], is_recurring=is_recurring):
+                        if inserts is not None:
+                            queue_insert(inserts, event, message_permalinks, stats, dup_index, dt_info)
+                            continue
                         # Create new event
-                        created = create_calendar_event(service, event, message_permalinks)
+                        created = create_calendar_event(service, event, message_permalinks, dt_info, dup_index)
                         if created:
                             print(f"     ✓ Event recreated")
                             stats['created'] += 1
+                            if ledger is not None and created.get('id'):
+                                ledger_record(ledger, title, dt_info['year'], dt_info['month'], dt_info['day'], created['id'])
                         else:
                             stats['errors'] += 1
                     else:
@@ -355,13 +822,20 @@ def process_message_extract(
                 else:
                     print(f"  ↻ Event already exists: {title} on {dt_info['month']}/{dt_info['day']}/{dt_info['year']}")
                     stats['duplicates'] += 1
+                    if ledger is not None and existing_event.get('id'):
+                        ledger_record(ledger, title, dt_info['year'], dt_info['month'], dt_info['day'], existing_event['id'])
             else:
                 # Create new event
                 print(f"  ➕ Creating event: {title} on {dt_info['month']}/{dt_info['day']}/{dt_info['year']}")
-                created = create_calendar_event(service, event, message_permalinks)
+                if inserts is not None:
+                    queue_insert(inserts, event, message_permalinks, stats, dup_index, dt_info)
+                    continue
+                created = create_calendar_event(service, event, message_permalinks, dt_info, dup_index)
                 if created:
                     print(f"     ✓ Event created: {created.get('htmlLink', 'N/A')}")
                     stats['created'] += 1
+                    if ledger is not None and created.get('id'):
+                        ledger_record(ledger, title, dt_info['year'], dt_info['month'], dt_info['day'], created['id'])
                 else:
                     stats['errors'] += 1
 
@@ -372,13 +846,15 @@ def process_message_extract(
     return stats
 
 
-def main(input_path: Path, overwrite: bool = False) -> dict:
+def main(input_path: Path, overwrite: bool = False, stage2_path: Optional[Path] = None) -> dict:
     """
     Main entry point for Stage 4
 
     Args:
         input_path: Path to Stage 3 JSON output
         overwrite: If True, delete and recreate existing events
+        stage2_path: Stage 2 output the extracts were made from (for permalinks);
+            derived from input_path's name when None
 
     Returns:
         Dict with {created, duplicates, errors} counts
@@ -392,7 +868,8 @@ def main(input_path: Path, overwrite: bool = False) -> dict:
 
     # Authenticate with Google Calendar
     try:
-        service = get_calendar_service()
+        credentials = get_credentials()
+        service = get_calendar_service(credentials)
         print("✓ Authenticated with Google Calendar")
     except Exception as e:
         print(f"❌ Failed to authenticate: {e}")
@@ -403,38 +880,94 @@ def main(input_path: Path, overwrite: bool = False) -> dict:
     print(f"✓ Loaded {len(extracts)} message extractions")
 
     # Load corresponding Stage 2 messages for permalinks
-    # Derive Stage 2 path from Stage 3 path
-    stage2_path = Path(str(input_path).replace('stage3_events', 'stage2_aggregated'))
-    permalinks_map = {}
+    # Derive Stage 2 path from Stage 3 path (only matches unhashed names) unless given
+    if stage2_path is None:
+        stage2_stem = Path(str(input_path).replace('stage3_events', 'stage2_aggregated')).with_suffix('')
+        # Compressed JSONL first, then outputs from before compression and before JSONL
+        candidates = [stage2_stem.with_name(stage2_stem.name + suffix) for suffix in ('.jsonl.gz', '.jsonl', '.json')]
+        stage2_path = next((path for path in candidates if path.exists()), candidates[-1])
+    # Streamed in step with the extracts (message i produced extract i), padded
+    # with no permalinks if Stage 2 is missing or shorter
+    message_permalinks_iter = repeat([])
     if stage2_path.exists():
         from .models import SlackMessage
-        messages = SlackMessage.from_json_file(stage2_path)
-        for i, msg in enumerate(messages):
-            permalinks_map[i] = msg.permalink
+        message_permalinks_iter = chain(
+            (msg.permalink for msg in SlackMessage.iter_json_file(stage2_path)),
+            message_permalinks_iter
+        )
 
-    # Process all extracts
+    # Process all extracts; overwrite deletes and inserts are queued and sent afterwards
     total_stats = {'created': 0, 'duplicates': 0, 'errors': 0}
+    inserts = []
+    deletes = []
+    master_cache = {}  # recurringEventId -> master event, fetched once per series
+    ledger = open_event_ledger(ledger_path(CALENDAR_ID))
+
+    # Fetch existing events around the run's dates in one query per date cluster (skipping events in the ledger)
+    event_dates = []
+    for extract in extracts:
+        for event in extract.events:
+            date_field = event.talk_date if event.is_talk else event.event_date
+            dt_info = parse_event_datetime(date_field)
+            if not dt_info:
+                continue
+            if not overwrite and ledger_lookup(
+                ledger, generate_event_title(event), dt_info['year'], dt_info['month'], dt_info['day']
+            ):
+                continue
+            try:
+                event_dates.append(datetime(dt_info['year'], dt_info['month'], dt_info['day']))
+            except ValueError:
+                continue  # Out-of-range day, reported when the event is processed
+
+    # Events queued this run are always tracked here, even if the prefetch fails
+    dup_index = {}
+    index_complete = True
+    if event_dates:
+        try:
+            dup_index = prefetch_existing_events(service, event_dates)
+        except Exception as e:
+            print(f"  ⚠️  Error prefetching events, checking duplicates per event: {e}")
+            index_complete = False
     total_events = sum(len(extract.events) for extract in extracts)
 
     print(f"\nProcessing {total_events} event(s) from {len(extracts)} message(s)...")
 
-    for i, extract in enumerate(extracts):
+    for i, (extract, message_permalinks) in enumerate(zip(extracts, message_permalinks_iter)):
         if not extract.events:
             continue
 
-        print(f"\nMessage {i+1}/{len(extracts)}: {len(extract.events)} event(s)")
-
-        # Get permalinks for this message
-        message_permalinks = permalinks_map.get(i, [])
-
-        # Process events
-        stats = process_message_extract(service, extract, message_permalinks, overwrite)
+        # Process events, collecting the message's log lines and writing them in one go
+        buf = io.StringIO()
+        try:
+            with redirect_stdout(buf):
+                print(f"\nMessage {i+1}/{len(extracts)}: {len(extract.events)} event(s)")
+                stats = process_message_extract(service, extract, message_permalinks, overwrite, inserts, dup_index, deletes, master_cache, ledger, index_complete)
+        finally:
+            sys.stdout.write(buf.getvalue())
 
         # Update totals
         total_stats['created'] += stats['created']
         total_stats['duplicates'] += stats['duplicates']
         total_stats['errors'] += stats['errors']
 
+    if deletes:
+        print(f"\nDeleting {len(deletes)} event(s) to overwrite, up to {MAX_CONCURRENT_REQUESTS} at a time...")
+        results = asyncio.run(delete_events_concurrently(service, credentials, [existing for existing, _, _ in deletes]))
+        for (_, event, permalinks), deleted in zip(deletes, results):
+            if deleted:
+                queue_insert(inserts, event, permalinks, total_stats)
+            else:
+                total_stats['errors'] += 1
+
+    if inserts:
+        print(f"\nCreating {len(inserts)} event(s) in batches of up to {BATCH_SIZE}...")
+        insert_stats = insert_events_batched(service, inserts, ledger)
+        total_stats['created'] += insert_stats['created']
+        total_stats['errors'] += insert_stats['errors']
+
+    ledger.close()
+
     # Summary
     print(f"\n{'='*80}")
     print("📊 Summary:")
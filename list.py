@@ -1,4 +1,5 @@
 import os
+from functools import lru_cache
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 from slack_sdk import WebClient
@@ -57,8 +58,35 @@ def get_channel_id(channel_name):
         print(f"Error fetching channel list: {e.response['error']}")
         return None
 
+@lru_cache(maxsize=1)
+def get_user_directory():
+    """Fetch {user_id: name} for the whole workspace with paginated users_list calls (once per run)"""
+    users = {}
+    cursor = None
+
+    try:
+        while True:
+            response = client.users_list(limit=1000, cursor=cursor)
+
+            for user in response['members']:
+                users[user['id']] = user.get('real_name') or user.get('name', 'Unknown User')
+
+            cursor = response.get('response_metadata', {}).get('next_cursor')
+            if not cursor:
+                break
+    except SlackApiError as e:
+        # Missing users:read scope - fall back to per-user lookups
+        print(f"Could not fetch user list: {e.response['error']}")
+
+    return users
+
+@lru_cache(maxsize=None)
 def get_user_name(user_id):
-    """Get user's display name from user ID"""
+    """Get user's display name from user ID (users_info only for users outside the directory)"""
+    users = get_user_directory()
+    if user_id in users:
+        return users[user_id]
+
     try:
         result = client.users_info(user=user_id)
         user = result['user']
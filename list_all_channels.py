@@ -3,17 +3,26 @@
 Slack Channel Summary - Lists all accessible channels across all workspaces
 """
 
+import io
 import os
+import sys
+from contextlib import redirect_stdout
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
+from slack_sdk.http_retry import RateLimitErrorRetryHandler
 from pprint import pprint
 from init_config import SLACK_CONFIG
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Workspaces fetched at once (channel pages within one workspace follow a cursor, so stay sequential)
+MAX_WORKSPACE_WORKERS = 5
+SLACK_RATE_LIMIT_RETRIES = 5  # Retries on 429s (the SDK waits out Retry-After)
+
 
 def get_channels(client, include_external=True):
     """Fetch all accessible channels"""
@@ -85,9 +94,8 @@ def print_channel_details(channel_summary):
         print(f"     Purpose: {channel_summary['purpose'][:100]}{'...' if len(channel_summary['purpose']) > 100 else ''}")
 
 
-def summarize_workspace(workspace_config):
-    """Fetch and summarize all channels for a single workspace"""
-    workspace_name = workspace_config['workspace_name']
+def fetch_workspace_channels(workspace_config):
+    """Fetch all channels for a single workspace (None if its token is missing)"""
     token_env_var = workspace_config['token_env_var']
 
     # Get token from environment
@@ -96,16 +104,23 @@ def summarize_workspace(workspace_config):
         print(f"  ❌ Token not found for {token_env_var}")
         return None
 
+    # Create Slack client
+    client = WebClient(
+        token=token,
+        retry_handlers=[RateLimitErrorRetryHandler(max_retry_count=SLACK_RATE_LIMIT_RETRIES)]
+    )
+
+    return get_channels(client, include_external=True)
+
+
+def summarize_workspace(workspace_config, channels):
+    """Summarize already-fetched channels for a single workspace"""
+    workspace_name = workspace_config['workspace_name']
+
     print(f"\n{'='*80}")
     print(f"WORKSPACE: {workspace_name}")
     print(f"{'='*80}")
 
-    # Create Slack client
-    client = WebClient(token=token)
-
-    # Fetch all channels
-    channels = get_channels(client, include_external=True)
-
     if not channels:
         print(f"  ⚠️  No accessible channels found")
         return None
@@ -178,13 +193,27 @@ def main():
 
     results = []
 
-    for workspace_config in SLACK_CONFIG:
-        try:
-            result = summarize_workspace(workspace_config)
-            if result:
-                results.append(result)
-        except Exception as e:
-            print(f"❌ Error processing {workspace_config['workspace_name']}: {e}")
+    # Fetch every workspace concurrently, so wall time is the slowest workspace, not the sum
+    with ThreadPoolExecutor(max_workers=MAX_WORKSPACE_WORKERS) as executor:
+        futures = [executor.submit(fetch_workspace_channels, workspace_config) for workspace_config in SLACK_CONFIG]
+
+        # Print in config order so output is deterministic
+        for workspace_config, future in zip(SLACK_CONFIG, futures):
+            try:
+                channels = future.result()
+                if channels is None:
+                    continue
+                # Per-channel lines are collected and written once per workspace
+                buf = io.StringIO()
+                try:
+                    with redirect_stdout(buf):
+                        result = summarize_workspace(workspace_config, channels)
+                finally:
+                    sys.stdout.write(buf.getvalue())
+                if result:
+                    results.append(result)
+            except Exception as e:
+                print(f"❌ Error processing {workspace_config['workspace_name']}: {e}")
 
     # Print overall summary
     print(f"\n{'='*80}")
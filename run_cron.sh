@@ -40,6 +40,7 @@ LOG_OUTPUT=$(uv run python run_stages.py \
     --start_datetime "$START_DT" \
     --end_datetime "$END_DT" \
     --use-cache \
+    --incremental \
     --overwrite 2>&1)
 
 # Store exit code
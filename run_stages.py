@@ -5,16 +5,26 @@ Runs Stage 1-4: Scraping → Aggregation → Extraction → Calendar
 """
 
 import argparse
+import hashlib
 import tempfile
 import shutil
 from datetime import datetime
 from pathlib import Path
 
-from lib import stage1, stage2_aggregate, stage3, stage4
+from lib import PIPELINE_VERSION
 from dotenv import load_dotenv
 
 load_dotenv()
 
+def input_checksum(path: Path) -> str:
+    """Short SHA-256 of a stage's input file and PIPELINE_VERSION, used to name its output"""
+    digest = hashlib.sha256(PIPELINE_VERSION.encode())
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
 def main():
     """Run Stage 1-4 pipeline"""
     parser = argparse.ArgumentParser(
@@ -34,6 +44,10 @@ def main():
                        help='Overwrite existing calendar events (delete and recreate)')
     parser.add_argument('--use-cache', action='store_true',
                        help='Use cached output files if they exist (skip stages that are already done)')
+    parser.add_argument('--no-cache', action='store_true',
+                       help='Ignore cached Gemini responses in Stage 3 and re-query every message')
+    parser.add_argument('--incremental', action='store_true',
+                       help='Stage 1 scrapes each channel only from where the previous --incremental run stopped (for cron)')
 
     args = parser.parse_args()
 
@@ -46,9 +60,12 @@ def main():
     output_dir.mkdir(parents=True, exist_ok=True)
 
     timestamp = f"{start_dt.strftime('%Y%m%d_%H%M')}_{end_dt.strftime('%Y%m%d_%H%M')}"
-    stage1_output = output_dir / f"stage1_messages_{timestamp}.json"
-    stage2_output = output_dir / f"stage2_aggregated_{timestamp}.json"
-    stage3_output = output_dir / f"stage3_events_{timestamp}.json"
+    # Message outputs are gzip-compressed: re-read on every --use-cache run and highly repetitive
+    stage1_output = output_dir / f"stage1_messages_{timestamp}.jsonl.gz"
+    # Stage 2/3 outputs are named by a checksum of their input once it exists, so
+    # --use-cache only reuses an output built from identical upstream data
+    stage2_output = None
+    stage3_output = None
 
     # Create temporary directory for file downloads (auto-deleted at end)
     temp_dir = Path(tempfile.mkdtemp(prefix='slack_files_'))
@@ -58,36 +75,43 @@ def main():
         print("\n" + "="*80)
         print("Running Stage 1: Slack Message Scraping")
         print("="*80)
+        stage1_messages = None  # Passed straight to Stage 2 when scraped this run
         if args.use_cache and stage1_output.exists():
             print(f"✓ Using cached file: {stage1_output}")
         else:
-            stage1.main(start_dt, end_dt, temp_dir, stage1_output)
+            from lib import stage1  # Stages are imported when they run, keeping --help and cache hits fast
+            stage1_messages = stage1.main(start_dt, end_dt, temp_dir, stage1_output, incremental=args.incremental)
 
         # Run Stage 2: Aggregation
         print("\n" + "="*80)
         print("Running Stage 2: Message Aggregation")
         print("="*80)
+        stage2_output = output_dir / f"stage2_aggregated_{timestamp}_{input_checksum(stage1_output)}.jsonl.gz"
         if args.use_cache and stage2_output.exists():
             print(f"✓ Using cached file: {stage2_output}")
         else:
-            stage2_aggregate.main(stage1_output, stage2_output)
+            from lib import stage2_aggregate
+            stage2_aggregate.main(stage1_output, stage2_output, stage1_messages)
 
         # Run Stage 3: Event Extraction (optional)
         if not args.skip_extraction:
             print("\n" + "="*80)
             print("Running Stage 3: Event Extraction with Gemini")
             print("="*80)
+            stage3_output = output_dir / f"stage3_events_{timestamp}_{input_checksum(stage2_output)}.json"
             if args.use_cache and stage3_output.exists():
                 print(f"✓ Using cached file: {stage3_output}")
             else:
-                stage3.main(stage2_output, stage3_output)
+                from lib import stage3
+                stage3.main(stage2_output, stage3_output, refresh_cache=args.no_cache)
 
             # Run Stage 4: Google Calendar Integration (optional)
             if not args.skip_calendar:
                 print("\n" + "="*80)
                 print("Running Stage 4: Google Calendar Integration")
                 print("="*80)
-                stage4.main(stage3_output, overwrite=args.overwrite)
+                from lib import stage4
+                stage4.main(stage3_output, overwrite=args.overwrite, stage2_path=stage2_output)
             else:
                 print("\n⊘ Skipping Stage 4 (Google Calendar)")
         else:
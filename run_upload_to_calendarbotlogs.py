@@ -5,21 +5,49 @@ Upload logs to #calendarbotlogs channel in ZLab workspace
 
 import os
 import sys
+import time
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
+from slack_sdk.http_retry import RateLimitErrorRetryHandler
+
+# Log characters per message (Slack's limit is 40k, leaving room for the header)
+LOG_CHUNK_SIZE = 38000
+
+# Seconds between posts: Slack allows about one message per channel per second
+POST_INTERVAL = 1.2
+
+# Retries on 429s (the SDK waits out Retry-After)
+SLACK_RATE_LIMIT_RETRIES = 3
+
+
+def split_logs(logs: str, size: int = LOG_CHUNK_SIZE) -> list[str]:
+    """Split logs into chunks of at most size characters, breaking at line ends where possible"""
+    chunks = []
+    start = 0
+    while len(logs) - start > size:
+        end = logs.rfind('\n', start, start + size)
+        if end <= start:
+            end = start + size  # Single line longer than size
+        chunks.append(logs[start:end])
+        start = end + 1 if logs[end:end + 1] == '\n' else end
+    chunks.append(logs[start:])
+    return chunks
 
 
 def post_to_slack(start_dt: str, end_dt: str, logs: str) -> bool:
     """
     Post logs to #calendarbotlogs channel
 
+    Logs too long for one message are split into chunks: the first is posted
+    with the header and the rest as replies in its thread.
+
     Args:
         start_dt: Start datetime string
         end_dt: End datetime string
         logs: Full log output to post
 
     Returns:
-        True if successful, False otherwise
+        True if every chunk was posted, False otherwise
     """
     # Get token from environment
     token = os.getenv('ZLLAB_SLACK_TOKEN')
@@ -27,32 +55,43 @@ def post_to_slack(start_dt: str, end_dt: str, logs: str) -> bool:
         print("ERROR: ZLLAB_SLACK_TOKEN not set", file=sys.stderr)
         return False
 
-    # Initialize Slack client
-    client = WebClient(token=token)
-
-    # Format message
-    message = f"Just ran from {start_dt} to {end_dt}, logs:\n```\n{logs}\n```"
+    # Initialize Slack client (the retry handler honours Retry-After on 429s)
+    client = WebClient(
+        token=token,
+        retry_handlers=[RateLimitErrorRetryHandler(max_retry_count=SLACK_RATE_LIMIT_RETRIES)]
+    )
 
-    # Truncate if too long (Slack has 40k character limit for messages)
-    if len(message) > 40000:
-        truncated_logs = logs[:39000]
-        message = f"Just ran from {start_dt} to {end_dt}, logs (truncated):\n```\n{truncated_logs}\n...\n[truncated]\n```"
+    chunks = split_logs(logs)
+    thread_ts = None
 
     try:
-        # Post to #calendarbotlogs
-        response = client.chat_postMessage(
-            channel='calendarbotlogs',
-            text=message,
-            unfurl_links=False,
-            unfurl_media=False
-        )
-
-        if response['ok']:
-            print("✓ Logs posted to #calendarbotlogs")
-            return True
-        else:
-            print(f"✗ Failed to post to Slack: {response}", file=sys.stderr)
-            return False
+        for part, chunk in enumerate(chunks, 1):
+            if part == 1:
+                header = f"Just ran from {start_dt} to {end_dt}, logs"
+                if len(chunks) > 1:
+                    header += f" (part 1/{len(chunks)}, rest in thread)"
+                message = f"{header}:\n```\n{chunk}\n```"
+            else:
+                time.sleep(POST_INTERVAL)
+                message = f"Part {part}/{len(chunks)}:\n```\n{chunk}\n```"
+
+            # Post to #calendarbotlogs
+            response = client.chat_postMessage(
+                channel='calendarbotlogs',
+                text=message,
+                thread_ts=thread_ts,
+                unfurl_links=False,
+                unfurl_media=False
+            )
+
+            if not response['ok']:
+                print(f"✗ Failed to post to Slack: {response}", file=sys.stderr)
+                return False
+            if thread_ts is None:
+                thread_ts = response['ts']
+
+        print(f"✓ Logs posted to #calendarbotlogs ({len(chunks)} message(s))")
+        return True
 
     except SlackApiError as e:
         print(f"✗ Slack API error: {e.response['error']}", file=sys.stderr)
@@ -4,13 +4,22 @@ Unit tests for Stage 3: Event Extraction with Gemini
 Tests Gemini integration, retries, parallel processing, and event extraction with mocking
 """
 
+import re
+import asyncio
+import hashlib
+import tempfile
 import unittest
-from unittest.mock import Mock, patch, MagicMock
+from types import SimpleNamespace
+from unittest.mock import Mock, patch, MagicMock, AsyncMock
 from pathlib import Path
 
+from google.genai import errors
+
 from lib.models import (
     SlackMessage,
     MessageExtract,
+    NumberedExtract,
+    BatchExtract,
     PhysicalTalkInfo,
     VirtualTalkInfo,
     PhysicalEventInfo,
@@ -18,9 +27,25 @@ from lib.models import (
 )
 from lib.stage3 import (
     format_datetime_readable,
+    format_minute_readable,
     build_extraction_prompt,
+    build_dynamic_suffix,
     extract_events_with_retry,
-    extract_all_events
+    extract_all_events,
+    normalize_textract,
+    open_response_cache,
+    wait_for_retry,
+    pack_batches,
+    response_cache_key,
+    load_partial_results,
+    open_partial_log,
+    PROMPT_PREFIX_DIGEST,
+    BATCH_SIZE,
+    CHARS_PER_TOKEN,
+    MAX_BATCH_TOKENS,
+    GeminiRateLimiter,
+    PromptCache,
+    generate_async
 )
 
 
@@ -153,6 +178,14 @@ class TestEventModels(unittest.TestCase):
         self.assertIsInstance(extract.events[0], PhysicalTalkInfo)
         self.assertIsInstance(extract.events[1], VirtualEventInfo)
 
+        # Event types survive a round trip through the Stage 3 output file
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'events.json'
+            MessageExtract.to_json_file([extract], path)
+            loaded = MessageExtract.from_json_file(path)
+        self.assertEqual(loaded, [extract])
+        self.assertEqual([type(event) for event in loaded[0].events], [PhysicalTalkInfo, VirtualEventInfo])
+
 
 class TestDateFormatting(unittest.TestCase):
     """Test datetime formatting helper"""
@@ -172,6 +205,14 @@ class TestDateFormatting(unittest.TestCase):
         self.assertIn("Friday", result)
         self.assertIn("9:30 AM", result)
 
+    def test_format_datetime_readable_cached_per_minute(self):
+        """Test timestamps in the same minute share one cached formatting"""
+        format_minute_readable.cache_clear()
+        first = format_datetime_readable("2025-10-24T09:30:05")
+        second = format_datetime_readable("2025-10-24T09:30:41")
+        self.assertEqual(first, second)
+        self.assertEqual(format_minute_readable.cache_info().hits, 1)
+
     def test_format_datetime_readable_invalid(self):
         """Test invalid datetime returns original string"""
         invalid = "not-a-datetime"
@@ -231,6 +272,30 @@ class TestPromptBuilding(unittest.TestCase):
         # Should explain deduplication in prompt
         self.assertIn("Deduplication", prompt)
 
+    def test_dynamic_suffix_excludes_static_prefix(self):
+        """Test the per-message suffix sent on top of the context cache carries only message context"""
+        message = SlackMessage(
+            workspace_name="TestWorkspace",
+            channel_name="talks",
+            channel_type="public",
+            sending_user_name="John Doe",
+            datetime="2025-10-22T14:30:00",
+            textract="Prof. Smith will talk tomorrow at 3pm",
+            file_paths=[],
+            permalink=["https://slack.com/link"], original_indices=[0]
+        )
+
+        suffix = build_dynamic_suffix(message)
+
+        self.assertIn("Prof. Smith will talk tomorrow at 3pm", suffix)
+        self.assertIn("Wednesday", suffix)
+        self.assertNotIn("PhysicalTalkInfo", suffix)
+        self.assertTrue(build_extraction_prompt(message).endswith(suffix))
+
+        # Cache keys hash only the suffix on top of the prefix, but match hashing the full prompt
+        full_prompt_key = hashlib.sha256(f"{PROMPT_PREFIX_DIGEST}\n{build_extraction_prompt(message)}".encode())
+        self.assertEqual(response_cache_key(message), full_prompt_key.hexdigest())
+
 
 class TestEventExtraction(unittest.TestCase):
     """Test event extraction with mocked Gemini API"""
@@ -274,6 +339,12 @@ class TestEventExtraction(unittest.TestCase):
         self.assertIsInstance(extract.events[0], PhysicalTalkInfo)
         self.assertEqual(extract.events[0].first_name, "john")
 
+        # On top of a context cache only the per-message suffix is sent
+        extract_events_with_retry(mock_client, message, cached_content="cachedContents/abc")
+        kwargs = mock_client.models.generate_content.call_args.kwargs
+        self.assertEqual(kwargs['contents'], build_dynamic_suffix(message))
+        self.assertEqual(kwargs['config'].cached_content, "cachedContents/abc")
+
     def test_extract_events_empty_response(self):
         """Test empty response from Gemini"""
         mock_client = Mock()
@@ -366,6 +437,18 @@ class TestEventExtraction(unittest.TestCase):
         self.assertEqual(len(extract.events), 0)
         self.assertEqual(mock_client.models.generate_content.call_count, 5)  # MAX_RETRIES
 
+    def test_retry_after_is_jittered(self):
+        """Test workers told the same Retry-After wait slightly different delays"""
+        error = Exception("Rate limited")
+        error.response = Mock(headers={'retry-after': '30'})
+        retry_state = Mock()
+        retry_state.outcome.exception.return_value = error
+
+        delays = {wait_for_retry(retry_state) for _ in range(20)}
+
+        self.assertTrue(all(30 <= delay <= 31 for delay in delays))
+        self.assertGreater(len(delays), 1)
+
     def test_extract_events_null_response(self):
         """Test handling of null/None response from Gemini"""
         mock_client = Mock()
@@ -394,19 +477,137 @@ class TestEventExtraction(unittest.TestCase):
             # Expected if parsed is None and we try to access .events
             pass
 
+    def test_extract_events_uses_response_cache(self):
+        """Test a repeated message is answered from the response cache without calling Gemini"""
+        mock_client = Mock()
+        mock_response = Mock()
+        mock_response.parsed = MessageExtract(events=[])
+        mock_client.models.generate_content.return_value = mock_response
+
+        message = SlackMessage(
+            workspace_name="Test",
+            channel_name="random",
+            channel_type="public",
+            sending_user_name="User",
+            datetime="2025-10-22T14:00:00",
+            textract="No events here",
+            file_paths=[],
+            permalink=["link"], original_indices=[0]
+        )
+
+        with tempfile.TemporaryDirectory() as tmp:
+            response_cache = open_response_cache(Path(tmp) / 'responses.sqlite')
+            try:
+                first = extract_events_with_retry(mock_client, message, response_cache=response_cache)
+                second = extract_events_with_retry(mock_client, message, response_cache=response_cache)
+            finally:
+                response_cache.close()
+
+        self.assertEqual(first, second)
+        self.assertEqual(mock_client.models.generate_content.call_count, 1)
+
+
+class TestGeminiRateLimiter(unittest.TestCase):
+    """Test proactive pacing of Gemini requests"""
+
+    @patch('lib.stage3.asyncio.sleep', new_callable=AsyncMock)
+    @patch('lib.stage3.time.monotonic', return_value=100.0)
+    def test_limiter_waits_once_request_budget_is_spent(self, mock_monotonic, mock_sleep):
+        """Test requests past the burst wait for the refill instead of hitting a 429"""
+        limiter = GeminiRateLimiter(rpm=60, tpm=1_000_000)  # Burst of 10 requests
+
+        async def send(count):
+            for _ in range(count):
+                await limiter.wait("prompt")
+
+        asyncio.run(send(12))
+
+        self.assertEqual([call.args[0] for call in mock_sleep.await_args_list], [1.0, 2.0])
+
+    @patch('lib.stage3.asyncio.sleep', new_callable=AsyncMock)
+    @patch('lib.stage3.time.monotonic', return_value=100.0)
+    def test_limiter_paces_estimated_tokens(self, mock_monotonic, mock_sleep):
+        """Test a request larger than the token burst waits for its estimated tokens"""
+        limiter = GeminiRateLimiter(rpm=1000, tpm=600)  # Token burst of 100
+
+        asyncio.run(limiter.wait("x" * 800))  # ~200 tokens
+
+        mock_sleep.assert_awaited_once_with(10.0)
+
+
+class TestPromptCacheRetries(unittest.TestCase):
+    """Test retries of requests sent on top of the context cache"""
+
+    def setUp(self):
+        self.client = Mock()
+        self.client.aio.caches.create = AsyncMock(side_effect=[
+            SimpleNamespace(name='cachedContents/first'),
+            SimpleNamespace(name='cachedContents/second')
+        ])
+        self.client.aio.caches.delete = AsyncMock()
+        self.response = Mock()
+        self.client.aio.models.generate_content = AsyncMock()
+
+    def generate(self):
+        async def run():
+            prompt_cache = PromptCache(self.client)
+            await prompt_cache.refresh()
+            return await generate_async(self.client, "suffix", MessageExtract, prompt_cache)
+        return asyncio.run(run())
+
+    @patch('lib.stage3.asyncio.sleep', new_callable=AsyncMock)
+    def test_rate_limits_keep_prompt_cache(self, mock_sleep):
+        """Test transient errors are retried on the same cache instead of creating new ones"""
+        rate_limited = errors.ClientError(429, {'error': {'message': 'Resource exhausted'}})
+        self.client.aio.models.generate_content.side_effect = [rate_limited, rate_limited, self.response]
+
+        self.assertIs(self.generate(), self.response)
+
+        self.assertEqual(self.client.aio.caches.create.await_count, 1)
+        self.client.aio.caches.delete.assert_not_awaited()
+
+    @patch('lib.stage3.asyncio.sleep', new_callable=AsyncMock)
+    def test_expired_cache_is_replaced_and_deleted(self, mock_sleep):
+        """Test an expired cache is recreated once and the replaced one deleted"""
+        expired = errors.ClientError(403, {'error': {'message': 'CachedContent not found (or permission denied)'}})
+        self.client.aio.models.generate_content.side_effect = [expired, self.response]
+
+        self.assertIs(self.generate(), self.response)
+
+        self.assertEqual(self.client.aio.caches.create.await_count, 2)
+        self.client.aio.caches.delete.assert_awaited_once_with(name='cachedContents/first')
+        retried_config = self.client.aio.models.generate_content.await_args.kwargs['config']
+        self.assertEqual(retried_config.cached_content, 'cachedContents/second')
+
+    @patch('lib.stage3.asyncio.sleep', new_callable=AsyncMock)
+    def test_client_errors_fail_fast_with_live_cache(self, mock_sleep):
+        """Test a 4xx that retrying cannot fix is raised as-is instead of being retried"""
+        bad_request = errors.ClientError(400, {'error': {'message': 'Invalid argument'}})
+        self.client.aio.models.generate_content.side_effect = bad_request
+
+        with self.assertRaises(errors.ClientError):
+            self.generate()
+
+        self.assertEqual(self.client.aio.models.generate_content.await_count, 1)
+
+    @patch('lib.stage3.asyncio.sleep', new_callable=AsyncMock)
+    def test_retry_after_honored_with_live_cache(self, mock_sleep):
+        """Test the server's Retry-After still sets the wait when the cache is live"""
+        rate_limited = errors.ClientError(
+            429, {'error': {'message': 'Resource exhausted'}}, response=Mock(headers={'retry-after': '7'})
+        )
+        self.client.aio.models.generate_content.side_effect = [rate_limited, self.response]
+
+        self.assertIs(self.generate(), self.response)
+
+        self.assertTrue(7 <= mock_sleep.await_args.args[0] <= 8)
+
 
 class TestExtractAllEvents(unittest.TestCase):
     """Test batch extraction of events"""
 
-    @patch('lib.stage3.get_gemini_client')
-    def test_extract_all_events_same_count(self, mock_get_client):
-        """Test that output has same number of rows as input"""
-        mock_client = Mock()
-        mock_get_client.return_value = mock_client
-
-        # Mock response for each message
-        mock_response1 = Mock()
-        mock_response1.parsed = MessageExtract(events=[
+    def setUp(self):
+        self.talk_extract = MessageExtract(events=[
             PhysicalTalkInfo(
                 first_name="alice",
                 last_name="doe",
@@ -418,12 +619,7 @@ class TestExtractAllEvents(unittest.TestCase):
             )
         ])
 
-        mock_response2 = Mock()
-        mock_response2.parsed = MessageExtract(events=[])  # No events
-
-        mock_client.models.generate_content.side_effect = [mock_response1, mock_response2]
-
-        messages = [
+        self.messages = [
             SlackMessage(
                 workspace_name="Test",
                 channel_name="talks",
@@ -448,12 +644,229 @@ class TestExtractAllEvents(unittest.TestCase):
             )
         ]
 
-        extracts = extract_all_events(messages, output_path=None)
+    @patch('lib.stage3.get_gemini_client')
+    def test_extract_all_events_same_count(self, mock_get_client):
+        """Test that output has same number of rows as input"""
+        mock_client = Mock()
+        mock_get_client.return_value = mock_client
+
+        # Both messages go out in one batched request
+        mock_response = Mock()
+        mock_response.parsed = BatchExtract(extracts=[
+            NumberedExtract(message_number=1, events=self.talk_extract.events),
+            NumberedExtract(message_number=2, events=[])
+        ])
+
+        mock_client.aio.models.generate_content = AsyncMock(return_value=mock_response)
+
+        extracts = extract_all_events(self.messages, output_path=None)
 
         # Should have same number of extracts as input messages
-        self.assertEqual(len(extracts), len(messages))
+        self.assertEqual(len(extracts), len(self.messages))
+        self.assertEqual(len(extracts[0].events), 1)
+        self.assertEqual(len(extracts[1].events), 0)
+        self.assertEqual(mock_client.aio.models.generate_content.call_count, 1)
+
+    @patch('lib.stage3.get_gemini_client')
+    def test_extract_all_events_batch_fallback(self, mock_get_client):
+        """Test that messages a batch response leaves out fall back to per-message requests"""
+        mock_client = Mock()
+        mock_get_client.return_value = mock_client
+
+        # Batch answers only the second of the two messages
+        mock_batch = Mock()
+        mock_batch.parsed = BatchExtract(extracts=[NumberedExtract(message_number=2, events=[])])
+
+        mock_response1 = Mock()
+        mock_response1.parsed = self.talk_extract
+
+        mock_client.aio.models.generate_content = AsyncMock(
+            side_effect=[mock_batch, mock_response1]
+        )
+
+        extracts = extract_all_events(self.messages, output_path=None)
+
+        self.assertEqual(len(extracts), len(self.messages))
         self.assertEqual(len(extracts[0].events), 1)
         self.assertEqual(len(extracts[1].events), 0)
+        # Only the unanswered message is resent
+        self.assertEqual(mock_client.aio.models.generate_content.call_count, 2)
+        self.assertNotIsInstance(extracts[1], NumberedExtract)
+
+    @patch('lib.stage3.get_gemini_client')
+    def test_extract_all_events_concurrent_preserves_order(self, mock_get_client):
+        """Test batches are requested concurrently (up to max_workers) and results keep input order"""
+        mock_client = Mock()
+        mock_get_client.return_value = mock_client
+
+        messages = [
+            message.model_copy(update={'textract': f"announcement-{i}-end"})
+            for i, message in enumerate(self.messages * 20)
+        ]
+        in_flight = 0
+        peak_in_flight = 0
+
+        async def generate_content(model, contents, config):
+            nonlocal in_flight, peak_in_flight
+            in_flight += 1
+            peak_in_flight = max(peak_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            # Answer each [MSG N] block with a talk by the message's own number
+            numbers = [int(n) for n in re.findall(r"announcement-(\d+)-end", contents)]
+            response = Mock()
+            response.parsed = BatchExtract(extracts=[
+                NumberedExtract(
+                    message_number=position,
+                    events=[self.talk_extract.events[0].model_copy(update={'first_name': f"speaker{n}"})]
+                )
+                for position, n in enumerate(numbers, 1)
+            ])
+            return response
+
+        mock_client.aio.models.generate_content = generate_content
+
+        extracts = extract_all_events(messages, output_path=None, max_workers=3)
+
+        self.assertEqual([e.events[0].first_name for e in extracts], [f"speaker{i}" for i in range(len(messages))])
+        self.assertGreater(peak_in_flight, 1)
+        self.assertLessEqual(peak_in_flight, 3)
+
+    @patch('lib.stage3.get_gemini_client')
+    def test_response_cache_matches_cross_posts(self, mock_get_client):
+        """Test a cached extraction is reused for the same text posted in another channel"""
+        mock_client = Mock()
+        mock_get_client.return_value = mock_client
+
+        mock_response = Mock()
+        mock_response.parsed = self.talk_extract
+        mock_client.aio.models.generate_content = AsyncMock(return_value=mock_response)
+
+        cross_post = self.messages[0].model_copy(update={
+            'channel_name': 'seminars',
+            'sending_user_name': 'User3',
+            'textract': ':mega: *MESSAGE*\n  1'  # Same words, reposted with Slack formatting
+        })
+
+        with tempfile.TemporaryDirectory() as tmp:
+            cache_path = Path(tmp) / 'responses.sqlite'
+            extract_all_events(self.messages[:1], response_cache_path=cache_path)
+            extracts = extract_all_events([cross_post], response_cache_path=cache_path)
+
+        self.assertEqual(len(extracts[0].events), 1)
+        self.assertEqual(mock_client.aio.models.generate_content.call_count, 1)
+
+    @patch('lib.stage3.get_gemini_client')
+    def test_rerun_skips_unchanged_messages(self, mock_get_client):
+        """Test a re-run over the same messages answers every one from the response cache"""
+        mock_client = Mock()
+        mock_get_client.return_value = mock_client
+
+        mock_response = Mock()
+        mock_response.parsed = BatchExtract(extracts=[
+            NumberedExtract(message_number=1, events=self.talk_extract.events),
+            NumberedExtract(message_number=2, events=[])
+        ])
+        mock_client.aio.models.generate_content = AsyncMock(return_value=mock_response)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            cache_path = Path(tmp) / 'responses.sqlite'
+            first = extract_all_events(self.messages, response_cache_path=cache_path)
+            second = extract_all_events(self.messages, response_cache_path=cache_path)
+
+        self.assertEqual(second, first)
+        self.assertEqual(mock_client.aio.models.generate_content.call_count, 1)
+
+    @patch('lib.stage3.get_gemini_client')
+    def test_resume_retries_failed_messages(self, mock_get_client):
+        """Test messages that failed before an interrupt are sent again on resume, and only those"""
+        mock_client = Mock()
+        mock_get_client.return_value = mock_client
+
+        async def generate_content(model, contents, config):
+            # Batches and the second message fail in the first run
+            if "[MSG" in contents or "Message 2" in contents:
+                raise errors.ClientError(400, {'error': {'message': 'Invalid argument'}})
+            response = Mock()
+            response.parsed = self.talk_extract
+            return response
+
+        mock_client.aio.models.generate_content = AsyncMock(side_effect=generate_content)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            output_path = Path(tmp) / 'events.json'
+            # Interrupted before the results are consolidated
+            with patch.object(MessageExtract, 'to_json_file', side_effect=KeyboardInterrupt()):
+                with self.assertRaises(KeyboardInterrupt):
+                    extract_all_events(self.messages, output_path=output_path)
+            self.assertEqual(len(load_partial_results(output_path.with_suffix('.partial.jsonl'))), 1)
+
+            mock_client.aio.models.generate_content.reset_mock()
+            mock_client.aio.models.generate_content.side_effect = None
+            mock_client.aio.models.generate_content.return_value = Mock(parsed=MessageExtract(events=[]))
+            extracts = extract_all_events(self.messages, output_path=output_path)
+
+        self.assertEqual(len(extracts[0].events), 1)
+        self.assertEqual(mock_client.aio.models.generate_content.call_count, 1)
+        self.assertIn("Message 2", mock_client.aio.models.generate_content.call_args.kwargs['contents'])
+
+    def test_resume_after_torn_line_keeps_next_record(self):
+        """Test a record appended after a crash-torn last line is read back on the next resume"""
+        record = b'{"key":"%s","extract":{"events":[]}}\n'
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'events.partial.jsonl'
+            path.write_bytes(record % b"first" + b'{"key":"torn","ext')
+
+            with open_partial_log(path, resume=True) as f:
+                f.write(record % b"second")
+
+            self.assertEqual(sorted(load_partial_results(path)), ["first", "second"])
+
+    def test_normalize_textract_keeps_dates(self):
+        """Test formatting-only differences normalize together while changed dates do not"""
+        self.assertEqual(
+            normalize_textract("*Talk* by Alice :tada:\nOct 22, 3pm"),
+            normalize_textract("talk by   alice Oct 22, 3pm")
+        )
+        self.assertNotEqual(
+            normalize_textract("Talk by Alice Oct 22, 3pm"),
+            normalize_textract("Talk by Alice Oct 29, 3pm")
+        )
+
+    @patch('lib.stage3.get_gemini_client')
+    def test_messages_differing_only_in_time_are_not_coalesced(self, mock_get_client):
+        """Test times like 10:30-11:30: are not mistaken for emoji codes when matching duplicates"""
+        mock_client = Mock()
+        mock_get_client.return_value = mock_client
+        mock_response = Mock()
+        mock_response.parsed = BatchExtract(extracts=[
+            NumberedExtract(message_number=1, events=[]),
+            NumberedExtract(message_number=2, events=[])
+        ])
+        mock_client.aio.models.generate_content = AsyncMock(return_value=mock_response)
+
+        messages = [
+            self.messages[0].model_copy(update={'textract': "10:30-11:30: Talk by Ann"}),
+            self.messages[0].model_copy(update={'textract': "10:30-12:30: Talk by Ann"}),
+        ]
+        extract_all_events(messages)
+
+        self.assertNotEqual(normalize_textract("9:00:talk"), normalize_textract("9:45:talk"))
+        self.assertNotEqual(normalize_textract("Meet in room_101"), normalize_textract("Meet in room 101"))
+        self.assertEqual(normalize_textract(":mega: _Talk_ :+1:"), normalize_textract("talk"))
+        # Both messages are sent instead of one answering for the other
+        prompt = mock_client.aio.models.generate_content.await_args.kwargs['contents']
+        self.assertIn("11:30", prompt)
+        self.assertIn("12:30", prompt)
+
+    def test_pack_batches_caps_messages_and_tokens(self):
+        """Test batches close at BATCH_SIZE messages or the token budget, whichever comes first"""
+        lengths = [10] * 10 + [MAX_BATCH_TOKENS * CHARS_PER_TOKEN // 2 + 1] * 2 + [MAX_BATCH_TOKENS * CHARS_PER_TOKEN * 2]
+        messages = [self.messages[0].model_copy(update={'textract': "x" * n}) for n in lengths]
+
+        batches = pack_batches(list(range(len(messages))), messages)
+
+        self.assertEqual(batches, [list(range(BATCH_SIZE)), [8, 9, 10], [11], [12]])
 
 
 if __name__ == '__main__':
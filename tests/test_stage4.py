@@ -6,7 +6,13 @@ Tests event creation, deduplication, recurring events, and all event types
 
 import unittest
 from unittest.mock import Mock, patch, MagicMock
+import asyncio
+import tempfile
 from datetime import datetime
+from pathlib import Path
+
+import httplib2
+from googleapiclient.errors import HttpError
 
 from lib.models import (
     PhysicalTalkInfo,
@@ -21,7 +27,15 @@ from lib.stage4 import (
     generate_event_description,
     get_recurrence_rule,
     check_duplicate_event,
-    create_calendar_event
+    fetch_existing_events,
+    prefetch_existing_events,
+    create_calendar_event,
+    insert_events_batched,
+    delete_events_concurrently,
+    process_message_extract,
+    open_event_ledger,
+    ledger_lookup,
+    ledger_path
 )
 
 
@@ -61,6 +75,20 @@ class TestDateTimeParsing(unittest.TestCase):
         """Test parsing date with missing year"""
         result = parse_event_datetime("____-10-25T14:30")
         self.assertIsNone(result)
+        self.assertIsNone(parse_event_datetime("2025-__-25T14:30"))
+        self.assertIsNone(parse_event_datetime("2025-10-__T__:__"))
+
+    def test_parse_malformed_date(self):
+        """Test malformed strings are rejected instead of raising"""
+        self.assertIsNone(parse_event_datetime("next tuesday"))
+        self.assertIsNone(parse_event_datetime("2025-10-25"))
+        self.assertIsNone(parse_event_datetime("2025-10-25T14:30:00"))
+
+    def test_parse_out_of_range_fields_match_general_path(self):
+        """Test fields the ISO parser rejects still parse like underscore dates"""
+        result = parse_event_datetime("2025-02-30T24:00")
+        self.assertEqual((result['month'], result['day'], result['hour']), (2, 30, 24))
+        self.assertTrue(result['has_time'])
 
 
 class TestEventTitleGeneration(unittest.TestCase):
@@ -246,6 +274,137 @@ class TestDuplicateDetection(unittest.TestCase):
         result = check_duplicate_event(mock_service, "john's Talk", 2025, 10, 25)
         self.assertIsNone(result)
 
+    def test_check_duplicate_query_uses_dst_offset(self):
+        """Test the per-day query filters by title and uses EST outside daylight saving time"""
+        mock_service = Mock()
+        mock_service.events().list().execute.return_value = {'items': []}
+
+        check_duplicate_event(mock_service, "john's Talk", 2025, 12, 1)
+        kwargs = mock_service.events().list.call_args.kwargs
+        self.assertEqual(kwargs['timeMin'], '2025-12-01T00:00:00-05:00')
+        self.assertEqual(kwargs['timeMax'], '2025-12-02T00:00:00-05:00')
+        self.assertEqual(kwargs['q'], "john's Talk")
+
+    def test_check_duplicate_from_prefetched_index(self):
+        """Test duplicate lookups hit the prefetched index instead of listing per event"""
+        mock_service = Mock()
+        mock_service.events().list().execute.return_value = {
+            'items': [
+                {'summary': "john's Talk", 'id': 'event123', 'start': {'dateTime': '2025-10-25T14:00:00-04:00'}},
+                {'summary': "reading group", 'id': 'event456', 'start': {'date': '2025-10-27'}}
+            ]
+        }
+        mock_service.events().list.reset_mock()
+
+        dup_index = fetch_existing_events(mock_service, datetime(2025, 10, 25), datetime(2025, 10, 28))
+
+        self.assertEqual(check_duplicate_event(mock_service, "john's Talk", 2025, 10, 25, dup_index)['id'], 'event123')
+        self.assertEqual(check_duplicate_event(mock_service, "reading group", 2025, 10, 27, dup_index)['id'], 'event456')
+        self.assertIsNone(check_duplicate_event(mock_service, "john's Talk", 2025, 10, 26, dup_index))
+        self.assertEqual(mock_service.events().list.call_count, 1)
+
+    def test_prefetch_splits_distant_dates_into_windows(self):
+        """Test an outlier date is prefetched on its own instead of widening one window"""
+        mock_service = Mock()
+        mock_service.events().list().execute.return_value = {'items': []}
+        mock_service.events().list.reset_mock()
+
+        prefetch_existing_events(
+            mock_service,
+            [datetime(2025, 10, 25), datetime(2025, 10, 27), datetime(2025, 10, 25), datetime(2027, 1, 1)]
+        )
+
+        windows = [(call.kwargs['timeMin'][:10], call.kwargs['timeMax'][:10])
+                   for call in mock_service.events().list.call_args_list]
+        self.assertEqual(windows, [('2025-10-25', '2025-10-28'), ('2027-01-01', '2027-01-02')])
+
+    def test_created_event_recorded_in_index(self):
+        """Test an event created this run is found in the index without another list call"""
+        mock_service = Mock()
+        mock_service.events().insert().execute.return_value = {'id': 'new_event_123'}
+        mock_service.events().list.reset_mock()
+        talk = PhysicalTalkInfo(
+            first_name="john",
+            last_name="doe",
+            talk_date="2025-10-25T14:00",
+            location="Room 101",
+            short_description="ML talk",
+            lunch_provided=True,
+            category="Machine Learning"
+        )
+        dup_index = {}
+
+        create_calendar_event(mock_service, talk, dup_index=dup_index)
+
+        self.assertTrue(check_duplicate_event(mock_service, "john's Talk", 2025, 10, 25, dup_index)['_queued'])
+        mock_service.events().list.assert_not_called()
+
+    def test_queued_events_tracked_when_prefetch_failed(self):
+        """Test events queued this run are duplicates even when the index was not prefetched"""
+        mock_service = Mock()
+        mock_service.events().list().execute.return_value = {'items': []}
+        mock_service.events().list.reset_mock()
+        talk = PhysicalTalkInfo(
+            first_name="john",
+            last_name="doe",
+            talk_date="2025-10-25T14:00",
+            location="Room 101",
+            short_description="ML talk",
+            lunch_provided=False,
+            category="Machine Learning"
+        )
+        dup_index, inserts = {}, []
+
+        for _ in range(2):
+            stats = process_message_extract(
+                mock_service, MessageExtract(events=[talk]), [], inserts=inserts, dup_index=dup_index, index_complete=False
+            )
+
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(stats['duplicates'], 1)
+        self.assertEqual(mock_service.events().list.call_count, 1)
+
+    def test_queued_deletes_tracked_when_prefetch_failed(self):
+        """Test an overwrite queued this run is not queued again when the index was not prefetched"""
+        mock_service = Mock()
+        existing = {'summary': "john's Talk", 'id': 'event123'}
+        mock_service.events().list().execute.return_value = {'items': [existing]}
+        talk = PhysicalTalkInfo(
+            first_name="john",
+            last_name="doe",
+            talk_date="2025-10-25T14:00",
+            location="Room 101",
+            short_description="ML talk",
+            lunch_provided=False,
+            category="Machine Learning"
+        )
+        dup_index, inserts, deletes = {}, [], []
+
+        for _ in range(2):
+            process_message_extract(
+                mock_service, MessageExtract(events=[talk]), [], True, inserts, dup_index, deletes, index_complete=False
+            )
+
+        self.assertEqual(deletes, [(existing, talk, [])])
+
+    def test_recurring_master_fetched_once_per_series(self):
+        """Test recurring instances of one series share a single master lookup"""
+        mock_service = Mock()
+        mock_service.events().get().execute.return_value = {
+            'id': 'master1', 'summary': "reading group", 'recurrence': ['RRULE:FREQ=WEEKLY']
+        }
+        mock_service.events().get.reset_mock()
+        dup_index = {
+            (2025, 10, day, "reading group"): {'summary': "reading group", 'id': f"master1_{day}", 'recurringEventId': 'master1'}
+            for day in (20, 27)
+        }
+        master_cache = {}
+
+        for day in (20, 27):
+            result = check_duplicate_event(mock_service, "reading group", 2025, 10, day, dup_index, master_cache)
+            self.assertEqual(result['id'], 'master1')
+        self.assertEqual(mock_service.events().get.call_count, 1)
+
 
 class TestEventCreation(unittest.TestCase):
     """Test calendar event creation"""
@@ -342,5 +501,145 @@ class TestEventCreation(unittest.TestCase):
         self.assertIsNone(result)
 
 
+class TestBatchInsert(unittest.TestCase):
+    """Test batched event inserts"""
+
+    def test_insert_events_batched_chunks(self):
+        """Test inserts are split into batches of at most 50 calls"""
+        mock_service = Mock()
+        batches = []
+
+        def new_batch(callback):
+            batch = Mock()
+            batch.added = []
+            batch.add.side_effect = lambda request, request_id: batch.added.append(request_id)
+            batch.execute.side_effect = lambda: [callback(rid, {'htmlLink': 'link'}, None) for rid in batch.added]
+            batches.append(batch)
+            return batch
+
+        mock_service.new_batch_http_request.side_effect = new_batch
+
+        inserts = [{'summary': f"Event {i}"} for i in range(120)]
+        stats = insert_events_batched(mock_service, inserts)
+
+        self.assertEqual(stats, {'created': 120, 'errors': 0})
+        self.assertEqual([len(batch.added) for batch in batches], [50, 50, 20])
+
+    @patch('lib.stage4.time.sleep')
+    def test_insert_events_batched_retries_rate_limited_calls(self, mock_sleep):
+        """Test rate-limited calls are resent in a later batch and other errors are not"""
+        mock_service = Mock()
+        batches = []
+        rate_limited = HttpError(
+            httplib2.Response({'status': 403}),
+            b'{"error": {"message": "Rate Limit Exceeded", "errors": [{"reason": "rateLimitExceeded"}]}}'
+        )
+        forbidden = HttpError(httplib2.Response({'status': 403}), b'{"error": {"message": "Forbidden"}}')
+
+        def new_batch(callback):
+            batch = Mock()
+            batch.added = []
+            batch.add.side_effect = lambda request, request_id: batch.added.append(request_id)
+
+            def execute():
+                for rid in batch.added:
+                    if len(batches) == 1 and rid == '1':
+                        callback(rid, None, rate_limited)
+                    elif rid == '2':
+                        callback(rid, None, forbidden)
+                    else:
+                        callback(rid, {'htmlLink': 'link'}, None)
+            batch.execute.side_effect = execute
+            batches.append(batch)
+            return batch
+
+        mock_service.new_batch_http_request.side_effect = new_batch
+
+        inserts = [{'summary': f"Event {i}"} for i in range(3)]
+        stats = insert_events_batched(mock_service, inserts)
+
+        self.assertEqual(stats, {'created': 2, 'errors': 1})
+        self.assertEqual([batch.added for batch in batches], [['0', '1', '2'], ['1']])
+        mock_sleep.assert_called_once()
+
+
+class TestConcurrentDeletes(unittest.TestCase):
+    """Test overwrite deletes deferred and sent concurrently"""
+
+    def test_overwrite_defers_delete(self):
+        """Test overwrites are queued for deletion instead of deleted inline"""
+        mock_service = Mock()
+        talk = PhysicalTalkInfo(
+            first_name="john",
+            last_name="doe",
+            talk_date="2025-10-25T14:00",
+            location="Room 101",
+            short_description="ML talk",
+            lunch_provided=False,
+            category="Machine Learning"
+        )
+        existing = {'summary': "john's Talk", 'id': 'event123'}
+        dup_index = {(2025, 10, 25, "john's Talk"): existing}
+        inserts, deletes = [], []
+
+        stats = process_message_extract(
+            mock_service, MessageExtract(events=[talk, talk]), [], True, inserts, dup_index, deletes
+        )
+
+        self.assertEqual(deletes, [(existing, talk, [])])
+        self.assertEqual(stats['duplicates'], 1)
+        mock_service.events().delete.assert_not_called()
+
+    def test_delete_events_concurrently(self):
+        """Test each delete is sent on a pooled connection and every result is returned"""
+        mock_service = Mock()
+        mock_service.events().delete().execute.side_effect = [None, Exception("boom")]
+
+        results = asyncio.run(delete_events_concurrently(
+            mock_service, Mock(), [{'id': 'a'}, {'id': 'b', 'recurrence': ['RRULE:FREQ=WEEKLY']}]
+        ))
+
+        self.assertEqual(sorted(results), [False, True])
+        for call in mock_service.events().delete().execute.call_args_list:
+            self.assertIsNotNone(call.kwargs['http'])
+
+
+class TestEventLedger(unittest.TestCase):
+    """Test the persistent ledger of events already on the calendar"""
+
+    def test_ledger_skips_calendar_lookup_on_rerun(self):
+        """Test events created in one run are skipped without API calls in the next"""
+        talk = PhysicalTalkInfo(
+            first_name="john",
+            last_name="doe",
+            talk_date="2025-10-25T14:00",
+            location="Room 101",
+            short_description="ML talk",
+            lunch_provided=False,
+            category="Machine Learning"
+        )
+
+        with tempfile.TemporaryDirectory() as tmp:
+            ledger = open_event_ledger(Path(tmp) / 'ledger.sqlite')
+
+            first_service = Mock()
+            first_service.events().list().execute.return_value = {'items': []}
+            first_service.events().insert().execute.return_value = {'id': 'event123'}
+            stats = process_message_extract(first_service, MessageExtract(events=[talk]), [], ledger=ledger)
+            self.assertEqual(stats['created'], 1)
+            self.assertEqual(ledger_lookup(ledger, "john's Talk", 2025, 10, 25), 'event123')
+
+            second_service = Mock()
+            stats = process_message_extract(second_service, MessageExtract(events=[talk]), [], ledger=ledger)
+            self.assertEqual(stats['duplicates'], 1)
+            second_service.events.assert_not_called()
+            ledger.close()
+
+    def test_ledger_is_per_calendar(self):
+        """Test events recorded for one calendar are not treated as added to another"""
+        self.assertEqual(ledger_path('test@group.calendar.google.com'), ledger_path('test@group.calendar.google.com'))
+        self.assertNotEqual(ledger_path('test@group.calendar.google.com'), ledger_path('talks@group.calendar.google.com'))
+
+
 if __name__ == '__main__':
     unittest.main()